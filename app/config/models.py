@@ -9,14 +9,84 @@ from app.core.db.base import Base
 
 class UploadedFile(Base):
     __tablename__ = "uploaded_file"
+    # Monthly partitions (see app/core/db/partitions.py), referenced by (id, created_at)
+    __table_args__ = (
+        sa.Index("ix_uploaded_file_user_id", "user_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     user_id: Mapped[int] = mapped_column(sa.Integer, sa.ForeignKey("user.id"))
 
     name: Mapped[Optional[str]] = mapped_column(sa.String(255), default=None)
     file_path: Mapped[Optional[str]] = mapped_column(sa.String(255), default=None)
     extension: Mapped[Optional[str]] = mapped_column(sa.String(10), default=None)
-    size: Mapped[Optional[int]] = mapped_column(sa.Integer, default=None)
+    size: Mapped[Optional[int]] = mapped_column(sa.BigInteger, default=None)
 
-    created_at: Mapped[datetime] = mapped_column(sa.DateTime, default=sa.func.now(), nullable=False)
+    # Part of the primary key, the partition key must be in every unique constraint
+    created_at: Mapped[datetime] = mapped_column(
+        sa.DateTime, default=sa.func.now(), primary_key=True
+    )
 
     user = relationship("User", back_populates="uploaded_files")
+    variants = relationship("UploadedFileVariant", back_populates="uploaded_file")
+
+
+class UploadedFileVariant(Base):
+    __tablename__ = "uploaded_file_variant"
+    __table_args__ = (
+        sa.UniqueConstraint("uploaded_file_id", "name"),
+        sa.ForeignKeyConstraint(
+            ["uploaded_file_id", "uploaded_file_created_at"],
+            ["uploaded_file.id", "uploaded_file.created_at"],
+            ondelete="CASCADE",
+        ),
+    )
+
+    uploaded_file_id: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    uploaded_file_created_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+
+    # Key of settings.IMAGE_VARIANTS
+    name: Mapped[str] = mapped_column(sa.String(50), nullable=False)
+    file_path: Mapped[str] = mapped_column(sa.String(255), nullable=False)
+    width: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    height: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    size: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime, default=sa.func.now(), nullable=False)
+
+    uploaded_file = relationship("UploadedFile", back_populates="variants")
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_session"
+    __table_args__ = (
+        sa.ForeignKeyConstraint(
+            ["uploaded_file_id", "uploaded_file_created_at"],
+            ["uploaded_file.id", "uploaded_file.created_at"],
+        ),
+    )
+
+    # Public id, the chunks are staged under UPLOAD_STAGING_DIR/<key>
+    key: Mapped[str] = mapped_column(sa.String(32), nullable=False, unique=True)
+    user_id: Mapped[int] = mapped_column(sa.Integer, sa.ForeignKey("user.id"))
+
+    name: Mapped[str] = mapped_column(sa.String(255), nullable=False)
+    extension: Mapped[str] = mapped_column(sa.String(10), nullable=False)
+    size: Mapped[int] = mapped_column(sa.BigInteger, nullable=False)
+    chunk_size: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+
+    uploaded_file_id: Mapped[Optional[int]] = mapped_column(sa.Integer, default=None, nullable=True)
+    uploaded_file_created_at: Mapped[Optional[datetime]] = mapped_column(
+        sa.DateTime, default=None, nullable=True
+    )
+    expire_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime, default=sa.func.now(), nullable=False)
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    def get_chunk_length(self, index: int) -> int:
+        if index == self.chunk_count - 1:
+            return self.size - self.chunk_size * index
+        return self.chunk_size
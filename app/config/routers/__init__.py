@@ -1,12 +1,16 @@
 from fastapi import APIRouter
 
 from .common import router as common_router
+from .debug import router as debug_router
 from .media import router as media_v1_router
+from .upload import router as upload_router
 
 router = APIRouter()
 
 router.include_router(common_router)
+router.include_router(debug_router)
 router.include_router(media_v1_router)
+router.include_router(upload_router)
 
 
 __all__ = ["router"]
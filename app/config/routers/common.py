@@ -1,6 +1,16 @@
-from fastapi import APIRouter
+import ipaddress
+import secrets
 
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.admission import Priority, route_priority
+from app.core.auth.keys import key_ring_provider
 from app.core.config import settings
+from app.core.exceptions import PermissionException
+from app.core.metrics import registry
+from app.core.utils.conditional import etag_matches
+from app.core.warmup import readiness
 
 router = APIRouter()
 
@@ -14,3 +24,71 @@ async def get_home():
         response["redoc"] = f"{settings.API_HOST}/redoc"
 
     return response
+
+
+@router.get("/.well-known/jwks.json", dependencies=[route_priority(Priority.HIGH)])
+async def get_jwks(request: Request):
+    ring = key_ring_provider.get()
+    headers = {
+        "ETag": ring.jwks_etag,
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
+    }
+
+    if etag_matches(request, ring.jwks_etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=ring.jwks_body, media_type="application/json", headers=headers)
+
+
+def is_metrics_client(request: Request) -> bool:
+    if request.client is None:
+        return False
+
+    try:
+        address = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+
+    for network in settings.METRICS_ALLOWED_IPS.split(","):
+        network = network.strip()
+        if network and address in ipaddress.ip_network(network, strict=False):
+            return True
+
+    return False
+
+
+async def metrics_access(request: Request) -> None:
+    # Per route and per user flow counters, not for the public
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if settings.METRICS_TOKEN and scheme.lower() == "bearer":
+        if secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+            return
+
+    if not is_metrics_client(request):
+        raise PermissionException(message="Metrics are not available to this client")
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[route_priority(Priority.CRITICAL), Depends(metrics_access)],
+)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/healthz", include_in_schema=False, dependencies=[route_priority(Priority.CRITICAL)])
+async def get_healthz():
+    # Liveness, the process and its event loop respond
+    return {"status": "ok"}
+
+
+@router.get("/readyz", include_in_schema=False, dependencies=[route_priority(Priority.CRITICAL)])
+async def get_readyz():
+    if not readiness.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "not ready", "reason": readiness.reason},
+        )
+
+    return {"status": "ready"}
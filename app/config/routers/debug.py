@@ -0,0 +1,31 @@
+import asyncio
+from typing import Literal
+
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.admission import Priority, route_priority
+from app.core.config import settings
+from app.core.deps.auth import SuperPrincipal
+from app.core.profiling import FORMAT_COLLAPSED, get_worker_name, worker_profile
+
+# Profiling is most needed while overloaded, never shed
+router = APIRouter(prefix="/api/v1/debug", dependencies=[route_priority(Priority.CRITICAL)])
+
+
+@router.post("/profile")
+async def profile_worker(
+    _: SuperPrincipal,
+    seconds: float = Query(5.0, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    format: Literal["speedscope", "collapsed"] = "speedscope",
+):
+    # Samples the worker serving this request, other workers see `cli collect-profiles`
+    with worker_profile() as profiler:
+        await asyncio.sleep(seconds)
+
+    profile = profiler.export(format, f"{get_worker_name()} {seconds}s")
+
+    if format == FORMAT_COLLAPSED:
+        return PlainTextResponse(profile)
+
+    return JSONResponse(profile)
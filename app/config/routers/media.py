@@ -1,23 +1,29 @@
 import os
+from typing import Optional
 
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, Depends, File, UploadFile
 from fastapi.responses import FileResponse
 
+from app.core.admission import Priority, route_priority
 from app.core.config import settings
-from app.core.deps.auth import CurrentUser
+from app.core.deps.auth import CurrentPrincipal
 from app.core.deps.db import SessionDep
+from app.core.deps.idempotency import Idempotent
 from app.core.utils.file import FileNotFoundException, get_media_full_path, save_file
+from app.core.utils.image import VARIANT_CACHE_CONTROL, get_variant_path, get_variant_spec
 
 router = APIRouter()
 
 
-@router.post("/api/v1/upload-file")
+@router.post(
+    "/api/v1/upload-file", dependencies=[route_priority(Priority.LOW), Depends(Idempotent())]
+)
 async def create_upload_file(
-    user: CurrentUser,
+    principal: CurrentPrincipal,
     session: SessionDep,
     file: UploadFile = File(...),
 ):
-    file_path = save_file(session, user.id, file, root_folder="file")
+    file_path = save_file(session, principal.id, file, root_folder="file")
 
     return file_path
 
@@ -35,5 +41,24 @@ def get_file_response(file_path):
 
 
 @router.get("/media/{file_path:path}")
-async def get_file(file_path: str):
-    return get_file_response(file_path)
+async def get_file(file_path: str, variant: Optional[str] = None):
+    if variant is None:
+        return get_file_response(file_path)
+
+    spec = get_variant_spec(variant)
+    if spec is None:
+        raise FileNotFoundException(message=f"Unknown variant {variant}")
+
+    variant_full_path = get_media_full_path(get_variant_path(file_path, variant, spec))
+    if os.path.isfile(variant_full_path):
+        return FileResponse(
+            variant_full_path,
+            headers={"Cache-Control": VARIANT_CACHE_CONTROL, "X-Image-Variant": variant},
+        )
+
+    # Still being generated, serve the original and don't let it be cached as the variant
+    response = get_file_response(file_path)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Image-Variant"] = "original"
+
+    return response
@@ -0,0 +1,159 @@
+from datetime import datetime
+from uuid import uuid4
+
+import anyio.to_thread
+import sqlalchemy as sa
+from fastapi import APIRouter, Request, status
+from sqlalchemy.orm import Session
+
+from app.core.admission import Priority, route_priority
+from app.core.config import settings
+from app.core.deps.auth import CurrentPrincipal
+from app.core.deps.db import SessionDep
+from app.core.utils.file import get_extension, new_media_path
+from app.core.utils.upload import (
+    UploadException,
+    UploadIncompleteException,
+    UploadNotFoundException,
+    assemble_upload,
+    get_upload_status,
+    new_upload_expire_at,
+    remove_staging,
+    resolve_chunk_size,
+    write_chunk,
+)
+from worker.tasks.media import enqueue_image_variants
+
+from ..models import UploadedFile, UploadSession
+from ..schemas.upload import UploadCreateIn, UploadSessionOut, UploadStatusOut
+
+# Uploads are shed first under load, clients resume them later
+router = APIRouter(prefix="/api/v1/uploads", dependencies=[route_priority(Priority.LOW)])
+
+
+def get_upload_or_404(session: Session, user_id: int, key: str, for_update: bool = False):
+    stmt = sa.select(UploadSession).where(
+        UploadSession.key == key,
+        UploadSession.user_id == user_id,
+        UploadSession.expire_at > datetime.now(),
+    )
+    if for_update:
+        stmt = stmt.with_for_update()
+
+    upload = session.scalars(stmt).first()
+
+    if upload is None:
+        raise UploadNotFoundException
+
+    return upload
+
+
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=UploadSessionOut)
+async def create_upload(
+    principal: CurrentPrincipal,
+    session: SessionDep,
+    data: UploadCreateIn,
+):
+    if data.size > settings.UPLOAD_MAX_SIZE:
+        raise UploadException(message=f"File is larger than {settings.UPLOAD_MAX_SIZE} bytes")
+
+    upload = UploadSession(
+        key=uuid4().hex,
+        user_id=principal.id,
+        name=data.name,
+        extension=get_extension(data.name),
+        size=data.size,
+        chunk_size=resolve_chunk_size(data.chunk_size),
+        expire_at=new_upload_expire_at(),
+    )
+    session.add(upload)
+    session.commit()
+
+    return UploadSessionOut.model_validate(upload)
+
+
+@router.put("/{key}/chunks/{index}", response_model=UploadStatusOut)
+async def upload_chunk(
+    key: str,
+    index: int,
+    request: Request,
+    principal: CurrentPrincipal,
+    session: SessionDep,
+):
+    # Chunks can arrive in any order and in parallel, each one is its own staged file
+    upload = get_upload_or_404(session, principal.id, key)
+    if upload.uploaded_file_id is not None:
+        raise UploadException(message="Upload is already completed")
+
+    # Releases the pooled connection before the (slow) body transfer
+    session.commit()
+
+    await write_chunk(upload, index, request.stream())
+
+    return get_upload_status(upload)
+
+
+@router.get("/{key}", response_model=UploadStatusOut)
+async def get_upload(
+    key: str,
+    principal: CurrentPrincipal,
+    session: SessionDep,
+):
+    upload = get_upload_or_404(session, principal.id, key)
+
+    return get_upload_status(upload)
+
+
+@router.post("/{key}/complete")
+async def complete_upload(
+    key: str,
+    principal: CurrentPrincipal,
+    session: SessionDep,
+):
+    # The row lock serializes concurrent completes of the same upload
+    upload = get_upload_or_404(session, principal.id, key, for_update=True)
+
+    if upload.uploaded_file_id is not None:
+        # Retried after a dropped response
+        key = {"id": upload.uploaded_file_id, "created_at": upload.uploaded_file_created_at}
+        return session.get(UploadedFile, key).file_path
+
+    missing = get_upload_status(upload)["missing_chunks"]
+    if missing:
+        raise UploadIncompleteException(message=f"Missing chunks {missing[:20]}")
+
+    file_path, full_path = new_media_path("file", upload.extension)
+    await anyio.to_thread.run_sync(assemble_upload, upload, full_path)
+
+    file_instance = UploadedFile(
+        user_id=principal.id,
+        name=upload.name,
+        file_path=file_path,
+        extension=upload.extension,
+        size=upload.size,
+    )
+    session.add(file_instance)
+    session.flush()
+
+    upload.uploaded_file_id = file_instance.id
+    upload.uploaded_file_created_at = file_instance.created_at
+    session.commit()
+
+    remove_staging(upload.key)
+    enqueue_image_variants(file_instance)
+
+    return file_path
+
+
+@router.delete("/{key}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    key: str,
+    principal: CurrentPrincipal,
+    session: SessionDep,
+):
+    upload = get_upload_or_404(session, principal.id, key)
+
+    session.delete(upload)
+    session.commit()
+
+    remove_staging(key)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class UploadCreateIn(BaseModel):
+    name: str = Field(..., description="File name with extension", max_length=255)
+    size: int = Field(..., description="Total size in bytes", gt=0)
+    chunk_size: Optional[int] = Field(None, description="Chunk size in bytes")
+
+
+class UploadSessionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    key: str = Field(..., description="Upload key")
+    size: int = Field(..., description="Total size in bytes")
+    chunk_size: int = Field(..., description="Chunk size in bytes")
+    chunk_count: int = Field(..., description="Number of chunks")
+    expire_at: datetime = Field(..., description="Unfinished uploads are removed after this")
+
+
+class UploadStatusOut(BaseModel):
+    key: str = Field(..., description="Upload key")
+    offset: int = Field(..., description="Bytes received contiguously from the start")
+    received_chunks: int = Field(..., description="Number of chunks received")
+    missing_chunks: List[int] = Field(..., description="Chunk indexes still to upload")
@@ -0,0 +1,192 @@
+import math
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Dict
+
+from fastapi import Depends, params
+from starlette.routing import Match
+
+from app.core.config import settings
+from app.core.exceptions import CustomException
+from app.core.metrics import registry
+
+requests_shed_total = registry.counter(
+    "requests_shed_total", "Requests rejected by admission control", ("priority",)
+)
+requests_in_flight = registry.gauge("requests_in_flight", "Requests being served")
+admission_pressure = registry.gauge(
+    "admission_pressure", "Worst signal / target ratio, shedding starts at 1"
+)
+
+
+class Priority(IntEnum):
+    # Never shed: health checks, readiness and metrics
+    CRITICAL = 0
+    # Keeps signed-in users working: login, token refresh, profile reads
+    HIGH = 1
+    NORMAL = 2
+    # Shed first: uploads, registration
+    LOW = 3
+
+
+class OverloadedException(CustomException):
+    code = 503
+    error_code = "OVERLOADED"
+    message = "Server is overloaded, retry later"
+
+
+class RoutePriority:
+    """Marks the admission priority of a route or router, a no-op as a dependency."""
+
+    def __init__(self, priority: Priority) -> None:
+        self.priority = priority
+
+    async def __call__(self) -> None:
+        return None
+
+
+def route_priority(priority: Priority) -> params.Depends:
+    # `APIRouter(dependencies=[route_priority(Priority.LOW)])`, or on a single route
+    return Depends(RoutePriority(priority))
+
+
+def get_route_priority(route: Any) -> Priority:
+    dependant = getattr(route, "dependant", None)
+    if dependant is None:
+        return Priority.NORMAL
+
+    # Route level markers come after the router's, the last one wins
+    priority = Priority.NORMAL
+    for dependency in dependant.dependencies:
+        if isinstance(dependency.call, RoutePriority):
+            priority = dependency.call.priority
+
+    return priority
+
+
+class DecayingAverage:
+    """EWMA of the samples that also decays toward 0 while no samples arrive.
+
+    Without the decay a signal fed by requests would stay high once everything is shed.
+    """
+
+    def __init__(self, half_life: float, weight: float = 0.2) -> None:
+        self.half_life = half_life
+        self.weight = weight
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * math.pow(0.5, (now - self._updated) / self.half_life)
+
+    def observe(self, sample: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            value = self._decayed(now)
+            self._value = value + self.weight * (sample - value)
+            self._updated = now
+
+    def value(self) -> float:
+        return self._decayed(time.monotonic())
+
+
+class AdmissionController:
+    """Sheds low priority requests while the worker's queues are above their targets.
+
+    Pressure is the worst ratio of signal to target: request latency, DB pool checkout
+    wait, threadpool queue wait and event loop lag. At 1 LOW routes are rejected, at
+    `ADMISSION_SHED_NORMAL_PRESSURE` NORMAL routes too. HIGH routes are only rejected when
+    ADMISSION_MAX_IN_FLIGHT is reached, CRITICAL routes never.
+    """
+
+    def __init__(self) -> None:
+        half_life = settings.ADMISSION_SIGNAL_HALF_LIFE_SECONDS
+        self.latency = DecayingAverage(half_life)
+        self.pool_wait = DecayingAverage(half_life)
+        self.threadpool_wait = DecayingAverage(half_life)
+        self.loop_lag = DecayingAverage(half_life)
+        self.in_flight = 0
+        self._priorities: Dict[int, Priority] = {}
+
+    def observe_latency(self, seconds: float, priority: Priority) -> None:
+        # Uploads and the profiler endpoint are slow by nature, they would keep
+        # everything else shed
+        if Priority.CRITICAL < priority < Priority.LOW:
+            self.latency.observe(seconds)
+
+    def observe_pool_wait(self, seconds: float) -> None:
+        self.pool_wait.observe(seconds)
+
+    def observe_threadpool_wait(self, seconds: float) -> None:
+        self.threadpool_wait.observe(seconds)
+
+    def observe_loop_lag(self, seconds: float) -> None:
+        self.loop_lag.observe(seconds)
+
+    def pressure(self) -> float:
+        queue_target = settings.ADMISSION_TARGET_QUEUE_WAIT_SECONDS
+
+        pressure = max(
+            self.latency.value() / settings.ADMISSION_TARGET_LATENCY_SECONDS,
+            self.pool_wait.value() / queue_target,
+            self.threadpool_wait.value() / queue_target,
+            self.loop_lag.value() / queue_target,
+        )
+        admission_pressure.set(pressure)
+
+        return pressure
+
+    def lowest_admitted(self) -> Priority:
+        max_in_flight = settings.ADMISSION_MAX_IN_FLIGHT
+        if max_in_flight and self.in_flight >= max_in_flight:
+            return Priority.CRITICAL
+
+        pressure = self.pressure()
+        if pressure >= settings.ADMISSION_SHED_NORMAL_PRESSURE:
+            return Priority.HIGH
+        if pressure >= 1:
+            return Priority.NORMAL
+
+        return Priority.LOW
+
+    def route_priority(self, route: Any) -> Priority:
+        key = id(route)
+        if key not in self._priorities:
+            self._priorities[key] = get_route_priority(route)
+
+        return self._priorities[key]
+
+    def resolve_priority(self, scope: Dict[str, Any]) -> Priority:
+        # Before routing, only done while shedding
+        app = scope.get("app")
+        routes = getattr(getattr(app, "router", None), "routes", ())
+
+        for route in routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return self.route_priority(route)
+
+        return Priority.NORMAL
+
+    def should_reject(self, scope: Dict[str, Any]) -> bool:
+        lowest = self.lowest_admitted()
+        if lowest == Priority.LOW:
+            return False
+
+        priority = self.resolve_priority(scope)
+        if priority <= lowest:
+            return False
+
+        requests_shed_total.inc(labels={"priority": priority.name})
+        return True
+
+    def retry_after(self) -> int:
+        # Jittered, rejected clients shouldn't come back in one wave
+        base = settings.ADMISSION_RETRY_AFTER_SECONDS
+        return base + random.randint(0, base)
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,263 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, List, Optional, Sequence
+
+import anyio.to_thread
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db.pipeline import copy_rows
+from app.core.db.session import get_sync_session
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+audit_events_total = registry.counter(
+    "audit_events_total", "Audit events written or spilled to disk", ("table", "result")
+)
+
+
+def is_data_error(error: Exception) -> bool:
+    # SQLSTATE class 22 (data exception, e.g. a too long value): retrying can't help.
+    # Raw driver errors from COPY or SQLAlchemy's wrapper of them.
+    orig = getattr(error, "orig", error)
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+
+    return sqlstate is not None and sqlstate.startswith("22")
+
+
+class AuditLog:
+    """Append-only events recorded without a DB write on the request path.
+
+    Events are buffered in-process, up to AUDIT_BUFFER_SIZE, and written in batches of
+    AUDIT_BATCH_SIZE (COPY with psycopg 3) by the flusher. Batches that fail to write,
+    and events beyond the buffer bound, are appended to a spill file in AUDIT_SPILL_DIR
+    that the next flush replays first. Delivery is at least once, a crash between a
+    replay's commit and the truncation of the file writes its events twice.
+
+    Rows the database rejects as invalid data fail their whole batch: the batch is then
+    written row by row and the invalid rows go to a rejected file next to the spill file,
+    so they can't block the log.
+    """
+
+    def __init__(self, model, columns: Sequence[str]) -> None:
+        self.model = model
+        self.table = model.__table__
+        self.columns = tuple(columns)
+        self._buffer: Deque[tuple] = deque()
+        self._lock = threading.Lock()
+
+        AUDIT_LOGS.append(self)
+
+    @property
+    def spill_path(self) -> str:
+        return os.path.join(settings.AUDIT_SPILL_DIR, f"{self.table.name}.jsonl")
+
+    @property
+    def rejected_path(self) -> str:
+        return os.path.join(settings.AUDIT_SPILL_DIR, f"{self.table.name}.rejected.jsonl")
+
+    def _count(self, result: str, amount: int) -> None:
+        audit_events_total.inc(amount, labels={"table": self.table.name, "result": result})
+
+    def _encode(self, row: tuple) -> str:
+        values = {
+            column: value.isoformat() if isinstance(value, datetime) else value
+            for column, value in zip(self.columns, row)
+        }
+        return json.dumps(values)
+
+    def _decode(self, line: str) -> tuple:
+        values = json.loads(line)
+
+        row = []
+        for column in self.columns:
+            value = values.get(column)
+            if value is not None and self.table.c[column].type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            row.append(value)
+
+        return tuple(row)
+
+    def record(self, **values: Any) -> None:
+        row = tuple(values.get(column) for column in self.columns)
+
+        with self._lock:
+            buffered = len(self._buffer) < settings.AUDIT_BUFFER_SIZE
+            if buffered:
+                self._buffer.append(row)
+
+        if not buffered:
+            self.spill([row])
+
+    def drain(self, limit: int) -> List[tuple]:
+        with self._lock:
+            return [self._buffer.popleft() for _ in range(min(limit, len(self._buffer)))]
+
+    def _append(self, path: str, rows: List[tuple]) -> None:
+        os.makedirs(settings.AUDIT_SPILL_DIR, exist_ok=True)
+
+        # Shared by the workers of the host, flock serializes appends and replays
+        with open(path, "a", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.write("".join(f"{self._encode(row)}\n" for row in rows))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def spill(self, rows: List[tuple]) -> None:
+        self._append(self.spill_path, rows)
+        self._count("spilled", len(rows))
+
+    def reject(self, rows: List[tuple]) -> None:
+        # Kept for inspection, never replayed
+        self._append(self.rejected_path, rows)
+        self._count("rejected", len(rows))
+
+    def spill_buffer(self) -> int:
+        rows = self.drain(len(self._buffer))
+        if rows:
+            self.spill(rows)
+
+        return len(rows)
+
+    def write(self, session: Session, rows: List[tuple]) -> None:
+        batch_size = settings.AUDIT_BATCH_SIZE
+
+        try:
+            for start in range(0, len(rows), batch_size):
+                copy_rows(session, self.table, self.columns, rows[start : start + batch_size])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def write_valid(self, session: Session, rows: List[tuple]) -> int:
+        """Writes `rows`, isolating those failing the database's data checks. Returns the
+        number of rows written, other errors are raised."""
+        try:
+            self.write(session, rows)
+            return len(rows)
+        except Exception as e:
+            if not is_data_error(e):
+                raise
+
+        written, rejected = 0, []
+        for row in rows:
+            try:
+                self.write(session, [row])
+                written += 1
+            except Exception as e:
+                if not is_data_error(e):
+                    raise
+                logger.error(f"Rejected invalid {self.table.name} audit event. Error {e}")
+                rejected.append(row)
+
+        if rejected:
+            self.reject(rejected)
+
+        return written
+
+    def replay_spill(self, session: Session) -> int:
+        try:
+            f = open(self.spill_path, "r+", encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Replayed by another worker, or being appended to
+                return 0
+
+            rows = []
+            for line in f:
+                try:
+                    rows.append(self._decode(line))
+                except ValueError:
+                    # Torn by a crash mid-append
+                    logger.warning(f"Skipping unreadable audit event in {self.spill_path}")
+
+            written = self.write_valid(session, rows) if rows else 0
+            f.truncate(0)
+
+        self._count("replayed", written)
+        return written
+
+    def flush(self, session: Session) -> int:
+        flushed = self.replay_spill(session)
+
+        while True:
+            rows = self.drain(settings.AUDIT_BATCH_SIZE)
+            if not rows:
+                break
+
+            try:
+                written = self.write_valid(session, rows)
+            except Exception:
+                self.spill(rows)
+                raise
+
+            self._count("written", written)
+            flushed += written
+
+        return flushed
+
+
+AUDIT_LOGS: List[AuditLog] = []
+
+
+def flush_audit_logs(session: Session) -> int:
+    return sum(audit_log.flush(session) for audit_log in AUDIT_LOGS)
+
+
+def flush_local_audit_logs() -> int:
+    with get_sync_session() as session:
+        return flush_audit_logs(session)
+
+
+class AuditFlusher:
+    # Every API worker flushes its own buffer, there is no shared one
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await anyio.to_thread.run_sync(flush_local_audit_logs)
+            except Exception as e:
+                logger.error(f"Audit log flush failed. Error {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Whatever can't be written now is spilled, and replayed after the restart
+        try:
+            await anyio.to_thread.run_sync(flush_local_audit_logs)
+        except Exception as e:
+            logger.error(f"Audit log flush on shutdown failed, spilling. Error {e}")
+
+            for audit_log in AUDIT_LOGS:
+                audit_log.spill_buffer()
+
+
+audit_flusher = AuditFlusher(interval=settings.AUDIT_FLUSH_SECONDS)
@@ -1,14 +1,19 @@
-import bcrypt
+from app.core.auth.hashers import password_hashers
+from app.core.tracing import traced
 
 
 class PasswordUtils:
     @classmethod
+    @traced("password.hash")
     def get_hashed_password(cls, password: str) -> str:
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
-
-        return hashed_password.decode("utf-8")
+        return password_hashers.hash(password)
 
     @classmethod
+    @traced("password.verify")
     def verify_password(cls, plain_password: str, hashed_password: str) -> bool:
-        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+        return password_hashers.verify(plain_password, hashed_password)
+
+    @classmethod
+    def needs_rehash(cls, hashed_password: str) -> bool:
+        # Another hasher or a lower cost than the current default
+        return password_hashers.needs_update(hashed_password)
@@ -0,0 +1,197 @@
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+from app.core.config import settings
+
+try:
+    import argon2
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # pragma: no cover
+    argon2 = None
+
+logger = logging.getLogger(__name__)
+
+BCRYPT = "bcrypt"
+ARGON2ID = "argon2id"
+
+# Calibration never goes below these, whatever the hardware
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+ARGON2_MIN_TIME_COST = 2
+ARGON2_MAX_TIME_COST = 20
+
+CALIBRATION_PASSWORD = "calibration-password"
+
+
+class PasswordHasherException(Exception):
+    pass
+
+
+def measure_hash(hasher, repeat: int = 3) -> float:
+    # Best of a few, the first one also pays for page faults and cold caches
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hasher.hash(CALIBRATION_PASSWORD)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+class BcryptHasher:
+    name = BCRYPT
+
+    def __init__(self, rounds: int) -> None:
+        self.rounds = rounds
+
+    @property
+    def parameters(self) -> Dict[str, int]:
+        return {"rounds": self.rounds}
+
+    def identify(self, hashed_password: str) -> bool:
+        return hashed_password.startswith(("$2a$", "$2b$", "$2y$"))
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(self.rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    def needs_update(self, hashed_password: str) -> bool:
+        # "$2b$12$...", only weaker hashes are upgraded, workers calibrated a round higher
+        # don't rehash each other's passwords back and forth
+        return int(hashed_password.split("$")[2]) < self.rounds
+
+    def calibrate(self, target_seconds: float) -> None:
+        # Every round doubles the work
+        elapsed = measure_hash(BcryptHasher(BCRYPT_MIN_ROUNDS))
+
+        rounds = BCRYPT_MIN_ROUNDS + math.floor(math.log2(target_seconds / elapsed))
+        self.rounds = min(max(rounds, BCRYPT_MIN_ROUNDS), BCRYPT_MAX_ROUNDS)
+
+
+class Argon2Hasher:
+    name = ARGON2ID
+
+    def __init__(self, time_cost: int, memory_cost: int, parallelism: int) -> None:
+        if argon2 is None:
+            raise PasswordHasherException("argon2id needs argon2-cffi installed")
+
+        self.parallelism = parallelism
+        self.memory_cost = memory_cost
+        self.set_time_cost(time_cost)
+
+    def set_time_cost(self, time_cost: int) -> None:
+        self.time_cost = time_cost
+        self.hasher = argon2.PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism,
+            type=argon2.Type.ID,
+        )
+
+    @property
+    def parameters(self) -> Dict[str, int]:
+        return {
+            "time_cost": self.time_cost,
+            "memory_cost": self.memory_cost,
+            "parallelism": self.parallelism,
+        }
+
+    def identify(self, hashed_password: str) -> bool:
+        return hashed_password.startswith("$argon2id$")
+
+    def hash(self, password: str) -> str:
+        return self.hasher.hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        try:
+            return self.hasher.verify(hashed_password, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_update(self, hashed_password: str) -> bool:
+        parameters = argon2.extract_parameters(hashed_password)
+        return (
+            parameters.time_cost < self.time_cost
+            or parameters.memory_cost < self.memory_cost
+            or parameters.parallelism != self.parallelism
+        )
+
+    def calibrate(self, target_seconds: float) -> None:
+        # Memory is the configured one, the time cost scales linearly
+        elapsed = measure_hash(Argon2Hasher(1, self.memory_cost, self.parallelism))
+
+        time_cost = math.floor(target_seconds / elapsed)
+        self.set_time_cost(min(max(time_cost, ARGON2_MIN_TIME_COST), ARGON2_MAX_TIME_COST))
+
+
+class PasswordHashers:
+    """Registry of the password hashers, new hashes use the default one.
+
+    Hashes made by another hasher, or with a lower cost than the current one, are
+    reported by `needs_update` and rehashed on the next successful login.
+    """
+
+    def __init__(self, default: str, hashers: Dict[str, Any]) -> None:
+        if default not in hashers:
+            raise PasswordHasherException(f"Unknown password hasher {default}")
+
+        self.default = default
+        self.hashers = hashers
+
+    def get_default(self):
+        return self.hashers[self.default]
+
+    def identify(self, hashed_password: str):
+        for hasher in self.hashers.values():
+            if hasher.identify(hashed_password):
+                return hasher
+
+        return None
+
+    def hash(self, password: str) -> str:
+        return self.get_default().hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        hasher = self.identify(hashed_password)
+        return hasher is not None and hasher.verify(password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        hasher = self.identify(hashed_password)
+        if hasher is not self.get_default():
+            return True
+
+        return hasher.needs_update(hashed_password)
+
+    def calibrate(self, target_seconds: Optional[float] = None) -> None:
+        if target_seconds is None:
+            target_seconds = settings.PASSWORD_HASH_TARGET_SECONDS
+        if not target_seconds:
+            return
+
+        hasher = self.get_default()
+        hasher.calibrate(target_seconds)
+        logger.info(f"Password hasher {hasher.name} calibrated to {hasher.parameters}")
+
+
+def make_password_hashers() -> PasswordHashers:
+    hashers = {BCRYPT: BcryptHasher(settings.BCRYPT_ROUNDS)}
+
+    if argon2 is not None:
+        hashers[ARGON2ID] = Argon2Hasher(
+            settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST_KIB, settings.ARGON2_PARALLELISM
+        )
+    elif settings.PASSWORD_HASHER == ARGON2ID:
+        logger.warning("PASSWORD_HASHER is argon2id but argon2-cffi is not installed, using bcrypt")
+        return PasswordHashers(BCRYPT, hashers)
+
+    return PasswordHashers(settings.PASSWORD_HASHER, hashers)
+
+
+password_hashers = make_password_hashers()
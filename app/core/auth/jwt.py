@@ -1,12 +1,13 @@
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Any, Dict
 
 import jwt
 from pydantic import BaseModel
 
+from app.core.auth.keys import key_ring_provider
 from app.core.config import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     JWT_ALGORITHM,
@@ -14,6 +15,7 @@ from app.core.config import (
     settings,
 )
 from app.core.exceptions import CustomException
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -36,19 +38,65 @@ class TokenException(CustomException):
 
 class JWTProvider:
     @classmethod
+    @traced("jwt.encode")
     def _create_token(cls, payload: Dict[str, Any], exp: timedelta) -> str:
         expire = datetime.now() + exp
 
         payload["exp"] = expire
         payload["iat"] = time.time()
 
+        signing_key = key_ring_provider.get().signing_key()
+
         try:
-            token = jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+            if signing_key:
+                token = jwt.encode(
+                    payload,
+                    signing_key.private_key,
+                    algorithm=signing_key.algorithm,
+                    headers={"kid": signing_key.kid},
+                )
+            else:
+                token = jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
         except Exception as e:
             raise TokenException(message="Invalid Token") from e
 
         return token
 
+    @classmethod
+    def _accepts_secret_key_tokens(cls) -> bool:
+        ring = key_ring_provider.get()
+        if not ring:
+            return True
+
+        until = settings.JWT_SECRET_KEY_TOKENS_UNTIL
+        if until is None:
+            oldest = min(key.activate_at for key in ring.keys.values())
+            until = oldest + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        elif until.tzinfo is None:
+            until = until.replace(tzinfo=timezone.utc)
+
+        return datetime.now(timezone.utc) < until
+
+    @classmethod
+    def _get_verification_key(cls, token: str):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.exceptions.DecodeError as e:
+            raise TokenException from e
+
+        if kid is None:
+            # Tokens signed before asymmetric keys were configured
+            if not settings.JWT_SECRET_KEY or not cls._accepts_secret_key_tokens():
+                raise TokenException(message="Invalid Token")
+            return settings.JWT_SECRET_KEY, JWT_ALGORITHM
+
+        key = key_ring_provider.get().get(kid)
+
+        if key is None:
+            raise TokenException(message="Unknown signing key")
+
+        return key.public_key, key.algorithm
+
     @classmethod
     def create_access_token(cls, id: int, rstr: str) -> str:
         payload = {
@@ -70,16 +118,19 @@ class JWTProvider:
         return cls._create_token(payload, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
 
     @classmethod
+    @traced("jwt.decode")
     def _decode_token(cls, token: str) -> Dict[str, Any]:
         if not token:
             raise TokenException(message="Invalid Token")
 
+        key, algorithm = cls._get_verification_key(token)
+
         try:
-            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        except jwt.exceptions.DecodeError as e:
-            raise TokenException from e
+            payload = jwt.decode(token, key, algorithms=[algorithm])
         except jwt.exceptions.ExpiredSignatureError as e:
             raise TokenException(message="Expired token") from e
+        except jwt.exceptions.InvalidTokenError as e:
+            raise TokenException from e
 
         if "token_type" not in payload:
             raise TokenException(message="Invalid Token")
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from app.core.config import REFRESH_TOKEN_EXPIRE_DAYS, settings
+from app.core.utils.conditional import make_weak_etag
+
+logger = logging.getLogger(__name__)
+
+KID_TIME_FORMAT = "%Y%m%dT%H%M"
+
+ALGORITHMS = {
+    "EdDSA": (ed25519.Ed25519PrivateKey, OKPAlgorithm),
+    "ES256": (ec.EllipticCurvePrivateKey, ECAlgorithm),
+}
+
+
+class KeyRingException(Exception):
+    pass
+
+
+def get_key_algorithm(private_key) -> str:
+    for algorithm, (key_type, _) in ALGORITHMS.items():
+        if isinstance(private_key, key_type):
+            if algorithm == "ES256" and private_key.curve.name != "secp256r1":
+                continue
+            return algorithm
+
+    raise KeyRingException(f"Unsupported key type {type(private_key).__name__}")
+
+
+def parse_kid_activation(kid: str) -> datetime:
+    # kid is "<activation time>-<suffix>", e.g. "20240501T0000-a1b2"
+    try:
+        return datetime.strptime(kid.split("-")[0], KID_TIME_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError as e:
+        raise KeyRingException(f"Invalid kid {kid}") from e
+
+
+def new_kid(activate_at: datetime, suffix: str) -> str:
+    return f"{activate_at.astimezone(timezone.utc).strftime(KID_TIME_FORMAT)}-{suffix}"
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+
+    raise KeyRingException(f"Unsupported algorithm {algorithm}")
+
+
+def private_key_to_pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+class SigningKey:
+    __slots__ = ("kid", "algorithm", "private_key", "public_key", "activate_at")
+
+    def __init__(self, kid: str, private_key) -> None:
+        self.kid = kid
+        self.algorithm = get_key_algorithm(private_key)
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.activate_at = parse_kid_activation(kid)
+
+    def to_jwk(self) -> Dict[str, Any]:
+        _, algorithm_class = ALGORITHMS[self.algorithm]
+
+        jwk = algorithm_class.to_jwk(self.public_key, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+
+        return jwk
+
+
+class KeyRing:
+    """Signing keys indexed by `kid`, parsed once and kept in memory.
+
+    The signing key is the newest key whose activation time has passed, so a key can be
+    published in the JWKS ahead of time and verifiers pick it up before the first token
+    signed with it. Retired keys stay in the ring for verification until their file is
+    removed.
+    """
+
+    def __init__(self, keys: List[SigningKey]) -> None:
+        self.keys = {key.kid: key for key in keys}
+        self._by_activation = sorted(keys, key=lambda key: key.activate_at, reverse=True)
+
+        self.jwks_body = json.dumps(
+            {"keys": [key.to_jwk() for key in self._by_activation]}, separators=(",", ":")
+        ).encode("utf-8")
+        self.jwks_etag = make_weak_etag("jwks", *self.keys)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def get(self, kid: str) -> Optional[SigningKey]:
+        return self.keys.get(kid)
+
+    def signing_key(self, now: Optional[datetime] = None) -> Optional[SigningKey]:
+        now = now or datetime.now(timezone.utc)
+
+        for key in self._by_activation:
+            if key.activate_at <= now:
+                return key
+
+        return None
+
+
+def load_key_ring(keys_dir: str) -> KeyRing:
+    keys = []
+
+    if keys_dir and os.path.isdir(keys_dir):
+        for filename in sorted(os.listdir(keys_dir)):
+            if not filename.endswith(".pem"):
+                continue
+
+            with open(os.path.join(keys_dir, filename), "rb") as key_file:
+                private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+
+            keys.append(SigningKey(kid=filename[: -len(".pem")], private_key=private_key))
+
+    return KeyRing(keys)
+
+
+def write_key(keys_dir: str, algorithm: str, activate_at: datetime) -> str:
+    kid = new_kid(activate_at, secrets.token_hex(4))
+    key_path = os.path.join(keys_dir, f"{kid}.pem")
+
+    os.makedirs(keys_dir, exist_ok=True)
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as key_file:
+        key_file.write(private_key_to_pem(generate_private_key(algorithm)))
+
+    return kid
+
+
+def rotate_keys(
+    keys_dir: str,
+    algorithm: str,
+    rotation_period: timedelta,
+    lead_time: timedelta,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Schedules the next key `lead_time` ahead and retires superseded keys.
+
+    A key is deleted once a newer key has been active for longer than the refresh
+    token lifetime, so every token it signed has expired.
+    """
+    now = now or datetime.now(timezone.utc)
+    ring = load_key_ring(keys_dir)
+    keys = sorted(ring.keys.values(), key=lambda key: key.activate_at)
+    changes = []
+
+    newest = keys[-1] if keys else None
+    if newest is None:
+        changes.append(write_key(keys_dir, algorithm, now))
+    elif newest.activate_at + rotation_period - lead_time <= now:
+        activate_at = max(newest.activate_at + rotation_period, now + lead_time)
+        changes.append(write_key(keys_dir, algorithm, activate_at))
+
+    retire_before = now - timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    for key, next_key in zip(keys, keys[1:]):
+        if next_key.activate_at < retire_before:
+            os.remove(os.path.join(keys_dir, f"{key.kid}.pem"))
+            changes.append(key.kid)
+
+    return changes
+
+
+class KeyRingProvider:
+    # Reloads the ring when the key directory changes, checked at most every `interval`
+    def __init__(self, keys_dir: str, interval: float) -> None:
+        self.keys_dir = keys_dir
+        self.interval = interval
+        self._ring: Optional[KeyRing] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _dir_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.keys_dir).st_mtime
+        except OSError:
+            return None
+
+    def get(self) -> KeyRing:
+        now = time.monotonic()
+
+        if self._ring is not None and now - self._checked_at < self.interval:
+            return self._ring
+
+        with self._lock:
+            self._checked_at = now
+            mtime = self._dir_mtime() if self.keys_dir else None
+
+            if self._ring is None or mtime != self._mtime:
+                self._ring = load_key_ring(self.keys_dir)
+                self._mtime = mtime
+                logger.info(f"JWT key ring loaded with kids {list(self._ring.keys)}")
+
+        return self._ring
+
+
+key_ring_provider = KeyRingProvider(
+    keys_dir=settings.JWT_KEYS_DIR, interval=settings.JWT_KEY_RING_RELOAD_SECONDS
+)
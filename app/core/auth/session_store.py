@@ -0,0 +1,159 @@
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import redis
+
+from app.core.config import REFRESH_TOKEN_EXPIRE_DAYS, settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+RSTR_KEY = "auth:rstr:{user_id}"
+INVALIDATION_CHANNEL = "auth:rstr:invalidate"
+RSTR_KEY_TTL_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+
+class SessionStore:
+    """Current `rstr` (session epoch) of every user.
+
+    Tokens carry the `rstr` they were issued with, rotating it revokes every token of
+    the user. Lookups are served from a short-TTL local mirror, then Redis, and only
+    fall back to the database loader on a cold cache. Rotations are published so every
+    API worker updates its mirror immediately.
+    """
+
+    def __init__(self, local_ttl: float) -> None:
+        self.local_ttl = local_ttl
+        self._local: Dict[int, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[redis.client.PubSubWorkerThread] = None
+
+    def _get_local(self, user_id: int) -> Optional[str]:
+        item = self._local.get(user_id)
+
+        if item is None or item[0] < time.monotonic():
+            return None
+
+        return item[1]
+
+    def _set_local(self, user_id: int, rstr: str) -> None:
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.local_ttl, rstr)
+
+    def get_current(self, user_id: int) -> Optional[str]:
+        rstr = self._get_local(user_id)
+        if rstr is not None:
+            return rstr
+
+        client = get_redis()
+        if client is None:
+            return None
+
+        try:
+            rstr = client.get(RSTR_KEY.format(user_id=user_id))
+        except redis.RedisError as e:
+            logger.warning(f"Session store read failed. Error {e}")
+            return None
+
+        if rstr is not None:
+            self._set_local(user_id, rstr)
+
+        return rstr
+
+    def set_current(self, user_id: int, rstr: str, publish: bool = True) -> None:
+        self._set_local(user_id, rstr)
+
+        client = get_redis()
+        if client is None:
+            return
+
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.set(RSTR_KEY.format(user_id=user_id), rstr, ex=RSTR_KEY_TTL_SECONDS)
+            if publish:
+                pipe.publish(INVALIDATION_CHANNEL, f"{user_id}:{rstr}")
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Session store write failed. Error {e}")
+
+    def fill(self, user_id: int, rstr: str) -> str:
+        """Caches an `rstr` read from the database. It may be stale by now: it doesn't
+        overwrite a rotation written meanwhile, whose value is returned instead."""
+        client = get_redis()
+        if client is None:
+            self._set_local(user_id, rstr)
+            return rstr
+
+        key = RSTR_KEY.format(user_id=user_id)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.set(key, rstr, ex=RSTR_KEY_TTL_SECONDS, nx=True)
+            pipe.get(key)
+            _, current = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Session store write failed. Error {e}")
+            return rstr
+
+        current = current or rstr
+        self._set_local(user_id, current)
+
+        return current
+
+    def is_current(self, user_id: int, rstr: str, loader: Callable[[], Optional[str]]) -> bool:
+        current = self.get_current(user_id)
+
+        if current is None:
+            current = loader()
+
+            if current is None:
+                return False
+
+            current = self.fill(user_id, current)
+
+        return secrets.compare_digest(current, rstr)
+
+    def _handle_invalidation(self, message) -> None:
+        user_id, _, rstr = message["data"].partition(":")
+
+        try:
+            self._set_local(int(user_id), rstr)
+        except ValueError:
+            logger.warning(f"Invalid session invalidation message {message['data']}")
+
+    def start_listener(self) -> None:
+        client = get_redis()
+        if client is None or self._listener is not None:
+            return
+
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._handle_invalidation})
+        except redis.RedisError as e:
+            logger.warning(f"Session invalidation listener not started. Error {e}")
+            return
+
+        self._listener = pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=self._handle_listener_error
+        )
+
+    def _handle_listener_error(self, e: Exception, pubsub, thread) -> None:
+        # The local mirror TTL bounds staleness while Redis is unreachable
+        logger.warning(f"Session invalidation listener error. Error {e}")
+        time.sleep(1.0)
+
+    def stop_listener(self) -> None:
+        if self._listener is None:
+            return
+
+        self._listener.stop()
+        self._listener = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+session_store = SessionStore(local_ttl=settings.AUTH_RSTR_LOCAL_TTL_SECONDS)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import anyio
+import anyio.to_thread
+
+from app.core.admission import admission_controller
+from app.core.config import settings
+from app.core.db.session import get_engine
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+threadpool_tokens = registry.gauge("threadpool_tokens", "Threadpool capacity (anyio tokens)")
+threadpool_borrowed = registry.gauge("threadpool_borrowed_tokens", "Threads currently in use")
+threadpool_waiting = registry.gauge("threadpool_waiting_tasks", "Calls queued for a thread")
+threadpool_wait_seconds = registry.histogram(
+    "threadpool_wait_seconds", "Queue wait of a probe call sent to the threadpool"
+)
+pool_capacity = registry.gauge("db_pool_capacity", "pool_size + max_overflow")
+pool_checked_out = registry.gauge("db_pool_checked_out", "Connections currently checked out")
+event_loop_lag = registry.gauge("event_loop_lag_seconds", "Oversleep of the monitor's sleep")
+
+SATURATION_LOG_INTERVAL_SECONDS = 10.0
+
+
+def get_pool_capacity() -> int:
+    return settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+def get_threadpool_tokens() -> int:
+    # Every sync dependency/handler holds at most one connection, so more threads than
+    # connections only moves the queue from the limiter into `pool_timeout`
+    return settings.THREADPOOL_TOKENS or get_pool_capacity()
+
+
+def configure_threadpool() -> int:
+    tokens = get_threadpool_tokens()
+
+    if tokens > get_pool_capacity():
+        logger.warning(
+            f"THREADPOOL_TOKENS={tokens} exceeds the DB pool capacity {get_pool_capacity()}, "
+            f"threads can block up to DB_POOL_TIMEOUT={settings.DB_POOL_TIMEOUT}s on checkout"
+        )
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = tokens
+
+    threadpool_tokens.set(tokens)
+    pool_capacity.set(get_pool_capacity())
+
+    return tokens
+
+
+class CapacityMonitor:
+    """Samples threadpool and DB pool usage and logs sustained saturation."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._last_warning = 0.0
+
+    async def probe_threadpool(self) -> float:
+        start = time.perf_counter()
+        await anyio.to_thread.run_sync(time.perf_counter)
+        waited = time.perf_counter() - start
+
+        threadpool_wait_seconds.observe(waited)
+        admission_controller.observe_threadpool_wait(waited)
+
+        return waited
+
+    async def sample(self) -> None:
+        statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+        threadpool_borrowed.set(statistics.borrowed_tokens)
+        threadpool_waiting.set(statistics.tasks_waiting)
+
+        checked_out = get_engine().pool.checkedout()
+        pool_checked_out.set(checked_out)
+
+        waited = await self.probe_threadpool()
+
+        saturated = statistics.tasks_waiting > 0 or checked_out >= get_pool_capacity()
+        now = time.monotonic()
+
+        if saturated and now - self._last_warning > SATURATION_LOG_INTERVAL_SECONDS:
+            self._last_warning = now
+            logger.warning(
+                f"Capacity saturated: threads {statistics.borrowed_tokens}/"
+                f"{statistics.total_tokens} with {statistics.tasks_waiting} waiting "
+                f"(probe {waited:.3f}s), DB connections {checked_out}/{get_pool_capacity()}"
+            )
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.warning(f"Capacity monitor sample failed. Error {e}")
+
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+
+            # Anything blocking the loop delays this wake up by as much
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            event_loop_lag.set(lag)
+            admission_controller.observe_loop_lag(lag)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+capacity_monitor = CapacityMonitor(interval=settings.CAPACITY_MONITOR_INTERVAL_SECONDS)
@@ -1,5 +1,7 @@
 import os
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,6 +9,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Outside MEDIA_ROOT (which is served), keep it on the same filesystem for zero-copy assembly
+UPLOAD_STAGING_DIR = os.path.join(BASE_DIR, "upload_staging")
 
 JWT_ALGORITHM: str = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES: int = 3600
@@ -17,6 +21,8 @@ FORGOT_PASSWORD_EXPIRE_MINUTES: int = 100
 
 DOTENV = os.path.join(BASE_DIR, ".env")
 
+TEXT_COMPRESSION_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
 
 class Settings(BaseSettings):
     DEBUG: bool = True
@@ -24,13 +30,164 @@ class Settings(BaseSettings):
     APP_HOST: str = ""
     API_HOST: str = ""
     JWT_SECRET_KEY: str = ""
+    # Directory of "<kid>.pem" EdDSA/ES256 keys, HS256 with JWT_SECRET_KEY when empty
+    JWT_KEYS_DIR: str = ""
+    JWT_KEY_ALGORITHM: str = "EdDSA"
+    JWT_KEY_ROTATION_DAYS: int = 30
+    JWT_KEY_ROTATION_LEAD_HOURS: int = 24
+    JWT_KEY_RING_RELOAD_SECONDS: float = 60.0
+    # Once keys are configured, HS256 tokens without a kid are accepted until then. By
+    # default until the refresh token lifetime has passed since the oldest key activated.
+    JWT_SECRET_KEY_TOKENS_UNTIL: Optional[datetime] = None
+
+    # New hashes use PASSWORD_HASHER ("bcrypt" or "argon2id", which needs argon2-cffi),
+    # hashes of the other one or with a lower cost are rehashed on login
+    PASSWORD_HASHER: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    # Every concurrent argon2id hash holds ARGON2_MEMORY_COST_KIB of memory
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST_KIB: int = 64 * 1024
+    ARGON2_PARALLELISM: int = 1
+    # Seconds one hash should take, the default hasher's cost is calibrated to it during
+    # the startup warmup. 0 keeps the costs above.
+    PASSWORD_HASH_TARGET_SECONDS: float = 0.0
+    JWKS_MAX_AGE_SECONDS: int = 300
     ALLOWED_HOSTS: str = "*"
 
+    # postgresql+psycopg2://... or postgresql+psycopg://... (psycopg 3)
     DB_URL: str = ""
+    # psycopg 3 prepares a statement server-side once it ran this many times on a connection
+    DB_PREPARE_THRESHOLD: int = 2
+    # PgBouncer transaction pooling, connections change between transactions so nothing
+    # is prepared server-side
+    DB_PGBOUNCER_MODE: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_WAIT_WARNING_SECONDS: float = 1.0
+    # Server-side limits per statement, routes can override them with RouteTimeout
+    DB_STATEMENT_TIMEOUT_SECONDS: float = 30.0
+    DB_LOCK_TIMEOUT_SECONDS: float = 5.0
+    # Cancels the DB work of a request running longer than this, 0 disables it
+    REQUEST_DEADLINE_SECONDS: float = 0.0
+
+    # Migration DDL waiting longer than this for a lock is aborted rather than queueing
+    # the traffic behind it (see app/core/db/migrations.py). Backfill batches are retried.
+    MIGRATION_LOCK_TIMEOUT_SECONDS: float = 5.0
+    MIGRATION_LOCK_RETRIES: int = 3
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000
+    MIGRATION_BACKFILL_PAUSE_SECONDS: float = 0.1
+
+    UPLOAD_MAX_SIZE: int = 5 * 1024**3
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024**2
+    UPLOAD_MIN_CHUNK_SIZE: int = 256 * 1024
+    UPLOAD_MAX_CHUNK_SIZE: int = 64 * 1024**2
+    UPLOAD_SESSION_EXPIRE_HOURS: int = 24
+
+    # Derivatives generated for uploaded images, served with /media/<path>?variant=<name>.
+    # "size" bounds the output ("crop" fills it exactly), "format" is webp, avif, jpeg or png.
+    IMAGE_VARIANTS: Dict[str, Dict[str, Any]] = {
+        "thumb_128": {"size": [128, 128], "crop": True, "format": "webp", "quality": 80},
+        "thumb_512": {"size": [512, 512], "format": "webp", "quality": 80},
+        "webp": {"format": "webp", "quality": 85},
+    }
+    # Processes rendering variants in each media worker, 0 uses the CPU count
+    IMAGE_PROCESS_POOL_SIZE: int = 0
+
+    # Upper bound on how stale buffered columns such as user.last_login can be
+    WRITE_BEHIND_FLUSH_SECONDS: float = 30.0
+    WRITE_BEHIND_BATCH_SIZE: int = 1000
+
+    # Auth audit events, buffered in each API worker and written in batches
+    AUDIT_FLUSH_SECONDS: float = 1.0
+    AUDIT_BATCH_SIZE: int = 5000
+    # Events beyond this many waiting for the flusher go straight to the spill file
+    AUDIT_BUFFER_SIZE: int = 100000
+    AUDIT_SPILL_DIR: str = os.path.join(BASE_DIR, "audit_spill")
+
+    # Monthly partitions created ahead of the current month by the maintenance job
+    PARTITION_MONTHS_AHEAD: int = 2
+    # Table -> months of partitions kept, tables not listed keep all of theirs
+    PARTITION_RETENTION_MONTHS: Dict[str, int] = {"auth_event": 13, "forgot_password": 3}
+    # Detach expired partitions instead of dropping them, e.g. to archive them
+    PARTITION_DETACH_EXPIRED: bool = False
+
+    # anyio threadpool tokens, 0 sizes it to the DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    THREADPOOL_TOKENS: int = 0
+    CAPACITY_MONITOR_INTERVAL_SECONDS: float = 1.0
+    # /metrics answers clients in these comma separated IPs/networks, or sending
+    # "Authorization: Bearer <METRICS_TOKEN>" (empty disables the token)
+    METRICS_ALLOWED_IPS: str = "127.0.0.1,::1"
+    METRICS_TOKEN: str = ""
+
+    # Load shedding by route priority (see app/core/admission.py)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_TARGET_LATENCY_SECONDS: float = 1.0
+    # Target of DB pool checkout wait, threadpool queue wait and event loop lag
+    ADMISSION_TARGET_QUEUE_WAIT_SECONDS: float = 0.1
+    ADMISSION_SHED_NORMAL_PRESSURE: float = 2.0
+    # In-flight requests above which everything but CRITICAL routes is shed, 0 disables it
+    ADMISSION_MAX_IN_FLIGHT: int = 0
+    ADMISSION_SIGNAL_HALF_LIFE_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+
+    # Background warmup before /readyz reports ready, 0 connections means DB_POOL_SIZE
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 0
+    WARMUP_RETRY_SECONDS: float = 5.0
+
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    # Records beyond this many waiting for the writer thread are dropped and counted
+    LOG_QUEUE_SIZE: int = 10000
+    # Logger name -> fraction of its records kept below WARNING, e.g. {"app.access": 0.1}
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+    # OpenTelemetry, needs the "tracing" extra. Sampled per trace at the root span.
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATIO: float = 0.05
+    TRACING_SERVICE_NAME: str = "fastapi-sql-boilerplate"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+
+    # Sampling profiler, PROFILER_SECRET signs X-Profile headers (empty disables them)
+    PROFILER_INTERVAL_SECONDS: float = 0.005
+    PROFILER_MAX_SECONDS: float = 60.0
+    PROFILER_SECRET: str = ""
+
+    REDIS_URL: str = ""
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+
+    # Idempotency-Key responses, in Redis or in-process without it
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    # A claim outlives a crashed request by this much, duplicates wait for it up to WAIT
+    IDEMPOTENCY_LOCK_TTL_SECONDS: float = 60.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 64 * 1024
 
     CELERY_BROKER_URL: str = ""
     CELERY_BACKEND_URL: str = ""
     CELERY_CONCURRENCY: int = 2
+    # Queue name -> QueueProfile overrides, e.g. {"email": {"prefetch_multiplier": 8}}
+    CELERY_QUEUE_OPTIONS: Dict[str, Dict[str, Any]] = {}
+
+    ETAG_STAMP_CACHE_SECONDS: float = 5.0
+    # Least recently used stamps are evicted past this many (table, pk) entries
+    ETAG_STAMP_CACHE_SIZE: int = 10_000
+    AUTH_RSTR_LOCAL_TTL_SECONDS: float = 5.0
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 500
+    # Media type, "type/" prefix or "+suffix" -> level per encoding.
+    # Media types that are not listed (images, archives...) are never compressed.
+    COMPRESSION_LEVELS: Dict[str, Dict[str, int]] = {
+        "application/json": TEXT_COMPRESSION_LEVELS,
+        "application/javascript": TEXT_COMPRESSION_LEVELS,
+        "application/xml": TEXT_COMPRESSION_LEVELS,
+        "image/svg+xml": TEXT_COMPRESSION_LEVELS,
+        "text/": TEXT_COMPRESSION_LEVELS,
+        "+json": TEXT_COMPRESSION_LEVELS,
+        "+xml": TEXT_COMPRESSION_LEVELS,
+    }
 
     model_config = SettingsConfigDict(env_file=DOTENV)
 
@@ -0,0 +1,212 @@
+import logging
+import threading
+from typing import Any, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.exceptions import CustomException
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+cancelled_requests_total = registry.counter(
+    "requests_cancelled_total", "Requests whose DB work was cancelled", labels=("reason",)
+)
+cancelled_queries_total = registry.counter(
+    "db_queries_cancelled_total", "Running queries cancelled at the backend", labels=("reason",)
+)
+
+REASON_DEADLINE = "deadline"
+REASON_DISCONNECT = "disconnect"
+REASON_STATEMENT_TIMEOUT = "statement_timeout"
+REASON_LOCK_TIMEOUT = "lock_timeout"
+
+# SQLSTATE of a cancelled statement (statement_timeout or a cancel request) and lock_timeout
+QUERY_CANCELED = "57014"
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+class DatabaseTimeoutException(CustomException):
+    code = 504
+    error_code = "DATABASE_TIMEOUT"
+    message = "The request took too long and was cancelled"
+
+
+class ClientClosedRequestException(CustomException):
+    code = 499
+    error_code = "CLIENT_CLOSED_REQUEST"
+    message = "The client closed the request"
+
+
+class QueryCanceller:
+    """Cancels the database work of one request.
+
+    Sessions of the request attach their connection on BEGIN and detach it before it is
+    returned to the pool. `cancel` runs from any thread (deadline timer, disconnect
+    watcher): it sends a cancel request for the running query and makes every later
+    statement of the request fail fast.
+    """
+
+    def __init__(self) -> None:
+        self.reason: Optional[str] = None
+        self._connections: List[Any] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def attach(self, driver_connection: Any) -> None:
+        with self._lock:
+            self._connections.append(driver_connection)
+
+    def detach(self, driver_connection: Any) -> None:
+        with self._lock:
+            if driver_connection in self._connections:
+                self._connections.remove(driver_connection)
+
+    def start_deadline(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._timer = threading.Timer(seconds, self.cancel, args=(REASON_DEADLINE,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def cancel(self, reason: str) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+
+            self.reason = reason
+            cancelled_requests_total.inc(labels={"reason": reason})
+
+            for driver_connection in self._connections:
+                try:
+                    driver_connection.cancel()
+                    cancelled_queries_total.inc(labels={"reason": reason})
+                except Exception as e:
+                    logger.warning(f"Query cancel request failed. Error {e}")
+
+    def raise_if_cancelled(self) -> None:
+        if self.reason == REASON_DISCONNECT:
+            raise ClientClosedRequestException
+        if self.cancelled:
+            raise DatabaseTimeoutException
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        with self._lock:
+            self._connections.clear()
+
+
+def get_sqlstate(error: exc.DBAPIError) -> Optional[str]:
+    # psycopg2 exposes `pgcode`, psycopg 3 `sqlstate`
+    orig = error.orig
+    return getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+
+
+def cancellation_exception(
+    error: exc.DBAPIError, canceller: Optional[QueryCanceller]
+) -> Optional[CustomException]:
+    sqlstate = get_sqlstate(error)
+    if sqlstate not in (QUERY_CANCELED, LOCK_NOT_AVAILABLE):
+        return None
+
+    if canceller is not None and canceller.reason == REASON_DISCONNECT:
+        return ClientClosedRequestException()
+
+    if canceller is None or not canceller.cancelled:
+        # Ended by statement_timeout/lock_timeout on the server
+        reason = REASON_STATEMENT_TIMEOUT if sqlstate == QUERY_CANCELED else REASON_LOCK_TIMEOUT
+        cancelled_queries_total.inc(labels={"reason": reason})
+
+    return DatabaseTimeoutException()
+
+
+def to_milliseconds(seconds: float) -> int:
+    return int(seconds * 1000)
+
+
+SET_LOCAL_TIMEOUTS = sa.text(
+    "SELECT set_config('statement_timeout', :statement_timeout, true), "
+    "set_config('lock_timeout', :lock_timeout, true)"
+)
+
+
+def set_local_timeouts(connection, statement_timeout: float, lock_timeout: float) -> None:
+    # SET LOCAL as one statement, so it can be prepared and pipelined like any other
+    connection.execute(
+        SET_LOCAL_TIMEOUTS,
+        {
+            "statement_timeout": str(to_milliseconds(statement_timeout)),
+            "lock_timeout": str(to_milliseconds(lock_timeout)),
+        },
+    )
+
+
+def set_session_timeouts(
+    session: Session,
+    statement_timeout: Optional[float] = None,
+    lock_timeout: Optional[float] = None,
+) -> None:
+    # Overrides the connection defaults for every transaction of `session`
+    if statement_timeout is not None:
+        session.info["statement_timeout"] = statement_timeout
+    if lock_timeout is not None:
+        session.info["lock_timeout"] = lock_timeout
+
+    if session.in_transaction():
+        set_local_timeouts(session.connection(), *get_session_timeouts(session))
+
+
+def get_session_timeouts(session: Session):
+    return (
+        session.info.get("statement_timeout", settings.DB_STATEMENT_TIMEOUT_SECONDS),
+        session.info.get("lock_timeout", settings.DB_LOCK_TIMEOUT_SECONDS),
+    )
+
+
+def register_cancellation_events(factory: sessionmaker) -> None:
+    @event.listens_for(factory, "after_begin")
+    def after_begin(session: Session, transaction, connection) -> None:
+        canceller: Optional[QueryCanceller] = session.info.get("canceller")
+        if canceller is not None:
+            canceller.raise_if_cancelled()
+
+            driver_connection = connection.connection.driver_connection
+            canceller.attach(driver_connection)
+            session.info.setdefault("attached_connections", []).append(driver_connection)
+
+        # Defaults come with the connection (startup options), except behind PgBouncer
+        overridden = "statement_timeout" in session.info or "lock_timeout" in session.info
+        if overridden or settings.DB_PGBOUNCER_MODE:
+            set_local_timeouts(connection, *get_session_timeouts(session))
+
+    @event.listens_for(factory, "do_orm_execute")
+    def do_orm_execute(orm_execute_state) -> None:
+        canceller: Optional[QueryCanceller] = orm_execute_state.session.info.get("canceller")
+        if canceller is not None:
+            canceller.raise_if_cancelled()
+
+    event.listen(factory, "after_commit", detach_session)
+    event.listen(factory, "after_rollback", detach_session)
+
+
+def detach_session(session: Session) -> None:
+    # Before the connection goes back to the pool, a late cancel must not hit its next user
+    canceller: Optional[QueryCanceller] = session.info.get("canceller")
+
+    for driver_connection in session.info.pop("attached_connections", []):
+        if canceller is not None:
+            canceller.detach(driver_connection)
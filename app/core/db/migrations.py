@@ -0,0 +1,245 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import exc
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.core.db.cancellation import LOCK_NOT_AVAILABLE, get_sqlstate, to_milliseconds
+from app.core.db.partitions import list_partitions
+
+# Under the "alembic" logger configured in alembic.ini, shown by the alembic command
+logger = logging.getLogger("alembic.online_ddl")
+
+MAX_IDENTIFIER_LENGTH = 63
+
+SET_LOCK_TIMEOUT = sa.text("SELECT set_config('lock_timeout', :lock_timeout, false)")
+
+
+def set_lock_timeout(connection: Connection, seconds: float) -> None:
+    # Session level, it also applies in autocommit blocks. 0 waits forever.
+    connection.execute(SET_LOCK_TIMEOUT, {"lock_timeout": f"{to_milliseconds(seconds)}ms"})
+
+
+@contextmanager
+def lock_timeout(seconds: float) -> Iterator[None]:
+    """Overrides MIGRATION_LOCK_TIMEOUT_SECONDS for the operations of the block, e.g. a
+    rarely written table that can wait longer."""
+    connection = op.get_bind()
+    previous = connection.scalar(sa.text("SELECT current_setting('lock_timeout')"))
+
+    set_lock_timeout(connection, seconds)
+    try:
+        yield
+    finally:
+        connection.execute(SET_LOCK_TIMEOUT, {"lock_timeout": previous})
+
+
+def truncate_identifier(name: str) -> str:
+    return name[:MAX_IDENTIFIER_LENGTH]
+
+
+def is_partitioned_table(connection: Connection, table: str) -> bool:
+    stmt = sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)")
+    return connection.scalar(stmt, {"table": f'"{table}"'}) == "p"
+
+
+def get_index_state(connection: Connection, name: str) -> Optional[bool]:
+    # None when there is no such index, False when a failed CONCURRENTLY build left it
+    stmt = sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)")
+    return connection.scalar(stmt, {"name": f'"{name}"'})
+
+
+def is_attached(connection: Connection, child: str, parent: str) -> bool:
+    stmt = sa.text(
+        "SELECT 1 FROM pg_inherits"
+        " WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent)"
+    )
+    return connection.scalar(stmt, {"child": f'"{child}"', "parent": f'"{parent}"'}) is not None
+
+
+def get_partition_index_name(name: str, table: str, partition: str) -> str:
+    # ix_forgot_password_token -> ix_forgot_password_p202610_token
+    if table in name:
+        return truncate_identifier(name.replace(table, partition, 1))
+    return truncate_identifier(f"{name}_{partition[len(table) + 1 :]}")
+
+
+def compile_create_index(
+    connection: Connection, name: str, table: str, columns: Sequence[str], only: bool, **kw: Any
+) -> str:
+    columns_table = sa.Table(table, sa.MetaData(), *[sa.Column(column) for column in columns])
+    index = sa.Index(name, *[columns_table.c[column] for column in columns], **kw)
+    ddl = str(sa.schema.CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+
+    if only:
+        quoted = connection.dialect.identifier_preparer.format_table(columns_table)
+        ddl = ddl.replace(f" ON {quoted} ", f" ON ONLY {quoted} ", 1)
+
+    return ddl
+
+
+def _drop_invalid_index(connection: Connection, name: str) -> None:
+    if get_index_state(connection, name) is False:
+        logger.info(f"Dropping invalid index {name} left by a failed build")
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def create_index_concurrently(name: str, table: str, columns: Sequence[str], **kw: Any) -> None:
+    """CREATE INDEX CONCURRENTLY outside of the migration's transaction, writes to the
+    table go on while the index builds. An invalid index left by a failed attempt is
+    rebuilt, so the migration can simply be run again.
+
+    Partitioned tables can't be indexed concurrently: the index is created on the parent
+    only (invalid until complete), built concurrently on each partition and attached to
+    it. Partitions created later get it from the parent. `columns` are column names,
+    `kw` the sa.Index options (unique, postgresql_using, postgresql_where...).
+    """
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+
+        if not is_partitioned_table(connection, table):
+            _drop_invalid_index(connection, name)
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw
+            )
+            return
+
+        op.execute(compile_create_index(connection, name, table, columns, only=True, **kw))
+
+        for partition in list_partitions(connection, table):
+            partition_index = get_partition_index_name(name, table, partition)
+            _drop_invalid_index(connection, partition_index)
+            op.create_index(
+                partition_index,
+                partition,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kw,
+            )
+
+            if not is_attached(connection, partition_index, name):
+                op.execute(f'ALTER INDEX "{name}" ATTACH PARTITION "{partition_index}"')
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+
+        if is_partitioned_table(connection, table):
+            # Not supported CONCURRENTLY, it only takes the lock for the catalog update
+            op.drop_index(name, table_name=table, if_exists=True)
+        else:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def validate_constraint(name: str, table: str) -> None:
+    # In its own transaction, SHARE UPDATE EXCLUSIVE doesn't block reads nor writes
+    with op.get_context().autocommit_block():
+        op.execute(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT "{name}"')
+
+
+def add_check_constraint(name: str, table: str, condition: str) -> None:
+    """Adds the constraint NOT VALID, without scanning the table under the ACCESS
+    EXCLUSIVE lock of ALTER TABLE, then validates the existing rows."""
+    op.create_check_constraint(name, table, condition, postgresql_not_valid=True)
+    validate_constraint(name, table)
+
+
+def add_foreign_key(
+    name: str,
+    source: str,
+    referent: str,
+    local_columns: Sequence[str],
+    remote_columns: Sequence[str],
+    **kw: Any,
+) -> None:
+    # NOT VALID on partitioned tables needs PostgreSQL 18, use op.create_foreign_key there
+    op.create_foreign_key(
+        name, source, referent, local_columns, remote_columns, postgresql_not_valid=True, **kw
+    )
+    validate_constraint(name, source)
+
+
+def set_not_null(table: str, column: str) -> None:
+    """SET NOT NULL without its full table scan: a validated CHECK (column IS NOT NULL)
+    already proves it, the check is dropped afterwards."""
+    check = truncate_identifier(f"ck_{table}_{column}_not_null")
+
+    add_check_constraint(check, table, f'"{column}" IS NOT NULL')
+    op.alter_column(table, column, nullable=False)
+    op.drop_constraint(check, table, type_="check")
+
+
+def execute_with_retries(
+    connection: Connection, statement: sa.TextClause, parameters: Dict[str, Any]
+) -> sa.CursorResult:
+    retries = settings.MIGRATION_LOCK_RETRIES
+
+    for attempt in range(retries + 1):
+        try:
+            return connection.execute(statement, parameters)
+        except exc.DBAPIError as e:
+            if get_sqlstate(e) != LOCK_NOT_AVAILABLE or attempt == retries:
+                raise
+
+            delay = settings.MIGRATION_LOCK_TIMEOUT_SECONDS * 2**attempt
+            logger.warning(f"Lock timeout, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+
+
+def backfill(
+    table: str,
+    values: str,
+    where: str,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+    key: str = "id",
+) -> int:
+    """Runs `UPDATE table SET values WHERE where` in batches of `batch_size` `key`s, each
+    committed on its own so row locks are held briefly and replicas keep up. Sleeps
+    `pause` between batches and logs the progress, a batch hitting the lock timeout is
+    retried.
+
+    The key range is read once, rows inserted afterwards aren't visited: the application
+    should write the new values before the backfill runs. Returns the rows updated.
+    """
+    if batch_size is None:
+        batch_size = settings.MIGRATION_BACKFILL_BATCH_SIZE
+    if pause is None:
+        pause = settings.MIGRATION_BACKFILL_PAUSE_SECONDS
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        low, high = connection.execute(
+            sa.text(f'SELECT min("{key}"), max("{key}") FROM "{table}" WHERE {where}')
+        ).one()
+        if low is None:
+            return 0
+
+        update = sa.text(
+            f'UPDATE "{table}" SET {values}'
+            f' WHERE "{key}" >= :start AND "{key}" < :end AND ({where})'
+        )
+        started = time.monotonic()
+        updated = 0
+
+        for start in range(low, high + 1, batch_size):
+            end = start + batch_size
+            updated += execute_with_retries(
+                connection, update, {"start": start, "end": end}
+            ).rowcount
+
+            progress = (min(end, high + 1) - low) / (high + 1 - low)
+            elapsed = time.monotonic() - started
+            logger.info(f"Backfill of {table}: {progress:.0%}, {updated} rows in {elapsed:.0f}s")
+
+            if pause and end <= high:
+                time.sleep(pause)
+
+    return updated
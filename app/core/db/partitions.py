@@ -0,0 +1,170 @@
+import logging
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# "<table>_p202610" holds the rows of October 2026
+PARTITION_SUFFIX_PATTERN = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def get_partition_month(table: str, name: str) -> Optional[date]:
+    match = PARTITION_SUFFIX_PATTERN.search(name)
+    if match is None or name[: match.start()] != table:
+        return None
+
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def is_partitioned(table: sa.Table) -> bool:
+    return bool(table.dialect_options["postgresql"]["partition_by"])
+
+
+def is_partition(name: str, metadata: sa.MetaData) -> bool:
+    return any(
+        is_partitioned(table) and get_partition_month(table.name, name) is not None
+        for table in metadata.tables.values()
+    )
+
+
+def list_partitions(connection: Connection, table: str) -> List[str]:
+    stmt = sa.text(
+        "SELECT child.relname FROM pg_inherits"
+        " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+        " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+        " WHERE parent.oid = to_regclass(:table)"
+        " ORDER BY child.relname"
+    )
+    return list(connection.scalars(stmt, {"table": f'"{table}"'}))
+
+
+def create_monthly_partition(connection: Connection, table: str, month: date) -> str:
+    name = get_partition_name(table, month)
+    connection.execute(
+        sa.text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}"'
+            f" FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+    )
+    return name
+
+
+def ensure_monthly_partitions(
+    connection: Connection,
+    table: str,
+    months_ahead: Optional[int] = None,
+    today: Optional[date] = None,
+    since: Optional[date] = None,
+) -> List[str]:
+    """Creates the partitions of the current month and of the next `months_ahead`
+    ones (and of every month from `since` on), rows of a month without a partition
+    are rejected by PostgreSQL."""
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+
+    current = month_start(today or date.today())
+    month = min(month_start(since), current) if since is not None else current
+    last = add_months(current, months_ahead)
+    existing = set(list_partitions(connection, table))
+
+    created = []
+    while month <= last:
+        if get_partition_name(table, month) not in existing:
+            created.append(create_monthly_partition(connection, table, month))
+        month = add_months(month, 1)
+
+    return created
+
+
+def expire_monthly_partitions(
+    connection: Connection,
+    table: str,
+    keep_months: int,
+    detach: bool = False,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Drops the partitions of months older than the last `keep_months`, a metadata
+    only operation whatever the number of rows. Detached ones are kept as standalone
+    tables, e.g. to be archived."""
+    oldest_kept = add_months(month_start(today or date.today()), -(keep_months - 1))
+
+    expired = []
+    for name in list_partitions(connection, table):
+        month = get_partition_month(table, name)
+        if month is None or month >= oldest_kept:
+            continue
+
+        if detach:
+            connection.execute(sa.text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        else:
+            connection.execute(sa.text(f'DROP TABLE "{name}"'))
+        expired.append(name)
+
+    return expired
+
+
+def maintain_partitions(
+    session: Session, metadata: sa.MetaData, expire: bool = True
+) -> Dict[str, Dict[str, List]]:
+    """Creates the upcoming partitions of every partitioned table of `metadata` and,
+    with `expire`, expires the old ones of those listed in PARTITION_RETENTION_MONTHS."""
+    changes = {}
+
+    for table in metadata.sorted_tables:
+        if not is_partitioned(table):
+            continue
+
+        keep_months = settings.PARTITION_RETENTION_MONTHS.get(table.name) if expire else None
+        try:
+            connection = session.connection()
+            created = ensure_monthly_partitions(connection, table.name)
+
+            expired = []
+            if keep_months:
+                expired = expire_monthly_partitions(
+                    connection, table.name, keep_months, detach=settings.PARTITION_DETACH_EXPIRED
+                )
+
+            session.commit()
+        except Exception as e:
+            # e.g. a partition still referenced by a foreign key, the other tables go on
+            session.rollback()
+            logger.error(f"Partition maintenance of {table.name} failed. Error {e}")
+            continue
+
+        changes[table.name] = {"created": created, "expired": expired}
+
+    return changes
+
+
+def create_partitions_after_create(target: sa.Table, connection: Connection, **kw) -> None:
+    # Offline (--sql) migrations have no connection to list the partitions with
+    if connection is None or connection.dialect.name != "postgresql" or not is_partitioned(target):
+        return
+
+    ensure_monthly_partitions(connection, target.name)
+
+
+# Every partitioned table, created by create_all() or by a migration's op.create_table(),
+# is usable right away
+sa.event.listen(sa.Table, "after_create", create_partitions_after_create)
@@ -0,0 +1,42 @@
+from typing import List, Sequence
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+try:
+    from psycopg.rows import namedtuple_row
+except ImportError:  # psycopg2 only installs
+    namedtuple_row = None
+
+
+def supports_pipeline(session: Session) -> bool:
+    return namedtuple_row is not None and session.get_bind().dialect.driver == "psycopg"
+
+
+def copy_rows(session: Session, table: Table, columns: Sequence[str], rows: List[tuple]) -> None:
+    """Appends `rows` (values in `columns` order) to `table` in the session's transaction.
+
+    With psycopg 3 the rows are streamed with `COPY ... FROM STDIN`, other drivers get
+    multi-row INSERTs (SQLAlchemy's insertmanyvalues batches).
+    """
+    connection = session.connection()
+
+    if not supports_pipeline(session):
+        connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+        return
+
+    preparer = connection.dialect.identifier_preparer
+    sql = (
+        f"COPY {preparer.format_table(table)} "
+        f"({', '.join(preparer.quote(column) for column in columns)}) FROM STDIN"
+    )
+    cursor = connection.connection.driver_connection.cursor()
+
+    connection.dispatch.before_cursor_execute(connection, cursor, sql, None, None, False)
+    try:
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+    finally:
+        connection.dispatch.after_cursor_execute(connection, cursor, sql, None, None, False)
+        cursor.close()
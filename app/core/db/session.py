@@ -1,22 +1,96 @@
-from sqlalchemy import Engine, create_engine
-from sqlalchemy.engine.url import URL
+import logging
+import time
+from functools import lru_cache
+
+from sqlalchemy import Engine, create_engine, exc
+from sqlalchemy.engine.url import URL, make_url
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from app.core.admission import admission_controller
 from app.core.config import settings
+from app.core.db.cancellation import register_cancellation_events, to_milliseconds
+from app.core.metrics import registry
+from app.core.tracing import register_tracing_events
+
+logger = logging.getLogger(__name__)
+
+pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds", "Time spent checking out a connection from the pool"
+)
+pool_timeouts_total = registry.counter(
+    "db_pool_timeouts_total", "Checkouts that failed with a pool timeout"
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    def connect(self):
+        start = time.perf_counter()
+
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_timeouts_total.inc()
+            logger.error(f"DB pool exhausted. {self.status()}")
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            pool_wait_seconds.observe(waited)
+            admission_controller.observe_pool_wait(waited)
+
+        if waited > settings.DB_POOL_WAIT_WARNING_SECONDS:
+            logger.warning(f"DB pool checkout waited {waited:.3f}s. {self.status()}")
+
+        return connection
+
+
+def get_connect_args(uri: URL) -> dict:
+    connect_args = {}
+
+    if not settings.DB_PGBOUNCER_MODE:
+        # Default timeouts as startup options, no statement per transaction. PgBouncer
+        # doesn't forward them, SET LOCAL is used there (see register_cancellation_events)
+        connect_args["options"] = (
+            f"-c statement_timeout={to_milliseconds(settings.DB_STATEMENT_TIMEOUT_SECONDS)} "
+            f"-c lock_timeout={to_milliseconds(settings.DB_LOCK_TIMEOUT_SECONDS)}"
+        )
+
+    if make_url(uri).get_driver_name() == "psycopg":
+        prepare_threshold = None if settings.DB_PGBOUNCER_MODE else settings.DB_PREPARE_THRESHOLD
+        connect_args["prepare_threshold"] = prepare_threshold
+
+    return connect_args
 
 
 def new_engine(uri: URL) -> Engine:
-    return create_engine(
+    engine = create_engine(
         uri,
+        connect_args=get_connect_args(uri),
+        poolclass=InstrumentedQueuePool,
         pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30.0,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
         pool_recycle=600,
     )
+    register_tracing_events(engine)
 
+    return engine
 
-def get_sync_session() -> Session:
-    engine = new_engine(settings.DB_URL)
 
-    return sessionmaker(engine, expire_on_commit=False)()
+@lru_cache
+def get_engine() -> Engine:
+    # One engine (and pool) per process, shared by every session
+    return new_engine(settings.DB_URL)
+
+
+@lru_cache
+def get_session_factory() -> sessionmaker:
+    factory = sessionmaker(get_engine(), expire_on_commit=False)
+    register_cancellation_events(factory)
+
+    return factory
+
+
+def get_sync_session() -> Session:
+    return get_session_factory()()
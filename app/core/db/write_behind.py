@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import anyio.to_thread
+import redis
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db.session import get_sync_session
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+MERGE_MAX = "max"
+MERGE_ADD = "add"
+
+
+class WriteBehindColumn:
+    """Buffers hot writes to one column and applies them in batched UPDATEs.
+
+    Values are recorded in a Redis hash (or in-process when Redis isn't available)
+    keyed by row id, merged per id (`max` keeps the latest, `add` sums increments), and
+    written with a single `UPDATE ... FROM (VALUES ...)` per batch. Readers see a write
+    at most one flush interval late.
+    """
+
+    def __init__(self, model, column: str, merge: str = MERGE_MAX) -> None:
+        self.model = model
+        self.column = column
+        self.merge = merge
+        self.redis_key = f"write_behind:{model.__tablename__}:{column}"
+        self._local: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+        WRITE_BEHIND_COLUMNS.append(self)
+
+    @property
+    def python_type(self):
+        return getattr(self.model, self.column).type.python_type
+
+    def _merge(self, current: Any, value: Any) -> Any:
+        if current is None:
+            return value
+        if self.merge == MERGE_ADD:
+            return current + value
+        return max(current, value)
+
+    def _encode(self, value: Any) -> str:
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+
+    def _decode(self, value: str) -> Any:
+        if self.python_type is datetime:
+            return datetime.fromisoformat(value)
+        return self.python_type(value)
+
+    def record_local(self, id: int, value: Any) -> None:
+        with self._lock:
+            self._local[id] = self._merge(self._local.get(id), value)
+
+    def record(self, id: int, value: Any) -> None:
+        client = get_redis()
+
+        if client is not None:
+            try:
+                if self.merge == MERGE_ADD:
+                    client.hincrbyfloat(self.redis_key, id, value)
+                else:
+                    client.hset(self.redis_key, id, self._encode(value))
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Write-behind record failed, buffering locally. Error {e}")
+
+        self.record_local(id, value)
+
+    def drain_local(self) -> Dict[int, Any]:
+        with self._lock:
+            entries, self._local = self._local, {}
+
+        return entries
+
+    def drain_redis(self) -> Dict[int, Any]:
+        client = get_redis()
+        if client is None:
+            return {}
+
+        # Renaming first makes the drain atomic, new writes go to a fresh hash
+        flushing_key = f"{self.redis_key}:flushing:{uuid.uuid4().hex}"
+        try:
+            client.rename(self.redis_key, flushing_key)
+        except redis.ResponseError:
+            return {}
+
+        pipe = client.pipeline()
+        pipe.hgetall(flushing_key)
+        pipe.delete(flushing_key)
+        raw, _ = pipe.execute()
+
+        return {int(id): self._decode(value) for id, value in raw.items()}
+
+    def restore(self, entries: Dict[int, Any]) -> None:
+        for id, value in entries.items():
+            self.record_local(id, value)
+
+    def build_update(self, rows: List[tuple]):
+        model = self.model
+        column = getattr(model, self.column)
+
+        values = sa.values(
+            sa.column("id", sa.Integer),
+            sa.column("value", column.type),
+            name="write_behind",
+        ).data(rows)
+
+        if self.merge == MERGE_ADD:
+            new_value, condition = column + values.c.value, sa.true()
+        else:
+            new_value, condition = values.c.value, sa.or_(column.is_(None), column < values.c.value)
+
+        update_values = {self.column: new_value}
+        if hasattr(model, "updated_at"):
+            # Bookkeeping writes must not bump updated_at (and with it the ETags)
+            update_values["updated_at"] = model.updated_at
+
+        return (
+            sa.update(model)
+            .where(model.id == values.c.id, condition)
+            .values(**update_values)
+            .execution_options(synchronize_session=False)
+        )
+
+    def flush(self, session: Session, entries: Dict[int, Any]) -> int:
+        if not entries:
+            return 0
+
+        rows = sorted(entries.items())
+        batch_size = settings.WRITE_BEHIND_BATCH_SIZE
+
+        try:
+            for start in range(0, len(rows), batch_size):
+                session.execute(self.build_update(rows[start : start + batch_size]))
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.restore(entries)
+            raise
+
+        return len(rows)
+
+
+WRITE_BEHIND_COLUMNS: List[WriteBehindColumn] = []
+
+
+def flush_write_behind(session: Session, include_redis: bool) -> int:
+    flushed = 0
+
+    for buffer in WRITE_BEHIND_COLUMNS:
+        entries = buffer.drain_local()
+
+        if include_redis:
+            for id, value in buffer.drain_redis().items():
+                entries[id] = buffer._merge(entries.get(id), value)
+
+        flushed += buffer.flush(session, entries)
+
+    return flushed
+
+
+def flush_local_write_behind() -> int:
+    with get_sync_session() as session:
+        return flush_write_behind(session, include_redis=False)
+
+
+class WriteBehindFlusher:
+    # Flushes the in-process buffers of an API worker, Redis buffers are flushed by beat
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await anyio.to_thread.run_sync(flush_local_write_behind)
+            except Exception as e:
+                logger.error(f"Write-behind flush failed. Error {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Graceful shutdown, nothing buffered in this process is lost
+        try:
+            await anyio.to_thread.run_sync(flush_local_write_behind)
+        except Exception as e:
+            logger.error(f"Write-behind flush on shutdown failed. Error {e}")
+
+
+write_behind_flusher = WriteBehindFlusher(interval=settings.WRITE_BEHIND_FLUSH_SECONDS)
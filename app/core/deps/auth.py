@@ -1,11 +1,12 @@
-from typing import Annotated, Optional
+from typing import Annotated, NamedTuple, Optional, Union
 
 import sqlalchemy as sa
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from app.core.auth.jwt import JWTProvider, TokenData, TokenException
+from app.core.auth.session_store import session_store
 from app.core.exceptions import CustomException, PermissionException
 from app.user.models import User
 
@@ -27,65 +28,179 @@ oauth2_scheme = OAuth2PasswordBearer(
 
 TokenDep = Annotated[str, Depends(oauth2_scheme)]
 
+_NOT_RESOLVED = object()
 
-def get_user(session: Session, token_data: TokenData) -> Optional[User]:
+
+class Principal(NamedTuple):
+    """The caller as authorization sees it, `upgrade_principal` loads the full `User`."""
+
+    id: int
+    is_active: bool
+    is_super_admin: bool
+
+
+PRINCIPAL_COLUMNS = (User.id, User.is_active, User.is_super_admin)
+
+
+def get_principal(session: Session, token_data: TokenData) -> Optional[Principal]:
+    # Plain rows, no ORM instance or identity map entry
+    stmt = sa.select(*PRINCIPAL_COLUMNS).where(User.id == token_data.id)
+    row = session.execute(stmt).first()
+
+    return Principal._make(row) if row is not None else None
+
+
+def get_user(session: Session, token_data: Union[TokenData, Principal]) -> Optional[User]:
     stmt = sa.select(User).where(User.id == token_data.id)
     user = session.scalars(stmt).first()
 
     return user
 
 
-def get_authenticated_token_or_none(token: TokenDep):
-    if token is None:
-        return None
+def get_user_rstr(session: Session, user_id: int) -> Optional[str]:
+    stmt = sa.select(User.rstr).where(User.id == user_id)
 
-    return JWTProvider.decode_access_token(token)
+    return session.scalars(stmt).first()
 
 
-AuthenticatedTokenDataOrNone = Annotated[
-    Optional[TokenData], Depends(get_authenticated_token_or_none)
-]
+def get_request_token_data(
+    request: Request, session: Session, token: Optional[str]
+) -> Optional[TokenData]:
+    # Memoized in request.state, so every auth dependency of a request decodes once
+    token_data = getattr(request.state, "token_data", _NOT_RESOLVED)
+    if token_data is not _NOT_RESOLVED:
+        return token_data
+
+    token_data = None
+    if token is not None:
+        token_data = JWTProvider.decode_access_token(token)
+
+        if not session_store.is_current(
+            token_data.id, token_data.rstr, loader=lambda: get_user_rstr(session, token_data.id)
+        ):
+            raise TokenException(message="Session is revoked")
+
+    request.state.token_data = token_data
+
+    return token_data
 
 
-def get_authenticated_user_or_none(
-    session: SessionDep, token_data: AuthenticatedTokenDataOrNone
+def get_request_user(
+    request: Request, session: Session, token_data: Union[TokenData, Principal]
 ) -> Optional[User]:
-    if not token_data:
-        return None
+    user = getattr(request.state, "user", _NOT_RESOLVED)
+    if user is not _NOT_RESOLVED:
+        return user
 
     user = get_user(session, token_data)
 
     if user and user.is_active is not True:
         raise UserException(message="User is inactive")
 
+    request.state.user = user
+
     return user
 
 
-CurrentUserOrNone = Annotated[Optional[User], Depends(get_authenticated_user_or_none)]
+def get_request_principal(
+    request: Request, session: Session, token_data: TokenData
+) -> Optional[Principal]:
+    principal = getattr(request.state, "principal", _NOT_RESOLVED)
+    if principal is not _NOT_RESOLVED:
+        return principal
 
+    user = getattr(request.state, "user", _NOT_RESOLVED)
+    if user is not _NOT_RESOLVED:
+        principal = Principal(user.id, user.is_active, user.is_super_admin) if user else None
+    else:
+        principal = get_principal(session, token_data)
 
-def get_authenticated_token(token_data: AuthenticatedTokenDataOrNone):
-    if token_data is None:
-        raise TokenException(detail="Token is not provided")
+    if principal and principal.is_active is not True:
+        raise UserException(message="User is inactive")
 
-    return token_data
+    request.state.principal = principal
 
+    return principal
 
-AuthenticatedTokenData = Annotated[TokenData, Depends(get_authenticated_token)]
 
+def upgrade_principal(request: Request, session: Session, principal: Principal) -> User:
+    # For handlers that read or write more than the principal's columns
+    user = get_request_user(request, session, principal)
 
-def get_authenticated_user(current_user: CurrentUserOrNone) -> User:
-    if current_user is None:
+    if user is None:
         raise UserException(message="User not found")
 
-    return current_user
+    return user
+
+
+class PrincipalResolver:
+    """Resolves the caller of a request in a single dependency.
+
+    Sync, so FastAPI runs it in the threadpool: the JWT decode, the session store and
+    the user query don't block the event loop, at the cost of a single hop. The token
+    and user are stored in `request.state` for the other dependencies and the handler.
+    With `principal_only` a `Principal` is loaded instead of the `User` entity.
+    """
+
+    def __init__(
+        self,
+        required: bool = True,
+        load_user: bool = True,
+        superuser: bool = False,
+        principal_only: bool = False,
+    ) -> None:
+        self.required = required
+        self.load_user = load_user
+        self.superuser = superuser
+        self.principal_only = principal_only
+
+    def __call__(self, request: Request, token: TokenDep, session: SessionDep):
+        token_data = get_request_token_data(request, session, token)
+
+        if token_data is None:
+            if self.required:
+                raise TokenException(message="Token is not provided")
+            return None
+
+        if not self.load_user:
+            return token_data
+
+        if self.principal_only:
+            user = get_request_principal(request, session, token_data)
+        else:
+            user = get_request_user(request, session, token_data)
+
+        if user is None:
+            if self.required:
+                raise UserException(message="User not found")
+            return None
 
+        if self.superuser and not user.is_super_admin:
+            raise PermissionException(message="The user doesn't have enough privileges")
+
+        return user
+
+
+get_authenticated_token_or_none = PrincipalResolver(required=False, load_user=False)
+AuthenticatedTokenDataOrNone = Annotated[
+    Optional[TokenData], Depends(get_authenticated_token_or_none)
+]
+
+get_authenticated_token = PrincipalResolver(load_user=False)
+AuthenticatedTokenData = Annotated[TokenData, Depends(get_authenticated_token)]
+
+get_authenticated_user_or_none = PrincipalResolver(required=False)
+CurrentUserOrNone = Annotated[Optional[User], Depends(get_authenticated_user_or_none)]
 
+get_authenticated_user = PrincipalResolver()
 CurrentUser = Annotated[User, Depends(get_authenticated_user)]
 
+get_current_active_superuser = PrincipalResolver(superuser=True)
+SuperUser = Annotated[User, Depends(get_current_active_superuser)]
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
-    if not current_user.is_super_admin:
-        raise PermissionException(message="The user doesn't have enough privileges")
+# id, is_active and is_super_admin only, see `upgrade_principal`
+get_authenticated_principal = PrincipalResolver(principal_only=True)
+CurrentPrincipal = Annotated[Principal, Depends(get_authenticated_principal)]
 
-    return current_user
+get_superuser_principal = PrincipalResolver(superuser=True, principal_only=True)
+SuperPrincipal = Annotated[Principal, Depends(get_superuser_principal)]
@@ -1,14 +1,25 @@
-from typing import Annotated, Generator
+from typing import Annotated, AsyncGenerator
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy.orm import Session
 
+from app.core.db.cancellation import detach_session
 from app.core.db.session import get_sync_session
+from app.core.middleware.cancellation import CANCELLER_STATE_KEY
 
 
-def get_session() -> Generator[Session, None, None]:
+async def get_session(request: Request) -> AsyncGenerator[Session, None]:
+    # Async so resolving it doesn't cost a threadpool hop, the session connects lazily
     with get_sync_session() as session:
-        yield session
+        canceller = getattr(request.state, CANCELLER_STATE_KEY, None)
+        if canceller is not None:
+            session.info["canceller"] = canceller
+
+        try:
+            yield session
+        finally:
+            detach_session(session)
+            session.info.pop("canceller", None)
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
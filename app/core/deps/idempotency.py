@@ -0,0 +1,67 @@
+import logging
+from typing import Optional
+
+import redis
+from fastapi import Header, Request
+
+from app.core.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    IDEMPOTENCY_STATE_KEY,
+    InvalidIdempotencyKeyException,
+    claim_idempotency_key,
+    get_fingerprint,
+    get_idempotency_store,
+    get_storage_key,
+    idempotency_requests_total,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def get_request_fingerprint(request: Request) -> str:
+    if request.headers.get("content-type", "").startswith("multipart/"):
+        # Already streamed into the form, and its boundary changes between retries anyway
+        return ""
+
+    return get_fingerprint(await request.body())
+
+
+class Idempotent:
+    """`dependencies=[Depends(Idempotent())]` on mutating routes.
+
+    A retry carrying the same `Idempotency-Key` header gets the first response replayed
+    instead of running the handler again, a concurrent duplicate waits for the first to
+    finish. The response is stored by `IdempotencyMiddleware`. Requests without the
+    header are not affected.
+    """
+
+    async def __call__(
+        self,
+        request: Request,
+        idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER),
+    ) -> None:
+        if idempotency_key is None:
+            return
+
+        if not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise InvalidIdempotencyKeyException
+
+        route = request.scope.get("route")
+        key = get_storage_key(
+            idempotency_key,
+            request.method,
+            getattr(route, "path", request.url.path),
+            request.headers.get("authorization"),
+        )
+        fingerprint = await get_request_fingerprint(request)
+
+        try:
+            claim = await claim_idempotency_key(get_idempotency_store(), key, fingerprint)
+        except redis.RedisError as e:
+            # Better a possible duplicate than failing every retry while Redis is down
+            logger.warning(f"Idempotency store unavailable. Error {e}")
+            idempotency_requests_total.inc(labels={"result": "unavailable"})
+            return
+
+        setattr(request.state, IDEMPOTENCY_STATE_KEY, claim)
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from fastapi import Request
+
+from app.core.db.cancellation import set_session_timeouts
+
+from .db import SessionDep
+
+
+class RouteTimeout:
+    """Per-route DB limits, `dependencies=[Depends(RouteTimeout(statement_timeout=2))]`.
+
+    `statement_timeout`/`lock_timeout` (seconds) replace the defaults of the request's
+    session, `deadline` cancels the request's DB work after that many seconds.
+    """
+
+    def __init__(
+        self,
+        statement_timeout: Optional[float] = None,
+        lock_timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        self.statement_timeout = statement_timeout
+        self.lock_timeout = lock_timeout
+        self.deadline = deadline
+
+    async def __call__(self, request: Request, session: SessionDep) -> None:
+        set_session_timeouts(session, self.statement_timeout, self.lock_timeout)
+
+        canceller = session.info.get("canceller")
+        if self.deadline is not None and canceller is not None:
+            canceller.start_deadline(self.deadline)
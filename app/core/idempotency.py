@@ -0,0 +1,262 @@
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from secrets import token_hex
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.exceptions import CustomException
+from app.core.metrics import registry
+from app.core.redis import get_redis
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_STATE_KEY = "idempotency_claim"
+IDEMPOTENCY_REDIS_KEY = "idempotency:{key}"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+STATE_IN_FLIGHT = "in_flight"
+STATE_DONE = "done"
+
+# Response headers stored with the body, the others are set again by the middleware stack
+STORED_HEADERS = (b"content-type", b"location", b"cache-control", b"etag")
+
+# Not stored, a retry should run the handler again
+RETRYABLE_STATUSES = {408, 409, 425, 429, 499}
+
+LOCAL_STORE_MAX_ITEMS = 10000
+
+idempotency_requests_total = registry.counter(
+    "idempotency_requests_total", "Requests carrying an Idempotency-Key", ("result",)
+)
+
+# Set the value only if it is still the caller's in-flight marker
+REPLACE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Delete the key only if it is still the caller's in-flight marker
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class InvalidIdempotencyKeyException(CustomException):
+    code = 400
+    error_code = "INVALID_IDEMPOTENCY_KEY"
+    message = f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+
+
+class IdempotencyInProgressException(CustomException):
+    code = 409
+    error_code = "IDEMPOTENCY_IN_PROGRESS"
+    message = "A request with this Idempotency-Key is still in progress"
+
+
+class IdempotencyKeyReusedException(CustomException):
+    code = 422
+    error_code = "IDEMPOTENCY_KEY_REUSED"
+    message = "Idempotency-Key was already used with a different request"
+
+
+class IdempotentReplay(Exception):
+    """Raised by the dependency to answer with a stored response instead of the handler's."""
+
+    def __init__(self, record: Dict[str, Any]) -> None:
+        self.record = record
+
+
+class LocalIdempotencyStore:
+    """In-process fallback when Redis isn't configured, duplicates are only coalesced
+    when they reach the same worker."""
+
+    def __init__(self) -> None:
+        self._items: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, (expires_at, _) in self._items.items() if expires_at <= now]:
+            del self._items[key]
+
+        while len(self._items) >= LOCAL_STORE_MAX_ITEMS:
+            del self._items[min(self._items, key=lambda key: self._items[key][0])]
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None or item[0] <= time.monotonic():
+            return None
+
+        return item[1]
+
+    def claim(self, key: str, value: str, ttl: float) -> bool:
+        now = time.monotonic()
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] > now:
+                return False
+
+            if len(self._items) >= LOCAL_STORE_MAX_ITEMS:
+                self._prune(now)
+            self._items[key] = (now + ttl, value)
+
+        return True
+
+    def replace(self, key: str, current: str, value: str, ttl: float) -> bool:
+        with self._lock:
+            if self.get(key) != current:
+                return False
+
+            self._items[key] = (time.monotonic() + ttl, value)
+
+        return True
+
+    def release(self, key: str, current: str) -> None:
+        with self._lock:
+            if self.get(key) == current:
+                del self._items[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class RedisIdempotencyStore:
+    """Shared by every API worker, SET NX is the in-flight lock."""
+
+    def __init__(self, client: redis.Redis) -> None:
+        self.client = client
+        self._replace = client.register_script(REPLACE_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(IDEMPOTENCY_REDIS_KEY.format(key=key))
+
+    def claim(self, key: str, value: str, ttl: float) -> bool:
+        key = IDEMPOTENCY_REDIS_KEY.format(key=key)
+        return bool(self.client.set(key, value, nx=True, px=int(ttl * 1000)))
+
+    def replace(self, key: str, current: str, value: str, ttl: float) -> bool:
+        key = IDEMPOTENCY_REDIS_KEY.format(key=key)
+        return bool(self._replace(keys=[key], args=[current, value, int(ttl)]))
+
+    def release(self, key: str, current: str) -> None:
+        self._release(keys=[IDEMPOTENCY_REDIS_KEY.format(key=key)], args=[current])
+
+
+local_store = LocalIdempotencyStore()
+
+
+def get_idempotency_store():
+    client = get_redis()
+    if client is None:
+        return local_store
+
+    return RedisIdempotencyStore(client)
+
+
+def get_storage_key(key: str, method: str, path: str, authorization: Optional[str]) -> str:
+    # Per route and per credentials, a key never replays another user's response
+    scope = f"{method}:{path}:{authorization or ''}:{key}"
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def get_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def should_store(status: int) -> bool:
+    return status < 500 and status not in RETRYABLE_STATUSES
+
+
+class IdempotencyClaim:
+    """The in-flight marker of one request, turned into its stored response once it
+    completes or dropped so a retry runs the handler again."""
+
+    def __init__(self, store, key: str, fingerprint: str) -> None:
+        self.store = store
+        self.key = key
+        self.fingerprint = fingerprint
+        self.value = json.dumps(
+            {"state": STATE_IN_FLIGHT, "token": token_hex(16), "fingerprint": fingerprint}
+        )
+
+    def acquire(self) -> bool:
+        return self.store.claim(self.key, self.value, settings.IDEMPOTENCY_LOCK_TTL_SECONDS)
+
+    def complete(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> bool:
+        record = {
+            "state": STATE_DONE,
+            "fingerprint": self.fingerprint,
+            "status": status,
+            "headers": [[name.decode(), value.decode()] for name, value in headers],
+            "body": base64.b64encode(body).decode(),
+        }
+
+        return self.store.replace(
+            self.key, self.value, json.dumps(record), settings.IDEMPOTENCY_TTL_SECONDS
+        )
+
+    def release(self) -> None:
+        self.store.release(self.key, self.value)
+
+
+async def claim_idempotency_key(
+    store, key: str, fingerprint: str, poll_interval: float = 0.05
+) -> IdempotencyClaim:
+    """Claims `key` for this request, or waits for the request holding it.
+
+    Raises `IdempotentReplay` once a response is stored under the key,
+    `IdempotencyInProgressException` if none is stored within IDEMPOTENCY_WAIT_SECONDS.
+    """
+    claim = IdempotencyClaim(store, key, fingerprint)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    waited = False
+
+    while True:
+        if await run_in_threadpool(claim.acquire):
+            idempotency_requests_total.inc(labels={"result": "claimed"})
+            return claim
+
+        value = await run_in_threadpool(store.get, key)
+        if value is None:
+            # Released or expired since the claim attempt
+            continue
+
+        record = json.loads(value)
+        if record["fingerprint"] != fingerprint:
+            idempotency_requests_total.inc(labels={"result": "reused"})
+            raise IdempotencyKeyReusedException
+
+        if record["state"] == STATE_DONE:
+            idempotency_requests_total.inc(
+                labels={"result": "replayed_after_wait" if waited else "replayed"}
+            )
+            raise IdempotentReplay(record)
+
+        if time.monotonic() >= deadline:
+            idempotency_requests_total.inc(labels={"result": "in_progress"})
+            raise IdempotencyInProgressException
+
+        waited = True
+        await asyncio.sleep(poll_interval)
+
+
+def get_replay_content(record: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+    headers = dict(record["headers"])
+    headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+
+    return record["status"], headers, base64.b64decode(record["body"])
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.tracing import tracing
+
+log_records_dropped = registry.counter(
+    "log_records_dropped_total", "Log records dropped because the queue was full", ("level",)
+)
+log_records_sampled_out = registry.counter(
+    "log_records_sampled_out_total", "Log records skipped by sampling", ("logger",)
+)
+
+ACCESS_LOGGER = "app.access"
+
+# Attributes of every LogRecord, anything else was passed with `extra=`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class RequestContext:
+    __slots__ = ("request_id", "scope", "name", "start")
+
+    def __init__(
+        self,
+        request_id: str,
+        scope: Optional[Dict[str, Any]] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.request_id = request_id
+        self.scope = scope
+        # Route of records logged outside of a request, e.g. the task name
+        self.name = name
+        self.start = time.perf_counter()
+
+    @property
+    def route(self) -> Optional[str]:
+        if self.scope is None:
+            return self.name
+
+        # Set by the router once matched, the template keeps the label cardinality low
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path")
+
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    context = request_context.get()
+    return context.request_id if context is not None else None
+
+
+class ContextFilter(logging.Filter):
+    # Handler filters run in the caller's thread, where the context is still set
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get()
+
+        if context is not None:
+            record.request_id = context.request_id
+            record.route = context.route
+
+        trace_id = tracing.current_trace_id()
+        if trace_id is not None:
+            record.trace_id = trace_id
+
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records of high-volume loggers, warnings are always kept."""
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.name)
+
+        if rate is None or rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+
+        log_records_sampled_out.inc(labels={"logger": record.name})
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hands records to a `QueueListener` without ever blocking the caller.
+
+    When the queue is full the record is dropped and counted. Formatting, including
+    tracebacks, is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze the message, the args may be mutated after the call returns
+        record.msg = record.getMessage()
+        record.args = None
+
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc(labels={"level": record.levelname})
+
+
+class BoundedQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # put_nowait would raise on a full queue, the listener thread frees a slot
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                data[key] = value
+
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+            # Drop the frames, they keep every local of the failed request alive
+            record.exc_info = None
+        if record.stack_info:
+            data["stack"] = self.formatStack(record.stack_info)
+
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class LoggingPipeline:
+    """Root logging through a bounded queue drained by one `QueueListener` thread."""
+
+    def __init__(self) -> None:
+        self.queue: Optional[queue.Queue] = None
+        self.listener: Optional[QueueListener] = None
+        self.handler: Optional[BoundedQueueHandler] = None
+
+        # The listener thread doesn't survive a fork (gunicorn/Celery prefork children)
+        os.register_at_fork(after_in_child=self.restart_after_fork)
+
+    def build_handler(self) -> logging.Handler:
+        handler = logging.StreamHandler(sys.stdout)
+
+        if settings.LOG_JSON:
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(
+                logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+            )
+
+        return handler
+
+    def start(self) -> None:
+        if self.listener is not None:
+            return
+
+        self.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+
+        self.handler = BoundedQueueHandler(self.queue)
+        self.handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+        self.handler.addFilter(ContextFilter())
+
+        root = logging.getLogger()
+        root.handlers = [self.handler]
+        root.setLevel(settings.LOG_LEVEL)
+
+        # Server loggers write through the pipeline too
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error", "celery"):
+            logging.getLogger(name).handlers = []
+            logging.getLogger(name).propagate = True
+
+        self.listener = BoundedQueueListener(
+            self.queue, self.build_handler(), respect_handler_level=True
+        )
+        self.listener.start()
+
+    def restart_after_fork(self) -> None:
+        if self.listener is not None:
+            self.listener = None
+            self.start()
+
+    def stop(self) -> None:
+        if self.listener is None:
+            return
+
+        # Drains what is queued before returning
+        self.listener.stop()
+        logging.getLogger().removeHandler(self.handler)
+
+        self.listener = None
+        self.handler = None
+
+
+logging_pipeline = LoggingPipeline()
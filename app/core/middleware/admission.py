@@ -0,0 +1,53 @@
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.admission import (
+    AdmissionController,
+    OverloadedException,
+    Priority,
+    requests_in_flight,
+)
+
+
+class AdmissionControlMiddleware:
+    """Rejects requests with 503 and Retry-After while the controller is shedding their
+    priority, before their body is read or a thread or connection is taken."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+
+        if controller.should_reject(scope):
+            response = JSONResponse(
+                status_code=OverloadedException.code,
+                content={
+                    "error_code": OverloadedException.error_code,
+                    "message": OverloadedException.message,
+                },
+                headers={"Retry-After": str(controller.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        controller.in_flight += 1
+        requests_in_flight.set(controller.in_flight)
+        start = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
+            requests_in_flight.set(controller.in_flight)
+
+            route = scope.get("route")
+            priority = controller.route_priority(route) if route is not None else Priority.NORMAL
+            controller.observe_latency(time.perf_counter() - start, priority)
@@ -0,0 +1,67 @@
+import asyncio
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.db.cancellation import REASON_DISCONNECT, QueryCanceller
+
+CANCELLER_STATE_KEY = "query_canceller"
+
+
+class RequestCancellationMiddleware:
+    """Cancels the DB work of a request when the client goes away or its deadline passes.
+
+    The request's messages are pumped from the server into a queue, so an
+    `http.disconnect` is seen while the handler is still running. The `QueryCanceller`
+    is exposed as `request.state.query_canceller` and picked up by the session dependency.
+    """
+
+    def __init__(self, app: ASGIApp, deadline: float = 0.0) -> None:
+        self.app = app
+        self.deadline = deadline
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        canceller = QueryCanceller()
+        canceller.start_deadline(self.deadline)
+        scope.setdefault("state", {})[CANCELLER_STATE_KEY] = canceller
+
+        # maxsize=1 keeps the backpressure of request bodies
+        messages: asyncio.Queue = asyncio.Queue(maxsize=1)
+        disconnected = asyncio.Event()
+
+        async def pump() -> None:
+            while True:
+                message = await receive()
+
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    canceller.cancel(REASON_DISCONNECT)
+                    return
+
+                await messages.put(message)
+
+        async def receive_from_pump() -> Message:
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+
+            get_message = asyncio.ensure_future(messages.get())
+            wait_disconnect = asyncio.ensure_future(disconnected.wait())
+            done, pending = await asyncio.wait(
+                {get_message, wait_disconnect}, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending:
+                task.cancel()
+
+            if get_message in done:
+                return get_message.result()
+            return {"type": "http.disconnect"}
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            await self.app(scope, receive_from_pump, send)
+        finally:
+            pump_task.cancel()
+            canceller.close()
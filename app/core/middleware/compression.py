@@ -0,0 +1,270 @@
+import zlib
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class Encoder:
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int) -> None:
+        # wbits=31 writes a gzip container instead of a raw zlib stream
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, level: int) -> None:
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int) -> None:
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Server preference order, used to break ties between equal q-values
+ENCODERS: Dict[str, Callable[[int], Encoder]] = {}
+
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    codings: Dict[str, float] = {}
+
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+
+        codings[coding] = q
+
+    return codings
+
+
+def negotiate_encoding(header: str, available: List[str]) -> Optional[str]:
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+
+    best, best_q = None, 0.0
+    for name in available:
+        q = codings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+
+    return best
+
+
+def get_media_type(headers: Headers) -> str:
+    return headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def match_levels(
+    media_type: str, levels: Mapping[str, Mapping[str, int]]
+) -> Optional[Mapping[str, int]]:
+    # Exact media type wins over a prefix such as "text/"
+    if media_type in levels:
+        return levels[media_type]
+
+    for pattern, value in levels.items():
+        if pattern.endswith("/") and media_type.startswith(pattern):
+            return value
+        if pattern.startswith("+") and media_type.endswith(pattern):
+            return value
+
+    return None
+
+
+class CompressionMiddleware:
+    """Negotiates br/zstd/gzip for compressible media types.
+
+    Only media types listed in `levels` are compressed, so images, archives and other
+    already-compressed content pass through untouched. Streaming bodies are compressed
+    chunk by chunk and flushed, never buffered.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        levels: Mapping[str, Mapping[str, int]],
+        minimum_size: int = 500,
+    ) -> None:
+        self.app = app
+        self.levels = levels
+        self.minimum_size = minimum_size
+        self.available = list(ENCODERS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, self.available) if accept_encoding else None
+
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, encoding)
+        await responder(scope, receive, send)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send: Send = unattached_send
+        self.initial_message: Message = {}
+        self.started = False
+        self.level: Optional[int] = None
+        self.encoder: Optional[Encoder] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    def resolve_level(self, message: Message) -> Tuple[Optional[int], bool]:
+        headers = Headers(raw=message["headers"])
+
+        if message["status"] < 200 or message["status"] in (204, 206, 304):
+            return None, False
+        if "content-encoding" in headers:
+            return None, False
+        if "no-transform" in headers.get("cache-control", ""):
+            return None, False
+
+        levels = match_levels(get_media_type(headers), self.middleware.levels)
+        if levels is None or self.encoding not in levels:
+            return None, False
+
+        return levels[self.encoding], True
+
+    def start_encoding(self, streaming: bool) -> None:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+
+        # The representation changes, so a strong validator has to become weak
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+        if streaming:
+            del headers["Content-Length"]
+
+        self.encoder = ENCODERS[self.encoding](self.level)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.initial_message = message
+            self.level, compressible = self.resolve_level(message)
+
+            if compressible:
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+
+            if self.level is None or (not more_body and len(body) < self.middleware.minimum_size):
+                await self.send(self.initial_message)
+                await self.send(message)
+                self.level = None
+                return
+
+            self.start_encoding(streaming=more_body)
+
+            if more_body:
+                message["body"] = self.encoder.compress(body) + self.encoder.flush()
+            else:
+                message["body"] = self.encoder.compress(body) + self.encoder.finish()
+                headers = MutableHeaders(raw=self.initial_message["headers"])
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if self.encoder is None:
+            await self.send(message)
+            return
+
+        if more_body:
+            message["body"] = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            message["body"] = self.encoder.compress(body) + self.encoder.finish()
+
+        await self.send(message)
+
+
+async def unattached_send(message: Message) -> None:
+    raise RuntimeError("send awaitable not set")  # pragma: no cover
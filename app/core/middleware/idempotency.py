@@ -0,0 +1,72 @@
+import logging
+
+import redis
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.idempotency import (
+    IDEMPOTENCY_STATE_KEY,
+    STORED_HEADERS,
+    idempotency_requests_total,
+    should_store,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyMiddleware:
+    """Stores the response of requests whose `Idempotency-Key` the `Idempotent`
+    dependency claimed, so retries replay it.
+
+    Responses that a retry should run again (5xx, 409, 429...) or larger than
+    IDEMPOTENCY_MAX_BODY_BYTES only release the claim.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = None
+        headers = []
+        body = bytearray()
+        complete = False
+        oversized = False
+
+        async def capture(message: Message) -> None:
+            nonlocal status, headers, complete, oversized
+
+            # The dependency has run by the time the response starts
+            if scope.get("state", {}).get(IDEMPOTENCY_STATE_KEY) is not None:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = [
+                        (name, value)
+                        for name, value in message.get("headers", [])
+                        if name.lower() in STORED_HEADERS
+                    ]
+                elif message["type"] == "http.response.body" and not oversized:
+                    body.extend(message.get("body", b""))
+                    oversized = len(body) > settings.IDEMPOTENCY_MAX_BODY_BYTES
+                    complete = not message.get("more_body", False)
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            claim = scope.get("state", {}).get(IDEMPOTENCY_STATE_KEY)
+
+            if claim is not None:
+                try:
+                    if complete and not oversized and should_store(status):
+                        await run_in_threadpool(claim.complete, status, headers, bytes(body))
+                        idempotency_requests_total.inc(labels={"result": "stored"})
+                    else:
+                        await run_in_threadpool(claim.release)
+                except redis.RedisError as e:
+                    logger.warning(f"Idempotent response not stored. Error {e}")
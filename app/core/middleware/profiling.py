@@ -0,0 +1,60 @@
+import json
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.profiling import RequestProfile, profiled_request, verify_profile_token
+
+PROFILE_HEADER = "X-Profile"
+PROFILED_STATUS_HEADER = "X-Profiled-Status"
+
+
+class RequestProfilingMiddleware:
+    """Profiles requests carrying a valid signed `X-Profile` header.
+
+    The request runs as usual, its response is discarded and replaced by the speedscope
+    JSON of the samples taken while it ran. Other requests pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        token = Headers(scope=scope).get(PROFILE_HEADER) if scope["type"] == "http" else None
+
+        if not token or not verify_profile_token(token):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        context_token = profiled_request.set(profile)
+        status_code = 500
+
+        async def discard(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        profile.profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profile.profiler.stop()
+            profiled_request.reset(context_token)
+
+        name = f"{scope['method']} {scope['path']}"
+        body = json.dumps(profile.profiler.to_speedscope(name)).encode()
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (PROFILED_STATUS_HEADER.lower().encode(), str(status_code).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
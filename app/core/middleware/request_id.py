@@ -0,0 +1,70 @@
+import logging
+import re
+import time
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.log import ACCESS_LOGGER, RequestContext, request_context
+
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+
+class RequestIdMiddleware:
+    """Binds a request ID to everything logged (or enqueued) while serving the request.
+
+    The client's `X-Request-ID` is reused when well formed, the ID is echoed in the
+    response and one access record with the route, status and duration is written.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid4().hex
+
+        context = RequestContext(request_id, scope)
+        token = request_context.set(context)
+        status_code = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            # The context stays set for the error handler outside of the middleware stack
+            self.log_access(scope, context, 500)
+            raise
+
+        self.log_access(scope, context, status_code)
+        request_context.reset(token)
+
+    def log_access(self, scope: Scope, context: RequestContext, status_code: int) -> None:
+        duration_ms = (time.perf_counter() - context.start) * 1000
+
+        access_logger.info(
+            f"{scope['method']} {context.route} {status_code}",
+            extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(duration_ms, 2),
+            },
+        )
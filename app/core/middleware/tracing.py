@@ -0,0 +1,49 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.tracing import SpanKind, end_span, tracing
+
+
+class TracingMiddleware:
+    """Opens the SERVER span of a request, continuing an incoming `traceparent`.
+
+    The span is renamed to the route template once the router has matched it.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracing.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        span = tracing.start_span(
+            f"{method} {scope['path']}",
+            kind=SpanKind.SERVER,
+            context=tracing.extract(Headers(scope=scope)),
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        )
+        token = tracing.attach(span)
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.update_name(f"{method} {route.path}")
+                span.set_attribute("http.route", route.path)
+
+            end_span(span, error)
+            tracing.detach(token)
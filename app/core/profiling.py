@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import CodeType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+import redis
+
+from app.core.config import settings
+from app.core.exceptions import CustomException
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+FORMAT_SPEEDSCOPE = "speedscope"
+FORMAT_COLLAPSED = "collapsed"
+
+PROFILE_CHANNEL = "profiler:commands"
+PROFILE_RESULTS_KEY = "profiler:results:{id}"
+PROFILE_RESULTS_TTL_SECONDS = 300
+
+_UNRESOLVED: Any = object()
+_worker_thread_run_code: Optional[CodeType] = _UNRESOLVED
+
+FrameKey = Tuple[str, str, int]
+
+
+class ProfilerBusyException(CustomException):
+    code = 409
+    error_code = "PROFILER_BUSY"
+    message = "A profile is already running on this worker"
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of this process' threads every `interval` seconds.
+
+    Stacks are read from `sys._current_frames()` by a background thread, nothing is
+    hooked into the profiled code. `include(thread_id, frame)` narrows the threads kept.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        include: Optional[Callable[[int, Any], bool]] = None,
+    ) -> None:
+        self.interval = interval
+        self.include = include
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if self.include is not None and not self.include(thread_id, frame):
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+
+            self.samples[(names.get(thread_id, str(thread_id)), tuple(stack))] += 1
+
+        self.sample_count += 1
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.duration = time.perf_counter() - self.started_at
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        # https://www.speedscope.app/file-format-schema.json, one profile per thread
+        frame_index: Dict[FrameKey, int] = {}
+        frames: List[Dict[str, Any]] = []
+        profiles: Dict[str, Dict[str, Any]] = {}
+
+        for (thread_name, stack), count in self.samples.most_common():
+            indexes = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indexes.append(frame_index[key])
+
+            profile = profiles.setdefault(
+                thread_name,
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": [],
+                    "weights": [],
+                },
+            )
+            profile["samples"].append(indexes)
+            profile["weights"].append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "app.core.profiling",
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+    def to_collapsed(self) -> str:
+        # Brendan Gregg's folded stacks, input of flamegraph.pl / inferno
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            names = [f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack]
+            lines.append(f"{';'.join([thread_name, *names])} {count}")
+
+        return "\n".join(lines)
+
+    def export(self, fmt: str, name: str) -> Any:
+        if fmt == FORMAT_COLLAPSED:
+            return self.to_collapsed()
+
+        return self.to_speedscope(name)
+
+
+# One worker-wide profile at a time, samples of two would mix the same threads
+profile_lock = threading.Lock()
+
+
+@contextmanager
+def worker_profile() -> Iterator[SamplingProfiler]:
+    # Every thread of the worker, the caller waits for as long as it should sample
+    if not profile_lock.acquire(blocking=False):
+        raise ProfilerBusyException
+
+    profiler = SamplingProfiler(settings.PROFILER_INTERVAL_SECONDS)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profile_lock.release()
+
+
+profiled_request: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "profiled_request", default=None
+)
+
+
+def get_worker_thread_run_code() -> Optional[CodeType]:
+    """Code of the anyio threadpool loop, its frame's `context` local is the caller's
+    copied context. anyio internals, resolved on first use: when they change, request
+    profiles only sample the event loop."""
+    global _worker_thread_run_code
+
+    if _worker_thread_run_code is _UNRESOLVED:
+        try:
+            from anyio._backends._asyncio import WorkerThread
+
+            _worker_thread_run_code = WorkerThread.run.__code__
+        except (ImportError, AttributeError) as e:
+            logger.warning(f"Threadpool calls are not profiled per request. Error {e}")
+            _worker_thread_run_code = None
+
+    return _worker_thread_run_code
+
+
+def get_worker_context(frame) -> Optional[Any]:
+    run_code = get_worker_thread_run_code()
+    if run_code is None:
+        return None
+
+    while frame is not None:
+        if frame.f_code is run_code:
+            return frame.f_locals.get("context")
+        frame = frame.f_back
+
+    return None
+
+
+class RequestProfile:
+    """Samples one request: the event loop while its task runs, and the threadpool
+    threads running calls made from its context (sync dependencies and handlers)."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread_id = threading.get_ident()
+        self.profiler = SamplingProfiler(settings.PROFILER_INTERVAL_SECONDS, self.include)
+
+    def include(self, thread_id: int, frame) -> bool:
+        if thread_id == self.loop_thread_id:
+            return asyncio.current_task(self.loop) is self.task
+
+        context = get_worker_context(frame)
+        return context is not None and context.get(profiled_request) is self
+
+
+def sign_profile_token(expires_at: int) -> str:
+    signature = hmac.new(
+        settings.PROFILER_SECRET.encode(), str(expires_at).encode(), hashlib.sha256
+    ).hexdigest()
+
+    return f"{expires_at}.{signature}"
+
+
+def new_profile_token(ttl_seconds: int) -> str:
+    return sign_profile_token(int(time.time()) + ttl_seconds)
+
+
+def verify_profile_token(token: str) -> bool:
+    if not settings.PROFILER_SECRET:
+        return False
+
+    expires_at, _, _ = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+
+    return hmac.compare_digest(token, sign_profile_token(int(expires_at)))
+
+
+def get_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ProfileListener:
+    """Runs a worker-wide profile when a `collect-profiles` command is published."""
+
+    def __init__(self) -> None:
+        self._listener = None
+
+    def _handle_command(self, message) -> None:
+        try:
+            command = json.loads(message["data"])
+        except ValueError:
+            logger.warning(f"Invalid profile command {message['data']}")
+            return
+
+        threading.Thread(target=self._run, args=(command,), daemon=True).start()
+
+    def _run(self, command: Dict[str, Any]) -> None:
+        result = {"worker": get_worker_name()}
+
+        try:
+            # Bounded like the HTTP endpoint, whoever published the command
+            seconds = min(float(command["seconds"]), settings.PROFILER_MAX_SECONDS)
+            with worker_profile() as profiler:
+                time.sleep(seconds)
+            result["profile"] = profiler.export(command["format"], result["worker"])
+        except Exception as e:
+            result["error"] = str(e)
+
+        key = PROFILE_RESULTS_KEY.format(id=command["id"])
+        try:
+            client = get_redis()
+            client.rpush(key, json.dumps(result))
+            client.expire(key, PROFILE_RESULTS_TTL_SECONDS)
+        except redis.RedisError as e:
+            logger.warning(f"Profile result not stored. Error {e}")
+
+    def start(self) -> None:
+        client = get_redis()
+        if client is None or self._listener is not None:
+            return
+
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{PROFILE_CHANNEL: self._handle_command})
+        except redis.RedisError as e:
+            logger.warning(f"Profile listener not started. Error {e}")
+            return
+
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self) -> None:
+        if self._listener is None:
+            return
+
+        self._listener.stop()
+        self._listener = None
+
+
+profile_listener = ProfileListener()
+
+
+def collect_profiles(seconds: float, fmt: str, grace_seconds: float = 10.0) -> List[Dict]:
+    # Its own client, the shared one has a socket timeout shorter than the wait
+    client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    command_id = uuid4().hex
+    command = {"id": command_id, "seconds": seconds, "format": fmt}
+    workers = client.publish(PROFILE_CHANNEL, json.dumps(command))
+
+    key = PROFILE_RESULTS_KEY.format(id=command_id)
+    deadline = time.monotonic() + seconds + grace_seconds
+    results = []
+
+    while len(results) < workers:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        item = client.blpop([key], timeout=max(1, int(remaining)))
+        if item is not None:
+            results.append(json.loads(item[1]))
+
+    return results
@@ -0,0 +1,21 @@
+from functools import lru_cache
+from typing import Optional
+
+import redis
+
+from app.core.config import settings
+
+
+@lru_cache
+def get_redis() -> Optional[redis.Redis]:
+    # Redis is optional, callers fall back to in-process state when it isn't configured
+    if not settings.REDIS_URL:
+        return None
+
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30,
+    )
@@ -0,0 +1,211 @@
+import functools
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, MutableMapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        SimpleSpanProcessor,
+        SpanExporter,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover
+    trace = SpanKind = None
+
+logger = logging.getLogger(__name__)
+
+SQL_SPANS_KEY = "tracing_spans"
+SQL_STATEMENT_MAX_LENGTH = 2000
+
+
+class Tracing:
+    """Process-wide tracer, every helper is a no-op until `configure` succeeds.
+
+    Sampling is decided once per trace at its root (`TRACING_SAMPLE_RATIO`) and followed
+    by every child, including the Celery tasks a request enqueues.
+    """
+
+    def __init__(self) -> None:
+        self.provider = None
+        self.tracer = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.tracer is not None
+
+    def configure(
+        self,
+        service_name: str,
+        exporter: Optional["SpanExporter"] = None,
+        sample_ratio: Optional[float] = None,
+    ) -> bool:
+        if trace is None:
+            logger.warning("Tracing is enabled but opentelemetry-sdk is not installed")
+            return False
+
+        if sample_ratio is None:
+            sample_ratio = settings.TRACING_SAMPLE_RATIO
+
+        if exporter is None:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            processor = BatchSpanProcessor(
+                OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+            )
+        else:
+            # Tests read the exporter right after the request
+            processor = SimpleSpanProcessor(exporter)
+
+        self.shutdown()
+        self.provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name}),
+            sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+        )
+        self.provider.add_span_processor(processor)
+        self.tracer = self.provider.get_tracer("app")
+
+        return True
+
+    def shutdown(self) -> None:
+        if self.provider is not None:
+            self.provider.shutdown()
+
+        self.provider = None
+        self.tracer = None
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: Optional["SpanKind"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        context: Optional[Any] = None,
+    ) -> Iterator[Optional[Any]]:
+        if self.tracer is None:
+            yield None
+            return
+
+        with self.tracer.start_as_current_span(
+            name, context=context, kind=kind or SpanKind.INTERNAL, attributes=attributes
+        ) as span:
+            yield span
+
+    def start_span(self, name: str, kind: Optional["SpanKind"] = None, **kwargs) -> Optional[Any]:
+        if self.tracer is None:
+            return None
+
+        return self.tracer.start_span(name, kind=kind or SpanKind.INTERNAL, **kwargs)
+
+    def inject(self, carrier: MutableMapping[str, str], span: Optional[Any] = None) -> None:
+        if self.tracer is None:
+            return
+
+        context = trace.set_span_in_context(span) if span is not None else None
+        propagate.inject(carrier, context=context)
+
+    def extract(self, carrier: Mapping[str, str]) -> Optional[Any]:
+        if self.tracer is None:
+            return None
+
+        return propagate.extract(carrier)
+
+    def attach(self, span: Any) -> Any:
+        return otel_context.attach(trace.set_span_in_context(span))
+
+    def detach(self, token: Any) -> None:
+        otel_context.detach(token)
+
+    def in_recording_span(self) -> bool:
+        # Child spans only, unsampled requests and background statements stay span-free
+        return self.tracer is not None and trace.get_current_span().is_recording()
+
+    def current_trace_id(self) -> Optional[str]:
+        if self.tracer is None:
+            return None
+
+        span_context = trace.get_current_span().get_span_context()
+        return format(span_context.trace_id, "032x") if span_context.is_valid else None
+
+
+tracing = Tracing()
+
+
+def configure_tracing(service_name: str) -> bool:
+    if not settings.TRACING_ENABLED:
+        return False
+
+    return tracing.configure(f"{settings.TRACING_SERVICE_NAME}-{service_name}")
+
+
+def end_span(span: Any, error: Optional[BaseException] = None) -> None:
+    if error is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+
+    span.end()
+
+
+def traced(name: str):
+    """Wraps a function in an INTERNAL span, e.g. password hashing and JWT work."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracing.in_recording_span():
+                return fn(*args, **kwargs)
+
+            with tracing.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if not tracing.in_recording_span():
+        return
+
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    span = tracing.start_span(
+        operation,
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:SQL_STATEMENT_MAX_LENGTH],
+            "db.operation": operation,
+        },
+    )
+    conn.info.setdefault(SQL_SPANS_KEY, []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    spans = conn.info.get(SQL_SPANS_KEY)
+    if spans:
+        end_span(spans.pop())
+
+
+def _handle_error(exception_context) -> None:
+    connection = exception_context.connection
+    spans = connection.info.get(SQL_SPANS_KEY) if connection is not None else None
+
+    if spans:
+        end_span(spans.pop(), exception_context.original_exception)
+
+
+def register_tracing_events(engine: Engine) -> None:
+    # One CLIENT span per statement, children of the route or task span
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
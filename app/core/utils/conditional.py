@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+def make_weak_etag(*parts: Any) -> str:
+    raw = "|".join(str(part) for part in parts).encode("utf-8")
+    digest = hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+    return f'W/"{digest}"'
+
+
+def model_etag(model, pk: Any, version: Any) -> str:
+    return make_weak_etag(model.__tablename__, pk, version)
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # Weak comparison as required for If-None-Match (RFC 9110 13.1.2)
+    header = request.headers.get("if-none-match")
+
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    expected = _opaque_tag(etag)
+
+    return any(_opaque_tag(tag) == expected for tag in header.split(","))
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+class VersionStampCache:
+    """Per-process TTL cache of (table, pk) -> version column value.
+
+    Holds at most `size` entries, the least recently used one is evicted on `set`.
+    Writes made through this process should call `invalidate`, writes from other
+    processes become visible after at most `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float, size: int) -> None:
+        self.ttl = ttl
+        self.size = size
+        self._data: OrderedDict[Tuple[str, Any], Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, table: str, pk: Any) -> Optional[Any]:
+        key = (table, pk)
+
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+
+        return value
+
+    def set(self, table: str, pk: Any, value: Any) -> None:
+        if self.ttl <= 0 or self.size <= 0:
+            return
+
+        key = (table, pk)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, table: str, pk: Any) -> None:
+        with self._lock:
+            self._data.pop((table, pk), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+version_stamps = VersionStampCache(
+    ttl=settings.ETAG_STAMP_CACHE_SECONDS, size=settings.ETAG_STAMP_CACHE_SIZE
+)
+
+
+def get_version_stamp(
+    session: Session,
+    model,
+    pk: Any,
+    column: Optional[sa.Column] = None,
+    criteria: Sequence[Any] = (),
+) -> Optional[datetime]:
+    # Loads only the version column (default `updated_at`), never the full row. With
+    # `criteria` (e.g. an active flag) the row is always checked, a cached stamp could
+    # outlive them
+    table = model.__tablename__
+
+    if not criteria:
+        stamp = version_stamps.get(table, pk)
+        if stamp is not None:
+            return stamp
+
+    column = column if column is not None else model.updated_at
+    stmt = sa.select(column).where(model.id == pk, *criteria)
+    stamp = session.scalars(stmt).first()
+
+    if stamp is not None:
+        version_stamps.set(table, pk, stamp)
+
+    return stamp
+
+
+def invalidate_version_stamp(model, pk: Any) -> None:
+    version_stamps.invalidate(model.__tablename__, pk)
+
+
+def not_modified_or_none(
+    request: Request, session: Session, model, pk: Any, criteria: Sequence[Any] = ()
+) -> Optional[Response]:
+    # Answers If-None-Match from the version stamp before the row is loaded/serialized,
+    # a row failing `criteria` falls through to the handler's full path
+    if not request.headers.get("if-none-match"):
+        return None
+
+    stamp = get_version_stamp(session, model, pk, criteria=criteria)
+    if stamp is None:
+        return None
+
+    etag = model_etag(model, pk, stamp)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    return None
+
+
+def set_etag(response: Response, model, pk: Any, version: Any) -> str:
+    version_stamps.set(model.__tablename__, pk, version)
+
+    etag = model_etag(model, pk, version)
+    response.headers.update(etag_headers(etag))
+
+    return etag
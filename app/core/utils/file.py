@@ -1,7 +1,7 @@
 import logging
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 from uuid import uuid4
 
 from fastapi import UploadFile
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from app.config.models import UploadedFile
 from app.core.config import MEDIA_ROOT
 from app.core.exceptions import ObjectNotFoundException
+from worker.tasks.media import enqueue_image_variants
 
 from .string import base64
 
@@ -35,6 +36,18 @@ def get_extension(filename: str):
     return name_list[-1]
 
 
+def new_media_path(root_folder: str, ext: str) -> Tuple[str, str]:
+    # (file_path stored on UploadedFile, full path on disk)
+    folder_path = get_folder_path(root_folder)
+    folder_location = f"{MEDIA_ROOT}/{folder_path}"
+    filename = f"{uuid4().hex}.{ext}"
+
+    if not os.path.exists(folder_location):
+        os.makedirs(folder_location, exist_ok=True)
+
+    return f"/{folder_path}/{filename}", f"{folder_location}/{filename}"
+
+
 def save_file(
     session: Session, user_id: int, upload_file: UploadFile, root_folder: str
 ) -> Optional[str]:
@@ -42,22 +55,12 @@ def save_file(
         return None
 
     ext = get_extension(upload_file.filename)
-
-    folder_path = get_folder_path(root_folder)
-    folder_location = f"{MEDIA_ROOT}/{folder_path}"
-    filename = f"{uuid4().hex}.{ext}"
-
-    if not os.path.exists(folder_location):
-        os.makedirs(folder_location)
-
-    file_full_path = f"{folder_location}/{filename}"
+    file_path, file_full_path = new_media_path(root_folder, ext)
 
     try:
         with open(file_full_path, "wb+") as file_object:
             file_object.write(upload_file.file.read())
 
-        file_path = f"/{folder_path}/{filename}"
-
         file_instance = UploadedFile(
             user_id=user_id,
             name=upload_file.filename,
@@ -67,13 +70,15 @@ def save_file(
 
         session.add(file_instance)
         session.commit()
-
-        return file_path
     except Exception as e:
-        logger.error(f"Error in save_file. Error {e}")
+        logger.error(f"Error in save_file. Error {e}", exc_info=e)
 
         return None
 
+    enqueue_image_variants(file_instance)
+
+    return file_path
+
 
 def get_media_full_path(file_path):
     return f"{MEDIA_ROOT}/{file_path}"
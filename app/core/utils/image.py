@@ -0,0 +1,75 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif", "bmp", "tiff", "avif"}
+FORMAT_EXTENSIONS = {"jpeg": "jpg"}
+
+# Immutable, a variant's path changes with its original
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def is_image(extension: Optional[str]) -> bool:
+    return bool(extension) and extension.lower() in IMAGE_EXTENSIONS
+
+
+def get_variant_spec(name: str) -> Optional[Dict[str, Any]]:
+    return settings.IMAGE_VARIANTS.get(name)
+
+
+def get_variant_path(file_path: str, name: str, spec: Dict[str, Any]) -> str:
+    # /file/MjAy/<uuid>.jpg -> /file/MjAy/<uuid>.thumb_128.webp, known without a DB lookup
+    base, _ = os.path.splitext(file_path)
+    fmt = spec.get("format", "webp").lower()
+
+    return f"{base}.{name}.{FORMAT_EXTENSIONS.get(fmt, fmt)}"
+
+
+def _convert_mode(image: Image.Image, fmt: str) -> Image.Image:
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+    if fmt == "JPEG":
+        return image if image.mode in ("RGB", "L") else image.convert("RGB")
+    if image.mode in ("RGB", "RGBA", "L"):
+        return image
+
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def render_variant(source: str, target: str, spec: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Writes one derivative of `source`, returns (width, height, size in bytes).
+
+    Runs in a worker's process pool. The orientation from EXIF is applied to the pixels
+    and no EXIF is written, which also drops GPS and camera data.
+    """
+    size = tuple(spec["size"]) if spec.get("size") else None
+    fmt = spec.get("format", "webp").upper()
+
+    with Image.open(source) as original:
+        if size:
+            # JPEG decodes at 1/2, 1/4 or 1/8 scale when that still covers the target
+            original.draft("RGB", size)
+
+        icc_profile = original.info.get("icc_profile")
+        image = ImageOps.exif_transpose(original)
+
+    if size and spec.get("crop"):
+        image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    elif size:
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+
+    image = _convert_mode(image, fmt)
+
+    options = {"quality": spec.get("quality", 80)}
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+
+    # Readers check for the variant on disk, never expose a partial file
+    tmp_path = f"{target}.tmp"
+    image.save(tmp_path, format=fmt, **options)
+    os.replace(tmp_path, target)
+
+    return image.width, image.height, os.path.getsize(target)
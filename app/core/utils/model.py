@@ -1,9 +1,11 @@
-def update_model(target_model, source_model):
-    # Update any model from pydantic model
+from typing import Optional
 
-    source_data = source_model.model_dump(exclude_unset=True)
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
 
-    for key, value in source_data.items():
-        setattr(target_model, key, value)
 
-    return target_model
+def update_by_id(session: Session, model, id: int, **values) -> Optional[object]:
+    # One UPDATE ... RETURNING, the identity-mapped instance (if any) is refreshed in place
+    stmt = sa.update(model).where(model.id == id).values(**values).returning(model)
+
+    return session.scalars(stmt).first()
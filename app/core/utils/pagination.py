@@ -0,0 +1,37 @@
+import base64
+import json
+from typing import Any, List, Sequence, Tuple
+
+from app.core.exceptions import CustomException
+
+
+class InvalidCursorException(CustomException):
+    code = 400
+    error_code = "INVALID_CURSOR"
+    message = "Invalid pagination cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    # Opaque to clients, the sort key of the last row of a page
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError as e:
+        raise InvalidCursorException from e
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursorException
+
+    # bool is an int, a float may come back as an int from JSON
+    if not all(
+        isinstance(value, (int, float) if kind is float else kind) and not isinstance(value, bool)
+        for value, kind in zip(values, types)
+    ):
+        raise InvalidCursorException
+
+    return values
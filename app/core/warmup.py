@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import anyio.to_thread
+import sqlalchemy as sa
+from fastapi import FastAPI
+
+from app.core.auth import PasswordUtils
+from app.core.auth.hashers import password_hashers
+from app.core.auth.jwt import JWTProvider, TokenData
+from app.core.config import settings
+from app.core.db.session import get_engine, get_sync_session
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+app_ready = registry.gauge("app_ready", "1 once the warmup finished and the pod takes traffic")
+warmup_seconds = registry.gauge("app_warmup_seconds", "Duration of the last successful warmup")
+
+# Ids/values that match no row, the statements still compile and run end to end
+MISSING_ID = 0
+MISSING_VALUE = ""
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self.ready = False
+        self.reason = "warming up"
+
+    def mark_ready(self) -> None:
+        self.ready, self.reason = True, ""
+        app_ready.set(1)
+
+    def mark_not_ready(self, reason: str) -> None:
+        self.ready, self.reason = False, reason
+        app_ready.set(0)
+
+
+readiness = Readiness()
+
+
+def warm_pool(connections: int) -> int:
+    # Connections above pool_size would be closed on checkin, so no point opening them
+    engine = get_engine()
+    connections = min(connections or settings.DB_POOL_SIZE, settings.DB_POOL_SIZE)
+
+    opened = [engine.connect() for _ in range(connections)]
+    try:
+        for connection in opened:
+            connection.execute(sa.text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+
+    return connections
+
+
+def warm_statements() -> None:
+    # Runs the hot lookups through their own code paths, filling the compiled cache
+    from app.core.deps.auth import get_principal, get_user, get_user_rstr
+    from app.core.utils.conditional import get_version_stamp
+    from app.user.models import User
+    from app.user.models_manager.forgot_password import ForgotPasswordManager
+    from app.user.models_manager.user import UserManager
+
+    with get_sync_session() as session:
+        get_user(session, TokenData(id=MISSING_ID, rstr=MISSING_VALUE))
+        get_principal(session, TokenData(id=MISSING_ID, rstr=MISSING_VALUE))
+        get_user_rstr(session, MISSING_ID)
+        get_version_stamp(session, User, MISSING_ID)
+        UserManager(session).get_user_by_id(MISSING_ID)
+        UserManager(session).get_user_by_email(MISSING_VALUE)
+        ForgotPasswordManager(session).get_by_token(MISSING_VALUE)
+
+
+def warm_partitions() -> None:
+    # Inserts don't depend on the beat task alone: every API start creates the current
+    # and next PARTITION_MONTHS_AHEAD months' partitions if they are missing
+    from app.core.db.base import Base
+    from app.core.db.partitions import maintain_partitions
+
+    with get_sync_session() as session:
+        maintain_partitions(session, Base.metadata, expire=False)
+
+
+def warm_validators(fastapi_app: FastAPI) -> None:
+    # Builds the JSON schema of every request/response model once
+    fastapi_app.openapi()
+
+
+def warm_auth() -> None:
+    token = JWTProvider.create_access_token(id=MISSING_ID, rstr=MISSING_VALUE)
+    JWTProvider.decode_access_token(token)
+
+    password_hashers.calibrate()
+    PasswordUtils.get_hashed_password(MISSING_VALUE)
+
+
+class Warmup:
+    """Prepares a new process before it is reported ready on /readyz."""
+
+    def __init__(self, retry_seconds: float) -> None:
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def run_sync(self, fastapi_app: FastAPI) -> None:
+        connections = warm_pool(settings.WARMUP_DB_CONNECTIONS)
+        warm_partitions()
+        warm_statements()
+        warm_validators(fastapi_app)
+        warm_auth()
+
+        logger.info(f"Warmup opened {connections} DB connections")
+
+    async def run_once(self, fastapi_app: FastAPI) -> None:
+        start = time.perf_counter()
+        await anyio.to_thread.run_sync(self.run_sync, fastapi_app)
+        warmup_seconds.set(time.perf_counter() - start)
+
+        readiness.mark_ready()
+
+    async def run(self, fastapi_app: FastAPI) -> None:
+        while True:
+            try:
+                await self.run_once(fastapi_app)
+                return
+            except Exception as e:
+                logger.error(f"Warmup failed, retrying in {self.retry_seconds}s. Error {e}")
+                readiness.mark_not_ready(f"warmup failed: {e}")
+
+            await asyncio.sleep(self.retry_seconds)
+
+    def start(self, fastapi_app: FastAPI) -> None:
+        if not settings.WARMUP_ENABLED:
+            readiness.mark_ready()
+            return
+
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(fastapi_app))
+
+    async def stop(self) -> None:
+        # Draining, the load balancer stops sending new requests
+        readiness.mark_not_ready("shutting down")
+
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+warmup = Warmup(retry_seconds=settings.WARMUP_RETRY_SECONDS)
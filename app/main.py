@@ -1,14 +1,34 @@
 import logging
 import traceback
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import DBAPIError
 
 from app.config.routers import router as config_router
+from app.core.admission import admission_controller
+from app.core.audit import audit_flusher
+from app.core.auth.session_store import session_store
+from app.core.capacity import capacity_monitor, configure_threadpool
 from app.core.config import settings
+from app.core.db.cancellation import cancellation_exception
+from app.core.db.write_behind import write_behind_flusher
 from app.core.exceptions import CustomException
+from app.core.idempotency import IdempotentReplay, get_replay_content
+from app.core.log import get_request_id, logging_pipeline
+from app.core.middleware.admission import AdmissionControlMiddleware
+from app.core.middleware.cancellation import CANCELLER_STATE_KEY, RequestCancellationMiddleware
+from app.core.middleware.compression import CompressionMiddleware
+from app.core.middleware.idempotency import IdempotencyMiddleware
+from app.core.middleware.profiling import RequestProfilingMiddleware
+from app.core.middleware.request_id import REQUEST_ID_HEADER, RequestIdMiddleware
+from app.core.middleware.tracing import TracingMiddleware
+from app.core.profiling import profile_listener
+from app.core.tracing import configure_tracing, tracing
+from app.core.warmup import warmup
 from app.user.routers import router as user_router
 
 logger = logging.getLogger(__name__)
@@ -27,18 +47,37 @@ def init_listeners(fastapi_app: FastAPI) -> None:
             content={"error_code": exc.error_code, "message": exc.message},
         )
 
+    @fastapi_app.exception_handler(IdempotentReplay)
+    async def idempotent_replay_handler(request: Request, exc: IdempotentReplay):
+        status_code, headers, body = get_replay_content(exc.record)
+        return Response(content=body, status_code=status_code, headers=headers)
+
+    @fastapi_app.exception_handler(DBAPIError)
+    async def db_exception_handler(request: Request, exc: DBAPIError):
+        # Cancelled/timed out statements become 504 (or 499 when the client left)
+        canceller = getattr(request.state, CANCELLER_STATE_KEY, None)
+        cancelled = cancellation_exception(exc, canceller)
+
+        if cancelled is not None:
+            return await custom_exception_handler(request, cancelled)
+
+        return await global_exception_handler(request, exc)
+
     @fastapi_app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
-        traceback_str = traceback.format_exc()
-        logger.error(traceback_str)
+        # The traceback is formatted by the logging thread, not on the event loop
+        logger.error(f"Unhandled exception on {request.method} {request.url.path}", exc_info=exc)
+
+        headers = {REQUEST_ID_HEADER: get_request_id()} if get_request_id() else None
 
         if settings.DEBUG:
             return JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "error_code": "INTERNAL_SERVER_ERROR",
-                    "message": traceback_str,
+                    "message": "".join(traceback.format_exception(exc)),
                 },
+                headers=headers,
             )
 
         return JSONResponse(
@@ -47,11 +86,15 @@ def init_listeners(fastapi_app: FastAPI) -> None:
                 "error_code": "INTERNAL_SERVER_ERROR",
                 "message": "Internal Server Error",
             },
+            headers=headers,
         )
 
 
 def make_middleware() -> list[Middleware]:
     middleware = [
+        Middleware(RequestIdMiddleware),
+        Middleware(TracingMiddleware),
+        Middleware(RequestProfilingMiddleware),
         Middleware(
             CORSMiddleware,
             allow_origins=["*"],
@@ -60,9 +103,53 @@ def make_middleware() -> list[Middleware]:
             allow_headers=["*"],
         ),
     ]
+
+    if settings.ADMISSION_ENABLED:
+        # After CORS, so browsers can read the 503 and its Retry-After
+        middleware.append(Middleware(AdmissionControlMiddleware, controller=admission_controller))
+
+    if settings.COMPRESSION_ENABLED:
+        middleware.append(
+            Middleware(
+                CompressionMiddleware,
+                levels=settings.COMPRESSION_LEVELS,
+                minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            )
+        )
+
+    middleware.append(
+        Middleware(RequestCancellationMiddleware, deadline=settings.REQUEST_DEADLINE_SECONDS)
+    )
+    # Innermost, stores the uncompressed body of Idempotent routes
+    middleware.append(Middleware(IdempotencyMiddleware))
+
     return middleware
 
 
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI):
+    logging_pipeline.start()
+    configure_tracing("api")
+    configure_threadpool()
+    capacity_monitor.start()
+    session_store.start_listener()
+    profile_listener.start()
+    write_behind_flusher.start()
+    audit_flusher.start()
+    warmup.start(fastapi_app)
+
+    yield
+
+    await warmup.stop()
+    await audit_flusher.stop()
+    await write_behind_flusher.stop()
+    profile_listener.stop()
+    session_store.stop_listener()
+    await capacity_monitor.stop()
+    tracing.shutdown()
+    logging_pipeline.stop()
+
+
 def create_app() -> FastAPI:
     fastapi_app = FastAPI(
         title="FastAPI SQL Boilerplate",
@@ -71,6 +158,7 @@ def create_app() -> FastAPI:
         docs_url=None if settings.ENV == "prod" else "/docs",
         redoc_url=None if settings.ENV == "prod" else "/redoc",
         middleware=make_middleware(),
+        lifespan=lifespan,
     )
     init_routers(fastapi_app=fastapi_app)
     init_listeners(fastapi_app=fastapi_app)
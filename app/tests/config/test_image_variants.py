@@ -0,0 +1,100 @@
+import io
+import os
+
+import pytest
+import sqlalchemy as sa
+from fastapi import status
+from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy.orm import Session
+
+from app.config.models import UploadedFile, UploadedFileVariant
+from app.core.utils.file import get_media_full_path
+from app.main import app
+from worker.tasks.media import generate_image_variants, shutdown_process_pool
+
+pytestmark = pytest.mark.usefixtures("media_root")
+
+EXIF_ORIENTATION = 0x0112
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    image = Image.new("RGB", (width, height), (200, 30, 30))
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6  # Displayed rotated by 90 degrees
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+async def test_image_variants(
+    client: AsyncClient, session: Session, default_user_headers: dict[str, str]
+):
+    files = {"file": ("photo.jpg", make_jpeg(300, 200), "image/jpeg")}
+    response = await client.post(
+        app.url_path_for("create_upload_file"), files=files, headers=default_user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    file_path = response.json()
+
+    media_url = app.url_path_for("get_file", file_path=file_path.lstrip("/"))
+
+    """Pending, the original is served"""
+    response = await client.get(media_url, params={"variant": "thumb_128"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-image-variant"] == "original"
+    assert response.headers["cache-control"] == "no-cache"
+
+    uploaded_file = session.scalars(
+        sa.select(UploadedFile).where(UploadedFile.file_path == file_path)
+    ).one()
+    try:
+        created_at = uploaded_file.created_at.isoformat()
+        assert generate_image_variants(uploaded_file.id, created_at=created_at) == 3
+    finally:
+        shutdown_process_pool()
+
+    variants = session.scalars(
+        sa.select(UploadedFileVariant).where(
+            UploadedFileVariant.uploaded_file_id == uploaded_file.id
+        )
+    ).all()
+    assert {variant.name: (variant.width, variant.height) for variant in variants} == {
+        "thumb_128": (128, 128),
+        "thumb_512": (200, 300),
+        "webp": (200, 300),
+    }
+
+    response = await client.get(media_url, params={"variant": "thumb_512"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-image-variant"] == "thumb_512"
+    assert "immutable" in response.headers["cache-control"]
+
+    image = Image.open(io.BytesIO(response.content))
+    assert image.format == "WEBP"
+    assert image.size == (200, 300)
+    assert not image.getexif()
+
+    response = await client.get(media_url, params={"variant": "unknown"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    for path in [file_path, *(variant.file_path for variant in variants)]:
+        os.remove(get_media_full_path(path))
+
+
+async def test_upload_survives_broker_errors(
+    client: AsyncClient, default_user_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+):
+    def fail(*args, **kwargs):
+        raise OSError("Broker unreachable")
+
+    monkeypatch.setattr(generate_image_variants, "delay", fail)
+
+    files = {"file": ("photo.jpg", make_jpeg(64, 64), "image/jpeg")}
+    response = await client.post(
+        app.url_path_for("create_upload_file"), files=files, headers=default_user_headers
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert os.path.isfile(get_media_full_path(response.json()))
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.orm import Session
+
+from app.config.models import UploadSession
+from app.core.config import settings
+from app.core.utils.file import get_media_full_path
+from app.core.utils.upload import expire_upload_sessions, get_staging_dir
+from app.main import app
+
+pytestmark = pytest.mark.usefixtures("media_root")
+
+CHUNK_SIZE = settings.UPLOAD_MIN_CHUNK_SIZE
+
+
+async def test_resumable_upload(client: AsyncClient, default_user_headers: dict[str, str]):
+    content = os.urandom(CHUNK_SIZE * 2 + 1000)
+    chunks = [content[i : i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)]
+
+    payload = {"name": "video.mp4", "size": len(content), "chunk_size": CHUNK_SIZE}
+    response = await client.post(
+        app.url_path_for("create_upload"), json=payload, headers=default_user_headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    key = response.json()["key"]
+    assert response.json()["chunk_count"] == 3
+
+    async def put_chunk(index: int):
+        url = app.url_path_for("upload_chunk", key=key, index=index)
+        return await client.put(url, content=chunks[index], headers=default_user_headers)
+
+    """Out of order, the first chunk is still missing"""
+    responses = await asyncio.gather(put_chunk(2), put_chunk(1))
+    assert all(response.status_code == status.HTTP_200_OK for response in responses)
+
+    response = await client.get(
+        app.url_path_for("get_upload", key=key), headers=default_user_headers
+    )
+    assert response.json()["offset"] == 0
+    assert response.json()["missing_chunks"] == [0]
+
+    complete_url = app.url_path_for("complete_upload", key=key)
+    response = await client.post(complete_url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    """A chunk of the wrong size is rejected"""
+    url = app.url_path_for("upload_chunk", key=key, index=0)
+    response = await client.put(url, content=chunks[0][:-1], headers=default_user_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await put_chunk(0)
+    assert response.json()["offset"] == len(content)
+
+    response = await client.post(complete_url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    file_path = response.json()
+
+    full_path = get_media_full_path(file_path)
+    with open(full_path, "rb") as file_object:
+        assert file_object.read() == content
+    assert not os.path.exists(get_staging_dir(key))
+
+    """Completing again returns the same file"""
+    response = await client.post(complete_url, headers=default_user_headers)
+    assert response.json() == file_path
+
+    os.remove(full_path)
+
+
+async def test_expire_upload_sessions(
+    client: AsyncClient, session: Session, default_user_headers: dict[str, str]
+):
+    payload = {"name": "video.mp4", "size": 10, "chunk_size": CHUNK_SIZE}
+    response = await client.post(
+        app.url_path_for("create_upload"), json=payload, headers=default_user_headers
+    )
+    key = response.json()["key"]
+
+    url = app.url_path_for("upload_chunk", key=key, index=0)
+    await client.put(url, content=b"0123456789", headers=default_user_headers)
+    assert os.path.exists(get_staging_dir(key))
+
+    session.execute(
+        sa.update(UploadSession)
+        .where(UploadSession.key == key)
+        .values(expire_at=datetime.now() - timedelta(minutes=1))
+    )
+    session.commit()
+
+    assert expire_upload_sessions(session) >= 1
+    assert not os.path.exists(get_staging_dir(key))
+
+    response = await client.get(
+        app.url_path_for("get_upload", key=key), headers=default_user_headers
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
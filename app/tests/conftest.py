@@ -8,9 +8,16 @@ from sqlalchemy.orm import Session
 
 from app.core.auth.jwt import JWTProvider
 from app.core.db.session import get_sync_session
+from app.core.utils import file as file_utils
+from app.core.utils import upload as upload_utils
 from app.main import app as fastapi_app
-from app.tests.data import get_or_create_default_user
+from app.tests.data import (
+    QueryCounter,
+    get_or_create_default_user,
+    get_or_create_super_admin,
+)
 from app.user.models import User
+from worker.tasks import media as media_tasks
 
 
 @pytest.fixture(scope="session")
@@ -27,6 +34,17 @@ async def fixture_session_with_rollback() -> AsyncGenerator[Session, None]:
         yield session
 
 
+@pytest.fixture(name="media_root", scope="function")
+def fixture_media_root(tmp_path, monkeypatch: pytest.MonkeyPatch) -> str:
+    # Uploads, variants and staged chunks go to a temporary directory
+    media_root = str(tmp_path / "media")
+    for module in (file_utils, media_tasks):
+        monkeypatch.setattr(module, "MEDIA_ROOT", media_root)
+    monkeypatch.setattr(upload_utils, "UPLOAD_STAGING_DIR", str(tmp_path / "upload_staging"))
+
+    return media_root
+
+
 @pytest_asyncio.fixture(name="client", scope="function")
 async def fixture_client() -> AsyncGenerator[AsyncClient, None]:
     transport = ASGITransport(app=fastapi_app)
@@ -35,6 +53,11 @@ async def fixture_client() -> AsyncGenerator[AsyncClient, None]:
         yield client
 
 
+@pytest.fixture(name="query_counter", scope="function")
+def fixture_query_counter() -> QueryCounter:
+    return QueryCounter()
+
+
 @pytest.fixture(name="default_user", scope="function")
 def fixture_default_user(session: Session) -> User:
     return get_or_create_default_user(session)
@@ -44,3 +67,10 @@ def fixture_default_user(session: Session) -> User:
 def fixture_default_user_headers(default_user: User) -> dict[str, str]:
     access_token = JWTProvider.create_access_token(default_user.id, default_user.rstr)
     return {"Authorization": f"Bearer {access_token}"}
+
+
+@pytest.fixture(name="super_admin_headers", scope="function")
+def fixture_super_admin_headers(session: Session) -> dict[str, str]:
+    super_admin = get_or_create_super_admin(session)
+    access_token = JWTProvider.create_access_token(super_admin.id, super_admin.rstr)
+    return {"Authorization": f"Bearer {access_token}"}
@@ -0,0 +1,69 @@
+import time
+
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.admission import (
+    DecayingAverage,
+    Priority,
+    admission_controller,
+    get_route_priority,
+    requests_shed_total,
+)
+from app.core.config import settings
+from app.main import app
+
+
+def get_route(name: str):
+    return next(route for route in app.routes if getattr(route, "name", None) == name)
+
+
+def test_route_priorities() -> None:
+    assert get_route_priority(get_route("registration")) == Priority.LOW
+    assert get_route_priority(get_route("create_upload")) == Priority.LOW
+    assert get_route_priority(get_route("token_login")) == Priority.HIGH
+    assert get_route_priority(get_route("get_profile")) == Priority.HIGH
+    assert get_route_priority(get_route("forgot_password_request")) == Priority.NORMAL
+    assert get_route_priority(get_route("get_healthz")) == Priority.CRITICAL
+
+
+def test_decaying_average() -> None:
+    average = DecayingAverage(half_life=0.05, weight=1.0)
+    average.observe(1.0)
+    assert average.value() > 0.5
+
+    time.sleep(0.2)
+    assert average.value() < 0.1
+
+
+async def test_load_shedding(client: AsyncClient, monkeypatch) -> None:
+    pool_wait = DecayingAverage(half_life=60.0, weight=1.0)
+    monkeypatch.setattr(admission_controller, "pool_wait", pool_wait)
+
+    registration_url = app.url_path_for("registration")
+    forgot_url = app.url_path_for("forgot_password_request")
+    shed = requests_shed_total.value(labels={"priority": "LOW"})
+
+    """Above the target only LOW routes are shed"""
+    pool_wait.observe(settings.ADMISSION_TARGET_QUEUE_WAIT_SECONDS * 1.5)
+
+    response = await client.post(registration_url, json={})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["error_code"] == "OVERLOADED"
+    assert int(response.headers["retry-after"]) >= settings.ADMISSION_RETRY_AFTER_SECONDS
+    assert requests_shed_total.value(labels={"priority": "LOW"}) == shed + 1
+
+    response = await client.post(forgot_url, json={})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    """Far above it NORMAL routes too, HIGH and CRITICAL still pass"""
+    pool_wait.observe(settings.ADMISSION_TARGET_QUEUE_WAIT_SECONDS * 10)
+
+    response = await client.post(forgot_url, json={})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    response = await client.post(app.url_path_for("token_login"), json={})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await client.get(app.url_path_for("get_healthz"))
+    assert response.status_code == status.HTTP_200_OK
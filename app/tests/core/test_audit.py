@@ -0,0 +1,102 @@
+from datetime import date, datetime
+
+import pytest
+import sqlalchemy as sa
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.orm import Session
+
+from app.core.audit import flush_audit_logs
+from app.core.config import settings
+from app.core.db.partitions import create_monthly_partition
+from app.main import app
+from app.tests.data import default_user_password
+from app.user.models import AuthEvent, User
+from app.user.models_manager import auth_event
+from app.user.models_manager.auth_event import auth_event_log
+
+
+async def test_login_events(client: AsyncClient, session: Session, default_user: User) -> None:
+    url = app.url_path_for("token_login")
+    started_at = datetime.now()
+
+    response = await client.post(url, json={"email": default_user.email, "password": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    payload = {"email": default_user.email, "password": default_user_password}
+    response = await client.post(url, json=payload, headers={"User-Agent": "audit-test"})
+    assert response.status_code == status.HTTP_200_OK
+
+    # Nothing written by the requests themselves
+    stmt = sa.select(AuthEvent).where(
+        AuthEvent.user_id == default_user.id, AuthEvent.created_at >= started_at
+    )
+    assert session.scalars(stmt).all() == []
+
+    flush_audit_logs(session)
+    events = session.scalars(stmt.order_by(AuthEvent.id)).all()
+
+    assert [event.event for event in events] == [auth_event.LOGIN_FAILED, auth_event.LOGIN]
+    assert events[1].user_agent == "audit-test"
+    assert events[1].request_id == response.headers["X-Request-ID"]
+
+
+def test_spill_and_replay(monkeypatch: pytest.MonkeyPatch, tmp_path, session: Session) -> None:
+    monkeypatch.setattr(settings, "AUDIT_SPILL_DIR", str(tmp_path))
+    flush_audit_logs(session)
+
+    # No partition for that month yet, the batch is spilled
+    created_at = datetime(2099, 1, 15)
+    auth_event_log.record(created_at=created_at, event=auth_event.LOGIN, email="spill@example.com")
+    with pytest.raises(Exception, match="no partition"):
+        flush_audit_logs(session)
+    assert len((tmp_path / "auth_event.jsonl").read_text().splitlines()) == 1
+
+    partition = create_monthly_partition(session.connection(), "auth_event", date(2099, 1, 1))
+    session.commit()
+    try:
+        assert flush_audit_logs(session) == 1
+        assert (tmp_path / "auth_event.jsonl").read_text() == ""
+
+        stmt = sa.select(AuthEvent.created_at).where(AuthEvent.email == "spill@example.com")
+        assert session.scalars(stmt).all() == [created_at]
+    finally:
+        session.execute(sa.text(f'DROP TABLE "{partition}"'))
+        session.commit()
+
+
+def test_invalid_events_are_rejected(
+    monkeypatch: pytest.MonkeyPatch, tmp_path, session: Session
+) -> None:
+    monkeypatch.setattr(settings, "AUDIT_SPILL_DIR", str(tmp_path))
+    flush_audit_logs(session)
+
+    invalid = {"created_at": datetime.now(), "event": auth_event.LOGIN_FAILED, "email": "x" * 300}
+    valid = {**invalid, "email": "rejected-test@example.com"}
+
+    """Spilled by an earlier flush, then buffered"""
+    auth_event_log.spill([tuple(invalid.get(column) for column in auth_event_log.columns)])
+    auth_event_log.record(**invalid)
+    auth_event_log.record(**valid)
+
+    assert flush_audit_logs(session) == 1
+    assert (tmp_path / "auth_event.jsonl").read_text() == ""
+    assert len((tmp_path / "auth_event.rejected.jsonl").read_text().splitlines()) == 2
+
+    stmt = sa.delete(AuthEvent).where(AuthEvent.email == valid["email"])
+    assert session.execute(stmt).rowcount == 1
+    session.commit()
+    assert flush_audit_logs(session) == 0
+
+
+async def test_long_login_email_is_truncated(client: AsyncClient, session: Session) -> None:
+    email = f"{'x' * 300}@example.com"
+    response = await client.post(
+        app.url_path_for("swagger_login"), data={"username": email, "password": "wrong"}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    assert flush_audit_logs(session) >= 1
+    stmt = sa.delete(AuthEvent).where(AuthEvent.email.startswith("x" * 255))
+    assert session.scalars(stmt.returning(AuthEvent.email)).all() == [email[:255]]
+    session.commit()
@@ -0,0 +1,64 @@
+import inspect
+
+from fastapi import status
+from fastapi.routing import APIRoute
+from httpx import AsyncClient
+from sqlalchemy.orm import Session
+
+from app.core.auth.jwt import TokenData
+from app.core.deps.auth import Principal, PrincipalResolver, get_principal
+from app.main import app
+from app.user.models import User
+
+
+def iter_dependencies(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency
+        yield from iter_dependencies(dependency)
+
+
+def is_async(call) -> bool:
+    for fn in (call, type(call).__call__):
+        if inspect.iscoroutinefunction(fn) or inspect.isasyncgenfunction(fn):
+            return True
+    return False
+
+
+def test_auth_dependencies_take_one_threadpool_hop() -> None:
+    """The resolver's blocking I/O runs in the threadpool, the other dependencies don't"""
+    for name in ["get_profile", "update_profile", "change_password", "force_logout"]:
+        route = next(r for r in app.routes if isinstance(r, APIRoute) and r.name == name)
+        sync_calls = [d.call for d in iter_dependencies(route.dependant) if not is_async(d.call)]
+
+        assert len(sync_calls) == 1, name
+        assert isinstance(sync_calls[0], PrincipalResolver), name
+
+
+async def test_token_required(client: AsyncClient) -> None:
+    response = await client.get(app.url_path_for("get_profile"))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_principal(
+    client: AsyncClient, session: Session, default_user: User, default_user_headers: dict
+) -> None:
+    principal = get_principal(session, TokenData(id=default_user.id, rstr=default_user.rstr))
+
+    assert principal == Principal(default_user.id, True, False)
+
+    # Upload routes authorize with the principal, `update_profile` upgrades it
+    response = await client.post(
+        app.url_path_for("create_upload"),
+        json={"name": "principal.txt", "size": 1},
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = await client.put(
+        app.url_path_for("update_profile"),
+        json={"full_name": default_user.full_name, "image": default_user.image},
+        headers=default_user_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["email"] == default_user.email
@@ -0,0 +1,110 @@
+import asyncio
+
+import anyio.to_thread
+import pytest
+import sqlalchemy as sa
+from fastapi import APIRouter, Depends, FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.orm import Session
+
+from app.core.db.cancellation import (
+    REASON_DEADLINE,
+    REASON_DISCONNECT,
+    ClientClosedRequestException,
+    QueryCanceller,
+    cancelled_queries_total,
+)
+from app.core.deps.db import SessionDep
+from app.core.deps.timeout import RouteTimeout
+from app.main import app
+
+router = APIRouter()
+
+
+@router.get("/slow", dependencies=[Depends(RouteTimeout(statement_timeout=0.2))])
+async def slow(session: SessionDep):
+    session.execute(sa.text("SELECT pg_sleep(2)"))
+
+
+@router.get("/deadline", dependencies=[Depends(RouteTimeout(deadline=0.2))])
+async def deadline(session: SessionDep):
+    session.execute(sa.text("SELECT pg_sleep(2)"))
+
+
+@router.get("/threadpool")
+async def threadpool(session: SessionDep):
+    await anyio.to_thread.run_sync(session.execute, sa.text("SELECT pg_sleep(2)"))
+
+
+def make_test_app() -> FastAPI:
+    test_app = FastAPI(middleware=app.user_middleware, exception_handlers=app.exception_handlers)
+    test_app.include_router(router)
+    return test_app
+
+
+async def test_route_statement_timeout() -> None:
+    test_app = make_test_app()
+
+    transport = ASGITransport(app=test_app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        timeouts = cancelled_queries_total.value(labels={"reason": "statement_timeout"})
+        response = await client.get("/slow")
+
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        assert response.json()["error_code"] == "DATABASE_TIMEOUT"
+        assert cancelled_queries_total.value(labels={"reason": "statement_timeout"}) == timeouts + 1
+
+        cancelled = cancelled_queries_total.value(labels={"reason": REASON_DEADLINE})
+        response = await client.get("/deadline")
+
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        assert cancelled_queries_total.value(labels={"reason": REASON_DEADLINE}) == cancelled + 1
+
+
+def test_cancelled_request_runs_no_more_statements(session: Session) -> None:
+    canceller = QueryCanceller()
+    session.info["canceller"] = canceller
+
+    session.execute(sa.text("SELECT 1"))
+    session.commit()
+
+    canceller.cancel("disconnect")
+
+    with pytest.raises(ClientClosedRequestException):
+        session.execute(sa.text("SELECT 1"))
+
+    session.info.pop("canceller")
+
+
+async def test_disconnect_cancels_query() -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/threadpool",
+        "raw_path": b"/threadpool",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"test")],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.2)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    cancelled = cancelled_queries_total.value(labels={"reason": REASON_DISCONNECT})
+    await asyncio.wait_for(make_test_app()(scope, receive, send), timeout=1.5)
+
+    assert sent[0]["status"] == 499
+    assert cancelled_queries_total.value(labels={"reason": REASON_DISCONNECT}) == cancelled + 1
@@ -0,0 +1,62 @@
+import anyio.to_thread
+import pytest
+import sqlalchemy as sa
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.orm import Session
+
+from app.core.capacity import (
+    CapacityMonitor,
+    configure_threadpool,
+    get_pool_capacity,
+    threadpool_wait_seconds,
+)
+from app.core.config import settings
+from app.core.db.session import get_engine, pool_wait_seconds
+from app.main import app
+
+
+async def test_threadpool_matches_pool_capacity() -> None:
+    tokens = configure_threadpool()
+
+    assert tokens == get_pool_capacity()
+    assert tokens == get_engine().pool.size() + get_engine().pool._max_overflow
+    assert anyio.to_thread.current_default_thread_limiter().total_tokens == tokens
+
+
+async def test_capacity_metrics(client: AsyncClient, session: Session) -> None:
+    checkouts = pool_wait_seconds.count()
+    session.execute(sa.text("SELECT 1"))
+    assert pool_wait_seconds.count() == checkouts + 1
+
+    probes = threadpool_wait_seconds.count()
+    await CapacityMonitor(interval=1.0).sample()
+    assert threadpool_wait_seconds.count() == probes + 1
+
+    response = await client.get(app.url_path_for("get_metrics"))
+
+    assert response.status_code == status.HTTP_200_OK
+    for name in ["db_pool_wait_seconds_count", "threadpool_waiting_tasks", "db_pool_checked_out"]:
+        assert name in response.text
+
+
+async def test_metrics_access(monkeypatch: pytest.MonkeyPatch) -> None:
+    url = app.url_path_for("get_metrics")
+    transport = ASGITransport(app=app, client=("203.0.113.7", 40000))
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        client.headers.update({"Host": "localhost"})
+
+        response = await client.get(url)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "metrics-token")
+        response = await client.get(url, headers={"Authorization": "Bearer wrong"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        response = await client.get(url, headers={"Authorization": "Bearer metrics-token"})
+        assert response.status_code == status.HTTP_200_OK
+
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+        monkeypatch.setattr(settings, "METRICS_ALLOWED_IPS", "10.0.0.0/8, 203.0.113.0/24")
+        response = await client.get(url)
+        assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,94 @@
+import gzip
+import json
+
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import settings
+from app.core.middleware.compression import CompressionMiddleware, negotiate_encoding
+
+payload = [
+    {"id": i, "email": f"user-{i}@example.com", "full_name": "User Name"} for i in range(200)
+]
+
+
+def make_app() -> FastAPI:
+    test_app = FastAPI()
+    test_app.add_middleware(
+        CompressionMiddleware, levels=settings.COMPRESSION_LEVELS, minimum_size=500
+    )
+
+    @test_app.get("/list")
+    async def get_list():
+        return payload
+
+    @test_app.get("/small")
+    async def get_small():
+        return {"message": "ok"}
+
+    @test_app.get("/image")
+    async def get_image():
+        return Response(content=b"\x89PNG" + b"\x00" * 2048, media_type="image/png")
+
+    @test_app.get("/stream")
+    async def get_stream():
+        async def rows():
+            for row in payload:
+                yield json.dumps(row) + "\n"
+
+        return StreamingResponse(rows(), media_type="text/plain")
+
+    return test_app
+
+
+async def fetch_raw(path: str, accept_encoding: str):
+    transport = ASGITransport(app=make_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Accept-Encoding": accept_encoding}
+        async with client.stream("GET", path, headers=headers) as response:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+            return response, body
+
+
+def test_negotiate_encoding() -> None:
+    available = ["br", "zstd", "gzip"]
+
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert negotiate_encoding("br;q=0, *", available) == "zstd"
+    assert negotiate_encoding("identity", available) is None
+
+
+async def test_compress_json() -> None:
+    response, body = await fetch_raw("/list", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert json.loads(gzip.decompress(body)) == payload
+    assert len(body) < len(json.dumps(payload)) / 4
+
+    response, body = await fetch_raw("/list", "br, gzip")
+
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(body)) == payload
+
+
+async def test_skip_small_and_compressed_media() -> None:
+    response, _ = await fetch_raw("/small", "gzip")
+    assert "content-encoding" not in response.headers
+
+    response, body = await fetch_raw("/image", "gzip")
+    assert "content-encoding" not in response.headers
+    assert body.startswith(b"\x89PNG")
+
+
+async def test_compress_streaming_response() -> None:
+    response, body = await fetch_raw("/stream", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+
+    rows = gzip.decompress(body).decode().splitlines()
+    assert [json.loads(row) for row in rows] == payload
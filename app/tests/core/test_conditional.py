@@ -0,0 +1,17 @@
+from app.core.utils.conditional import VersionStampCache
+
+
+def test_version_stamp_cache_is_bounded() -> None:
+    cache = VersionStampCache(ttl=60, size=3)
+
+    for pk in range(10):
+        cache.set("user", pk, pk)
+    assert len(cache) == 3
+    assert cache.get("user", 0) is None
+
+    """Reads keep an entry, the least recently used one is evicted"""
+    assert cache.get("user", 7) == 7
+    cache.set("user", 10, 10)
+    assert len(cache) == 3
+    assert cache.get("user", 7) == 7
+    assert cache.get("user", 8) is None
@@ -0,0 +1,19 @@
+import pytest
+
+from app.core.config import settings
+from app.core.db.session import get_connect_args
+
+
+@pytest.mark.parametrize(
+    "url, pgbouncer, expected",
+    [
+        ("postgresql+psycopg2://localhost/db", False, "missing"),
+        ("postgresql+psycopg://localhost/db", False, 2),
+        ("postgresql+psycopg://localhost/db", True, None),
+    ],
+)
+def test_prepare_threshold(monkeypatch, url: str, pgbouncer: bool, expected) -> None:
+    monkeypatch.setattr(settings, "DB_PREPARE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "DB_PGBOUNCER_MODE", pgbouncer)
+
+    assert get_connect_args(url).get("prepare_threshold", "missing") == expected
@@ -0,0 +1,90 @@
+import asyncio
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, FastAPI, status
+from httpx import ASGITransport, AsyncClient
+
+from app.core.deps.idempotency import Idempotent
+from app.core.idempotency import IDEMPOTENT_REPLAYED_HEADER, local_store
+from app.main import app
+from app.tests.data import default_user_password
+
+router = APIRouter()
+calls = []
+
+
+@router.post("/orders", status_code=status.HTTP_201_CREATED, dependencies=[Depends(Idempotent())])
+async def create_order(data: dict):
+    calls.append(data)
+    await asyncio.sleep(0.2)
+
+    return {"order": len(calls)}
+
+
+@router.post("/failing", dependencies=[Depends(Idempotent())])
+async def failing():
+    calls.append(None)
+    raise RuntimeError("failed")
+
+
+def make_test_app() -> FastAPI:
+    test_app = FastAPI(middleware=app.user_middleware, exception_handlers=app.exception_handlers)
+    test_app.include_router(router)
+    return test_app
+
+
+async def test_idempotent_replay() -> None:
+    local_store.clear()
+    calls.clear()
+
+    transport = ASGITransport(app=make_test_app(), raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Idempotency-Key": uuid4().hex}
+
+        # Concurrent duplicates wait for the first one
+        responses = await asyncio.gather(
+            *[client.post("/orders", json={"item": 1}, headers=headers) for _ in range(3)]
+        )
+        retry = await client.post("/orders", json={"item": 1}, headers=headers)
+
+        assert len(calls) == 1
+        for response in [*responses, retry]:
+            assert response.status_code == status.HTTP_201_CREATED
+            assert response.json() == {"order": 1}
+        assert sum(IDEMPOTENT_REPLAYED_HEADER in r.headers for r in responses) == 2
+        assert retry.headers[IDEMPOTENT_REPLAYED_HEADER] == "true"
+
+        response = await client.post("/orders", json={"item": 2}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.json()["error_code"] == "IDEMPOTENCY_KEY_REUSED"
+
+        response = await client.post("/orders", json={"item": 1})
+        assert response.json() == {"order": 2}
+
+        # Server errors aren't stored, the retry runs again
+        headers = {"Idempotency-Key": uuid4().hex}
+        for _ in range(2):
+            response = await client.post("/failing", headers=headers)
+            assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert len(calls) == 4
+
+
+async def test_registration_retry(client: AsyncClient) -> None:
+    url = app.url_path_for("registration")
+    payload = {
+        "email": f"testing-{uuid4().hex}@example.com",
+        "password": default_user_password,
+        "full_name": "User Name",
+    }
+    headers = {"Idempotency-Key": uuid4().hex}
+
+    response = await client.post(url, json=payload, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # Without the key the duplicate registration fails, with it the first response is replayed
+    response = await client.post(url, json=payload, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.headers[IDEMPOTENT_REPLAYED_HEADER] == "true"
+
+    response = await client.post(url, json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.auth.jwt import JWTProvider, TokenException
+from app.core.auth.keys import key_ring_provider, load_key_ring, rotate_keys, write_key
+from app.main import app
+
+
+@pytest.fixture(name="keys_dir")
+def fixture_keys_dir(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(key_ring_provider, "keys_dir", str(tmp_path))
+    monkeypatch.setattr(key_ring_provider, "_ring", None)
+    yield str(tmp_path)
+    key_ring_provider._ring = None
+
+
+@pytest.mark.parametrize("algorithm", ["EdDSA", "ES256"])
+def test_asymmetric_token(keys_dir: str, algorithm: str) -> None:
+    kid = write_key(keys_dir, algorithm, datetime.now(timezone.utc) - timedelta(minutes=1))
+
+    token = JWTProvider.create_access_token(id=1, rstr="rstr")
+
+    header = jwt.get_unverified_header(token)
+    assert header["kid"] == kid
+    assert header["alg"] == algorithm
+
+    assert JWTProvider.decode_access_token(token).id == 1
+
+    with pytest.raises(TokenException):
+        JWTProvider.decode_access_token(token[:-4] + "AAAA")
+
+
+def test_pending_key_is_not_used_for_signing(keys_dir: str) -> None:
+    now = datetime.now(timezone.utc)
+    active_kid = write_key(keys_dir, "EdDSA", now - timedelta(days=1))
+    write_key(keys_dir, "EdDSA", now + timedelta(days=1))
+
+    token = JWTProvider.create_access_token(id=1, rstr="rstr")
+
+    assert jwt.get_unverified_header(token)["kid"] == active_kid
+    assert len(load_key_ring(keys_dir).keys) == 2
+
+
+def test_rotate_keys(keys_dir: str) -> None:
+    now = datetime.now(timezone.utc)
+    period, lead = timedelta(days=30), timedelta(days=1)
+
+    first = rotate_keys(keys_dir, "EdDSA", period, lead, now=now)
+    assert len(first) == 1
+    assert rotate_keys(keys_dir, "EdDSA", period, lead, now=now + timedelta(days=1)) == []
+
+    second = rotate_keys(keys_dir, "EdDSA", period, lead, now=now + timedelta(days=29, hours=1))
+    assert len(second) == 1
+
+    """The first key is retired once every token it signed has expired"""
+    retired = rotate_keys(keys_dir, "EdDSA", period, lead, now=now + timedelta(days=61))
+    assert first[0] in retired
+
+
+async def test_jwks(client: AsyncClient, keys_dir: str) -> None:
+    kid = write_key(keys_dir, "EdDSA", datetime.now(timezone.utc))
+
+    response = await client.get(app.url_path_for("get_jwks"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "max-age" in response.headers["cache-control"]
+    assert [key["kid"] for key in response.json()["keys"]] == [kid]
+    assert "d" not in response.json()["keys"][0]
+
+    headers = {"If-None-Match": response.headers["etag"]}
+    response = await client.get(app.url_path_for("get_jwks"), headers=headers)
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_secret_key_tokens_are_rejected_after_cutover(keys_dir: str) -> None:
+    token = JWTProvider.create_access_token(id=1, rstr="rstr")
+    assert "kid" not in jwt.get_unverified_header(token)
+
+    write_key(keys_dir, "EdDSA", datetime.now(timezone.utc) - timedelta(days=1))
+    key_ring_provider._ring = None
+    """Still valid while refresh tokens issued before the keys may be in use"""
+    assert JWTProvider.decode_access_token(token).id == 1
+
+    write_key(keys_dir, "EdDSA", datetime.now(timezone.utc) - timedelta(days=31))
+    key_ring_provider._ring = None
+    with pytest.raises(TokenException):
+        JWTProvider.decode_access_token(token)
@@ -0,0 +1,101 @@
+import json
+import logging
+import queue
+import sys
+
+from celery.signals import task_prerun
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.log import (
+    BoundedQueueHandler,
+    ContextFilter,
+    JsonFormatter,
+    RequestContext,
+    SamplingFilter,
+    get_request_id,
+    log_records_dropped,
+    log_records_sampled_out,
+    request_context,
+)
+from app.main import app
+from worker.main import propagate_request_id
+from worker.tasks.email import send_email
+
+
+def make_record(level: int = logging.INFO, name: str = "app.test", exc_info=None):
+    return logging.LogRecord(name, level, __file__, 1, "hello %s", ("world",), exc_info)
+
+
+async def test_request_id_header(client: AsyncClient):
+    url = app.url_path_for("get_healthz")
+
+    response = await client.get(url, headers={"X-Request-ID": "client-id-1"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-request-id"] == "client-id-1"
+
+    response = await client.get(url, headers={"X-Request-ID": "bad id\n"})
+    assert len(response.headers["x-request-id"]) == 32
+
+
+def test_bounded_queue_drops() -> None:
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1))
+    dropped = log_records_dropped.value(labels={"level": "INFO"})
+
+    for _ in range(3):
+        handler.handle(make_record())
+
+    assert handler.queue.qsize() == 1
+    assert log_records_dropped.value(labels={"level": "INFO"}) == dropped + 2
+
+
+def test_sampling() -> None:
+    sampling = SamplingFilter({"app.access": 0.0})
+    sampled_out = log_records_sampled_out.value(labels={"logger": "app.access"})
+
+    assert sampling.filter(make_record(name="app.access")) is False
+    assert sampling.filter(make_record(logging.WARNING, name="app.access")) is True
+    assert sampling.filter(make_record()) is True
+    assert log_records_sampled_out.value(labels={"logger": "app.access"}) == sampled_out + 1
+
+
+def test_json_record() -> None:
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(logging.ERROR, exc_info=sys.exc_info())
+    record.duration_ms = 1.5
+
+    token = request_context.set(RequestContext("req-1", name="worker.tasks.email.send_email"))
+    try:
+        ContextFilter().filter(record)
+
+        headers = {}
+        propagate_request_id(headers=headers)
+        assert headers == {"request_id": "req-1"}
+    finally:
+        request_context.reset(token)
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["message"] == "hello world"
+    assert data["request_id"] == "req-1"
+    assert data["route"] == "worker.tasks.email.send_email"
+    assert data["duration_ms"] == 1.5
+    assert "ValueError: boom" in data["exception"]
+
+
+def test_task_request_id() -> None:
+    seen = []
+
+    def capture(**kwargs):
+        seen.append(get_request_id())
+
+    task_prerun.connect(capture)
+    try:
+        send_email.apply(headers={"request_id": "req-2"})
+    finally:
+        task_prerun.disconnect(capture)
+
+    assert seen == ["req-2"]
+    assert get_request_id() is None
@@ -0,0 +1,126 @@
+from collections.abc import Generator
+from datetime import date
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import exc
+from sqlalchemy.engine import Connection
+
+from app.core.db.cancellation import LOCK_NOT_AVAILABLE, get_sqlstate
+from app.core.db.migrations import (
+    add_check_constraint,
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    get_index_state,
+    set_lock_timeout,
+    set_not_null,
+)
+from app.core.db.partitions import ensure_monthly_partitions
+from app.core.db.session import get_engine
+
+
+@pytest.fixture(name="migration")
+def fixture_migration() -> Generator[Connection, None, None]:
+    # The helpers commit the migration's transaction, the tables are dropped afterwards
+    with get_engine().connect() as connection:
+        context = MigrationContext.configure(connection)
+        with Operations.context(context), context.begin_transaction():
+            yield connection
+
+    with get_engine().begin() as connection:
+        connection.execute(sa.text("DROP TABLE IF EXISTS migration_test, migration_test_parted"))
+
+
+def test_create_index_concurrently(migration: Connection) -> None:
+    migration.execute(sa.text("CREATE TABLE migration_test (id int, name text)"))
+    # Left by a failed CREATE INDEX CONCURRENTLY
+    migration.execute(sa.text("CREATE INDEX ix_migration_test_name ON migration_test (name)"))
+    migration.execute(
+        sa.text(
+            "UPDATE pg_index SET indisvalid = false"
+            " WHERE indexrelid = 'ix_migration_test_name'::regclass"
+        )
+    )
+
+    create_index_concurrently("ix_migration_test_name", "migration_test", ["name"])
+    assert get_index_state(migration, "ix_migration_test_name") is True
+    # Running it again is a no-op
+    create_index_concurrently("ix_migration_test_name", "migration_test", ["name"])
+
+    drop_index_concurrently("ix_migration_test_name", "migration_test")
+    assert get_index_state(migration, "ix_migration_test_name") is None
+
+
+def test_create_index_concurrently_partitioned(migration: Connection) -> None:
+    migration.execute(
+        sa.text(
+            "CREATE TABLE migration_test_parted (id int, created_at timestamp)"
+            " PARTITION BY RANGE (created_at)"
+        )
+    )
+    partitions = ensure_monthly_partitions(
+        migration, "migration_test_parted", 1, today=date(2026, 10, 1)
+    )
+
+    create_index_concurrently("ix_migration_test_parted_id", "migration_test_parted", ["id"])
+    create_index_concurrently("ix_migration_test_parted_id", "migration_test_parted", ["id"])
+
+    assert get_index_state(migration, "ix_migration_test_parted_id") is True
+    for partition in partitions:
+        assert get_index_state(migration, f"ix_{partition}_id") is True
+
+    # Later partitions get it from the parent
+    (partition,) = ensure_monthly_partitions(
+        migration, "migration_test_parted", 0, today=date(2027, 1, 1)
+    )
+    assert get_index_state(migration, f"{partition}_id_idx") is True
+
+    drop_index_concurrently("ix_migration_test_parted_id", "migration_test_parted")
+    assert get_index_state(migration, "ix_migration_test_parted_id") is None
+    assert get_index_state(migration, f"ix_{partitions[0]}_id") is None
+
+
+def test_backfill_and_constraints(migration: Connection) -> None:
+    migration.execute(sa.text("CREATE TABLE migration_test (id int, name text, size int)"))
+    migration.execute(
+        sa.text("INSERT INTO migration_test SELECT i, 'file', null FROM generate_series(1, 95) i")
+    )
+
+    assert backfill("migration_test", "size = id * 2", "size IS NULL", batch_size=10, pause=0) == 95
+    assert backfill("migration_test", "size = id * 2", "size IS NULL", batch_size=10) == 0
+    assert migration.scalar(sa.text("SELECT sum(size) FROM migration_test")) == 95 * 96
+
+    add_check_constraint("ck_migration_test_size", "migration_test", "size > 0")
+    set_not_null("migration_test", "size")
+
+    columns = {
+        column["name"]: column for column in sa.inspect(migration).get_columns("migration_test")
+    }
+    assert columns["size"]["nullable"] is False
+    checks = migration.execute(
+        sa.text(
+            "SELECT conname, convalidated FROM pg_constraint"
+            " WHERE conrelid = 'migration_test'::regclass"
+        )
+    ).all()
+    assert checks == [("ck_migration_test_size", True)]
+
+
+def test_lock_timeout(migration: Connection) -> None:
+    with get_engine().begin() as connection:
+        connection.execute(sa.text("CREATE TABLE migration_test (id int)"))
+
+    with get_engine().connect() as other, get_engine().connect() as connection:
+        other.execute(sa.text("LOCK TABLE migration_test IN SHARE MODE"))
+
+        set_lock_timeout(connection, 0.1)
+        with pytest.raises(exc.OperationalError) as e:
+            connection.execute(sa.text("ALTER TABLE migration_test ADD COLUMN name text"))
+        assert get_sqlstate(e.value) == LOCK_NOT_AVAILABLE
+
+        connection.rollback()
+        set_lock_timeout(connection, 0)
+        other.rollback()
@@ -0,0 +1,73 @@
+from datetime import date
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.core.db.base import Base
+from app.core.db.partitions import (
+    create_monthly_partition,
+    ensure_monthly_partitions,
+    expire_monthly_partitions,
+    list_partitions,
+    maintain_partitions,
+)
+from app.user.models import ForgotPassword
+from app.user.models_manager.forgot_password import ForgotPasswordManager
+
+
+def test_monthly_partitions(session: Session) -> None:
+    connection = session.connection()
+    connection.execute(
+        sa.text("CREATE TABLE audit_test (created_at timestamp) PARTITION BY RANGE (created_at)")
+    )
+
+    created = ensure_monthly_partitions(connection, "audit_test", 2, today=date(2026, 11, 20))
+    assert created == ["audit_test_p202611", "audit_test_p202612", "audit_test_p202701"]
+    assert ensure_monthly_partitions(connection, "audit_test", 2, today=date(2026, 11, 1)) == []
+
+    created = ensure_monthly_partitions(
+        connection, "audit_test", 0, today=date(2026, 11, 1), since=date(2026, 9, 30)
+    )
+    assert created == ["audit_test_p202609", "audit_test_p202610"]
+
+    today = date(2027, 1, 5)
+    assert expire_monthly_partitions(connection, "audit_test", 3, today=today) == [
+        "audit_test_p202609",
+        "audit_test_p202610",
+    ]
+    assert expire_monthly_partitions(connection, "audit_test", 2, detach=True, today=today) == [
+        "audit_test_p202611"
+    ]
+    assert list_partitions(connection, "audit_test") == ["audit_test_p202612", "audit_test_p202701"]
+    # Detached, not dropped
+    assert sa.inspect(connection).has_table("audit_test_p202611")
+
+    session.rollback()
+
+
+def test_token_lookup_is_pruned(session: Session) -> None:
+    old_partition = create_monthly_partition(
+        session.connection(), "forgot_password", date(2000, 1, 1)
+    )
+
+    def explain(stmt) -> str:
+        compiled = stmt.compile(
+            dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+        )
+        return "\n".join(session.scalars(sa.text(f"EXPLAIN {compiled}")))
+
+    manager = ForgotPasswordManager(session)
+    assert old_partition in explain(sa.select(ForgotPassword.id).where(ForgotPassword.token == "x"))
+    assert old_partition not in explain(
+        sa.select(ForgotPassword.id).where(*manager._valid_token_filter("x"))
+    )
+
+    session.rollback()
+
+
+def test_maintain_partitions(session: Session) -> None:
+    changes = maintain_partitions(session, Base.metadata)
+
+    assert set(changes) == {"auth_event", "forgot_password", "uploaded_file"}
+    assert ensure_monthly_partitions(session.connection(), "uploaded_file") == []
+    session.rollback()
@@ -0,0 +1,68 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.orm import Session
+
+from app.core.auth import PasswordUtils
+from app.core.auth.hashers import (
+    ARGON2ID,
+    BCRYPT,
+    BCRYPT_MIN_ROUNDS,
+    Argon2Hasher,
+    BcryptHasher,
+    PasswordHashers,
+    password_hashers,
+)
+from app.main import app
+from app.tests.data import default_user_password
+from app.user.models import User
+
+
+def test_password_hashers() -> None:
+    bcrypt_hasher = BcryptHasher(5)
+    hashers = PasswordHashers(BCRYPT, {BCRYPT: bcrypt_hasher})
+
+    weaker = BcryptHasher(4).hash("password")
+    assert hashers.verify("password", weaker) is True
+    assert hashers.needs_update(weaker) is True
+    assert hashers.needs_update(BcryptHasher(6).hash("password")) is False
+    assert hashers.verify("password", "not a hash") is False
+
+    # Bounded below, whatever the target
+    bcrypt_hasher.calibrate(0.000001)
+    assert bcrypt_hasher.rounds == BCRYPT_MIN_ROUNDS
+
+
+def test_argon2_hasher() -> None:
+    # argon2-cffi comes with the optional "argon2" extra
+    pytest.importorskip("argon2")
+
+    bcrypt_hasher = BcryptHasher(5)
+    argon2_hasher = Argon2Hasher(time_cost=2, memory_cost=8 * 1024, parallelism=1)
+    hashers = PasswordHashers(BCRYPT, {BCRYPT: bcrypt_hasher, ARGON2ID: argon2_hasher})
+
+    # Switching the default upgrades the other hasher's hashes
+    hashers.default = ARGON2ID
+    hashed = hashers.hash("password")
+    assert hashed.startswith("$argon2id$")
+    assert hashers.verify("password", hashed) is True
+    assert hashers.verify("wrong", hashed) is False
+    assert hashers.needs_update(hashed) is False
+    assert hashers.needs_update(bcrypt_hasher.hash("password")) is True
+    assert hashers.verify("password", "not a hash") is False
+
+
+async def test_rehash_on_login(client: AsyncClient, session: Session, default_user: User):
+    default_user.hashed_password = BcryptHasher(4).hash(default_user_password)
+    session.commit()
+
+    url = app.url_path_for("token_login")
+    payload = {"email": default_user.email, "password": default_user_password}
+    response = await client.post(url, json=payload)
+
+    assert response.status_code == status.HTTP_200_OK
+
+    # Rehashed by the background task, after the response
+    session.refresh(default_user)
+    assert PasswordUtils.needs_rehash(default_user.hashed_password) is False
+    assert password_hashers.verify(default_user_password, default_user.hashed_password) is True
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import sys
+import time
+
+from fastapi import FastAPI, status
+from fastapi.middleware import Middleware
+from httpx import ASGITransport, AsyncClient
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.middleware.profiling import RequestProfilingMiddleware
+from app.core.profiling import ProfileListener, new_profile_token, profile_lock
+from app.main import app
+
+
+async def test_profile_worker(
+    client: AsyncClient,
+    default_user_headers: dict[str, str],
+    super_admin_headers: dict[str, str],
+):
+    url = app.url_path_for("profile_worker")
+    params = {"seconds": 0.05}
+
+    response = await client.post(url, params=params, headers=default_user_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = await client.post(url, params=params, headers=super_admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["profiles"]
+
+    response = await client.post(
+        url, params={**params, "format": "collapsed"}, headers=super_admin_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "MainThread" in response.text
+
+    with profile_lock:
+        response = await client.post(url, params=params, headers=super_admin_headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+profiled_app = FastAPI(middleware=[Middleware(RequestProfilingMiddleware)])
+
+
+@profiled_app.get("/slow")
+def slow_handler():
+    time.sleep(0.2)
+    return {"ok": True}
+
+
+@profiled_app.get("/other")
+def other_handler():
+    time.sleep(0.2)
+    return {"ok": True}
+
+
+async def test_profile_request(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILER_SECRET", "profile-secret")
+    headers = {"X-Profile": new_profile_token(60)}
+
+    transport = ASGITransport(app=profiled_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/slow", headers={"X-Profile": "1.invalid"})
+        assert response.json() == {"ok": True}
+
+        """A concurrent request in another threadpool thread is not sampled"""
+        response, _ = await asyncio.gather(
+            client.get("/slow", headers=headers), client.get("/other")
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-profiled-status"] == "200"
+
+    names = {frame["name"] for frame in response.json()["shared"]["frames"]}
+    assert "slow_handler" in names
+    assert "other_handler" not in names
+
+
+class ResultsClient:
+    def __init__(self) -> None:
+        self.results = []
+
+    def rpush(self, key, value) -> None:
+        self.results.append(json.loads(value))
+
+    def expire(self, key, seconds) -> None:
+        pass
+
+
+def test_profile_command_is_bounded(monkeypatch) -> None:
+    client = ResultsClient()
+    monkeypatch.setattr(profiling, "get_redis", lambda: client)
+    monkeypatch.setattr(settings, "PROFILER_MAX_SECONDS", 0.05)
+
+    start = time.perf_counter()
+    ProfileListener()._run({"id": "test", "seconds": 3600, "format": "collapsed"})
+
+    assert time.perf_counter() - start < 5
+    assert "profile" in client.results[0]
+
+
+def test_worker_context_without_anyio_internals(monkeypatch) -> None:
+    monkeypatch.setattr(profiling, "_worker_thread_run_code", None)
+
+    assert profiling.get_worker_context(sys._getframe()) is None
@@ -0,0 +1,81 @@
+import pytest
+from celery.signals import before_task_publish
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.tracing import tracing
+from app.main import app
+from app.tests.data import default_user_password
+from app.user.models import User
+from worker.tasks.email import send_email
+
+# The SDK comes with the optional "tracing" extra
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import SpanKind  # noqa: E402
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture(name="span_exporter")
+def fixture_span_exporter():
+    exporter = InMemorySpanExporter()
+    tracing.configure("test", exporter=exporter, sample_ratio=1.0)
+    yield exporter
+    tracing.shutdown()
+
+
+async def test_request_spans(
+    client: AsyncClient, default_user: User, span_exporter: InMemorySpanExporter
+):
+    url = app.url_path_for("token_login")
+    payload = {"email": default_user.email, "password": default_user_password}
+    headers = {"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"}
+
+    response = await client.post(url, json=payload, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    spans = {span.name: span for span in span_exporter.get_finished_spans()}
+    server = spans[f"POST {url}"]
+
+    assert server.kind == SpanKind.SERVER
+    assert server.attributes["http.route"] == url
+    assert server.attributes["http.response.status_code"] == 200
+    assert {"SELECT", "password.verify", "jwt.encode"} <= set(spans)
+    assert spans["SELECT"].kind == SpanKind.CLIENT
+    assert all(format(span.context.trace_id, "032x") == TRACE_ID for span in spans.values())
+
+
+async def test_celery_propagation(
+    client: AsyncClient, default_user: User, span_exporter: InMemorySpanExporter
+):
+    published = []
+
+    def capture(headers=None, **kwargs):
+        published.append(dict(headers))
+
+    before_task_publish.connect(capture)
+    try:
+        response = await client.post(
+            app.url_path_for("forgot_password_request"), json={"email": default_user.email}
+        )
+    finally:
+        before_task_publish.disconnect(capture)
+    assert response.status_code == status.HTTP_200_OK
+
+    publish = next(
+        span for span in span_exporter.get_finished_spans() if span.name.startswith("publish")
+    )
+    assert publish.kind == SpanKind.PRODUCER
+    assert "traceparent" in published[0]
+
+    """The worker side, run with the headers of the published message"""
+    send_email.apply(headers={"traceparent": published[0]["traceparent"]})
+
+    run = next(span for span in span_exporter.get_finished_spans() if span.name.startswith("run"))
+    assert run.kind == SpanKind.CONSUMER
+    assert run.context.trace_id == publish.context.trace_id
+    assert run.parent.span_id == publish.context.span_id
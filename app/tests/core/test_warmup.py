@@ -0,0 +1,46 @@
+import sqlalchemy as sa
+from fastapi import status
+from httpx import AsyncClient
+
+from app.core.db.partitions import list_partitions
+from app.core.db.session import get_engine
+from app.core.warmup import Warmup, readiness, warm_partitions
+from app.main import app
+
+
+async def test_readiness_after_warmup(client: AsyncClient) -> None:
+    readiness.mark_not_ready("warming up")
+
+    response = await client.get(app.url_path_for("get_healthz"))
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(app.url_path_for("get_readyz"))
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["reason"] == "warming up"
+
+    await Warmup(retry_seconds=1.0).run_once(app)
+
+    response = await client.get(app.url_path_for("get_readyz"))
+    assert response.status_code == status.HTTP_200_OK
+
+
+async def test_not_ready_while_shutting_down(client: AsyncClient) -> None:
+    readiness.mark_ready()
+
+    await Warmup(retry_seconds=1.0).stop()
+
+    response = await client.get(app.url_path_for("get_readyz"))
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    readiness.mark_ready()
+
+
+def test_warmup_creates_missing_partitions() -> None:
+    with get_engine().begin() as connection:
+        partition = list_partitions(connection, "auth_event")[-1]
+        connection.execute(sa.text(f'DROP TABLE "{partition}"'))
+
+    warm_partitions()
+
+    with get_engine().connect() as connection:
+        assert partition in list_partitions(connection, "auth_event")
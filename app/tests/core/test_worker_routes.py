@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+from worker.main import celery_app
+from worker.tasks.email import send_email
+from worker.tasks.scheduled_job import ten_minute_crontab
+
+
+def test_task_routes() -> None:
+    route = celery_app.amqp.router.route({}, send_email.name)
+
+    assert route["queue"].name == "email"
+    assert route["priority"] == 0
+    assert send_email.ignore_result is True
+    assert send_email.acks_late is True
+
+    route = celery_app.amqp.router.route({}, ten_minute_crontab.name)
+    assert route["queue"].name == "scheduled"
+
+    route = celery_app.amqp.router.route({}, "unregistered.task")
+    assert route["queue"].name == "default"
+
+
+def test_autodiscovered_tasks() -> None:
+    # A fresh interpreter, this one may have imported the task modules already
+    code = (
+        "from worker.main import celery_app\n"
+        "celery_app.loader.import_default_modules()\n"
+        "print('\\n'.join(celery_app.tasks))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+    tasks = result.stdout.split()
+    assert "worker.tasks.email.send_email" in tasks
+    assert "worker.tasks.media.generate_image_variants" in tasks
+    assert "worker.tasks.scheduled_job.maintain_table_partitions" in tasks
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.core.db.write_behind import flush_write_behind
+from app.user.models import User
+from app.user.models_manager.user import UserManager, last_login_buffer
+
+
+def test_last_login_is_written_behind(session: Session, default_user: User) -> None:
+    updated_at = default_user.updated_at
+    last_login_buffer.drain_local()
+
+    UserManager(session).update_last_login(default_user.id)
+    session.expire_all()
+    assert session.get(User, default_user.id).last_login == default_user.last_login
+
+    flush_write_behind(session, include_redis=True)
+    session.expire_all()
+    user = session.get(User, default_user.id)
+
+    assert user.last_login is not None
+    assert user.last_login > datetime.now() - timedelta(minutes=1)
+    assert user.updated_at == updated_at
+
+
+def test_write_behind_keeps_latest_value(session: Session, default_user: User) -> None:
+    latest = datetime.now()
+
+    last_login_buffer.record_local(default_user.id, latest)
+    last_login_buffer.record_local(default_user.id, latest - timedelta(hours=1))
+    assert flush_write_behind(session, include_redis=False) == 1
+
+    # An older value never overwrites a newer one already in the table
+    last_login_buffer.record_local(default_user.id, latest - timedelta(hours=2))
+    flush_write_behind(session, include_redis=False)
+
+    session.expire_all()
+    assert session.get(User, default_user.id).last_login == latest
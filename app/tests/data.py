@@ -2,6 +2,7 @@ import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
 from app.core.auth import PasswordUtils
+from app.core.db.session import get_engine
 from app.core.utils.string import generate_rstr
 from app.user.models import User
 
@@ -9,6 +10,8 @@ default_user_email = "pytest@example.com"
 default_user_full_name = "Test User"
 default_user_password = "test-pass"
 
+super_admin_email = "pytest-admin@example.com"
+
 
 def get_or_create_default_user(session: Session):
     stmt = sa.select(User).where(User.email == default_user_email)
@@ -28,3 +31,46 @@ def get_or_create_default_user(session: Session):
         session.refresh(default_user)
 
     return default_user
+
+
+def get_or_create_super_admin(session: Session):
+    stmt = sa.select(User).where(User.email == super_admin_email)
+    super_admin = session.scalars(stmt).first()
+
+    if not super_admin:
+        super_admin = User(
+            email=super_admin_email,
+            full_name=default_user_full_name,
+            is_active=True,
+            is_super_admin=True,
+            hashed_password=PasswordUtils.get_hashed_password(default_user_password),
+            rstr=generate_rstr(31),
+        )
+
+        session.add(super_admin)
+        session.commit()
+        session.refresh(super_admin)
+
+    return super_admin
+
+
+class QueryCounter:
+    """Records the statements sent to the database inside a `with` block."""
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        self.statements = []
+        sa.event.listen(get_engine(), "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        sa.event.remove(get_engine(), "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
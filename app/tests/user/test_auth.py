@@ -1,5 +1,6 @@
 from uuid import uuid4
 
+import pytest
 import sqlalchemy as sa
 from fastapi import status
 from httpx import AsyncClient
@@ -7,10 +8,12 @@ from sqlalchemy.orm import Session
 
 from app.core.auth import PasswordUtils
 from app.core.auth.jwt import JWTProvider
+from app.core.auth.session_store import session_store
 from app.core.utils.string import generate_rstr
 from app.main import app
-from app.tests.data import default_user_password
+from app.tests.data import QueryCounter, default_user_password
 from app.user.models import ForgotPassword, User
+from app.user.models_manager.user import UserManager
 
 
 async def test_registration(client: AsyncClient) -> None:
@@ -120,3 +123,156 @@ async def test_forgot_password(client: AsyncClient, session: Session, default_us
 
     default_user.hashed_password = PasswordUtils.get_hashed_password(default_user_password)
     session.commit()
+
+
+async def test_change_password_revokes_sessions(
+    client: AsyncClient,
+    session: Session,
+    default_user: User,
+    default_user_headers: dict[str, str],
+):
+    profile_url = app.url_path_for("get_profile")
+
+    payload = {"old_password": default_user_password, "new_password": generate_rstr(10)}
+    change_response = await client.post(
+        app.url_path_for("change_password"), json=payload, headers=default_user_headers
+    )
+    assert change_response.status_code == status.HTTP_200_OK
+
+    response = await client.get(profile_url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    """The tokens returned by change password stay valid"""
+    new_headers = {"Authorization": f"Bearer {change_response.json()['access_token']}"}
+    response = await client.get(profile_url, headers=new_headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    default_user.hashed_password = PasswordUtils.get_hashed_password(default_user_password)
+    session.commit()
+
+
+async def test_force_logout(
+    client: AsyncClient,
+    default_user: User,
+    default_user_headers: dict[str, str],
+    super_admin_headers: dict[str, str],
+):
+    url = app.url_path_for("force_logout", user_id=default_user.id)
+
+    response = await client.post(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = await client.post(url, headers=super_admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(app.url_path_for("get_profile"), headers=default_user_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_registration_query_count(
+    client: AsyncClient, query_counter: QueryCounter, monkeypatch: pytest.MonkeyPatch
+):
+    url = app.url_path_for("registration")
+    payload = {
+        "email": f"testing-{uuid4().hex}@example.com",
+        "password": default_user_password,
+        "full_name": "User Name",
+    }
+
+    with query_counter:
+        response = await client.post(url, json=payload)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert query_counter.count == 2
+
+    """The same email again is rejected before the password is hashed"""
+    hashed = []
+    monkeypatch.setattr(PasswordUtils, "get_hashed_password", hashed.append)
+    with query_counter:
+        response = await client.post(url, json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert query_counter.count == 1
+    assert hashed == []
+    monkeypatch.undo()
+
+    """A registration racing past the check hits the ON CONFLICT path"""
+    monkeypatch.setattr(UserManager, "email_exists", lambda self, email: False)
+    response = await client.post(url, json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+async def test_login_query_count(
+    client: AsyncClient, default_user: User, query_counter: QueryCounter
+):
+    payload = {"email": default_user.email, "password": default_user_password}
+
+    with query_counter:
+        response = await client.post(app.url_path_for("token_login"), json=payload)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter.count == 1
+
+
+async def test_change_password_query_count(
+    client: AsyncClient,
+    session: Session,
+    default_user: User,
+    default_user_headers: dict[str, str],
+    query_counter: QueryCounter,
+):
+    session_store.set_current(default_user.id, default_user.rstr, publish=False)
+    payload = {"old_password": default_user_password, "new_password": generate_rstr(10)}
+
+    with query_counter:
+        response = await client.post(
+            app.url_path_for("change_password"), json=payload, headers=default_user_headers
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter.count == 2
+
+    default_user.hashed_password = PasswordUtils.get_hashed_password(default_user_password)
+    session.commit()
+
+
+async def test_forgot_password_query_count(
+    client: AsyncClient,
+    session: Session,
+    default_user: User,
+    query_counter: QueryCounter,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    with query_counter:
+        response = await client.post(
+            app.url_path_for("forgot_password_request"), json={"email": default_user.email}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter.count == 1
+
+    stmt = (
+        sa.select(ForgotPassword.token)
+        .where(ForgotPassword.user_id == default_user.id)
+        .order_by(sa.desc(ForgotPassword.id))
+    )
+    payload = {"new_password": "new-pass", "token": session.scalars(stmt).first()}
+    reset_url = app.url_path_for("forgot_password_reset")
+
+    with query_counter:
+        response = await client.post(reset_url, json=payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter.count == 2
+
+    response = await client.post(reset_url, json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["message"] == "Token already used"
+
+    hashed = []
+    monkeypatch.setattr(PasswordUtils, "get_hashed_password", hashed.append)
+    response = await client.post(reset_url, json={**payload, "token": generate_rstr(31)})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    """No hash without a valid token"""
+    assert hashed == []
+    monkeypatch.undo()
+
+    session.refresh(default_user)
+    default_user.hashed_password = PasswordUtils.get_hashed_password(default_user_password)
+    session.commit()
@@ -1,11 +1,15 @@
 from uuid import uuid4
 
+import pytest
 from fastapi import status
 from httpx import AsyncClient
 from sqlalchemy.orm import Session
 
+from app.core.auth.session_store import session_store
 from app.main import app
+from app.tests.data import QueryCounter
 from app.user.models import User
+from app.user.schemas.user import UserProfileOut
 
 
 async def test_get_profile(client: AsyncClient, default_user_headers: dict[str, str]) -> None:
@@ -34,3 +38,104 @@ async def test_update_profile(
     session.refresh(default_user)
 
     assert default_user.full_name, random_full_name
+
+
+async def test_get_profile_not_modified(
+    client: AsyncClient,
+    default_user_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    url = app.url_path_for("get_profile")
+
+    response = await client.get(url, headers=default_user_headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    serialize_calls = []
+    model_validate = UserProfileOut.model_validate
+
+    def counting_model_validate(*args, **kwargs):
+        serialize_calls.append(args)
+        return model_validate(*args, **kwargs)
+
+    monkeypatch.setattr(UserProfileOut, "model_validate", counting_model_validate)
+
+    headers = {**default_user_headers, "If-None-Match": etag}
+    cached_response = await client.get(url, headers=headers)
+
+    """The 304 carries no body and skips serialization"""
+    assert cached_response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached_response.headers["etag"] == etag
+    assert len(cached_response.content) == 0 < len(response.content)
+    assert serialize_calls == []
+
+
+async def test_get_profile_not_modified_inactive(
+    client: AsyncClient,
+    session: Session,
+    default_user: User,
+    default_user_headers: dict[str, str],
+) -> None:
+    url = app.url_path_for("get_profile")
+
+    response = await client.get(url, headers=default_user_headers)
+    headers = {**default_user_headers, "If-None-Match": response.headers["etag"]}
+
+    default_user.is_active = False
+    session.commit()
+
+    """A cached stamp doesn't answer 304 for a deactivated user"""
+    response = await client.get(url, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["message"] == "User is inactive"
+
+    default_user.is_active = True
+    session.commit()
+
+
+async def test_update_profile_changes_etag(
+    client: AsyncClient, default_user_headers: dict[str, str]
+) -> None:
+    url = app.url_path_for("get_profile")
+
+    response = await client.get(url, headers=default_user_headers)
+    etag = response.headers["etag"]
+
+    payload = {"full_name": f"{uuid4().hex} {uuid4().hex}", "image": ""}
+    update_response = await client.put(
+        app.url_path_for("update_profile"), json=payload, headers=default_user_headers
+    )
+    assert update_response.headers["etag"] != etag
+
+    headers = {**default_user_headers, "If-None-Match": etag}
+    response = await client.get(url, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["full_name"] == payload["full_name"]
+
+
+async def test_profile_query_count(
+    client: AsyncClient,
+    default_user: User,
+    default_user_headers: dict[str, str],
+    query_counter: QueryCounter,
+) -> None:
+    session_store.set_current(default_user.id, default_user.rstr, publish=False)
+    url = app.url_path_for("get_profile")
+
+    with query_counter:
+        response = await client.get(url, headers=default_user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter.count == 1
+
+    """Loading the principal, then a single UPDATE ... RETURNING"""
+    with query_counter:
+        response = await client.put(
+            app.url_path_for("update_profile"),
+            json={"full_name": f"{uuid4().hex} {uuid4().hex}", "image": ""},
+            headers=default_user_headers,
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert query_counter.count == 2
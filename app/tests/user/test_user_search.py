@@ -0,0 +1,66 @@
+import sqlalchemy as sa
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.orm import Session
+
+from app.core.utils.pagination import decode_cursor, encode_cursor
+from app.main import app
+from app.user.models import User
+from app.user.models_manager.user import UserManager
+
+
+def test_search_sqlite_fallback() -> None:
+    # No pg_trgm offline, same query and keyset pagination on SQLite
+    engine = sa.create_engine("sqlite://")
+    User.__table__.create(engine)
+
+    with Session(engine) as session:
+        for email, full_name in [
+            ("alice@example.com", "Alice Smith"),
+            ("bob@example.com", "Bob Alison"),
+            ("carol@example.com", "Carol Jones"),
+            ("mal_ice@example.com", "Mallory"),
+            ("dave@example.com", "Dave Alice"),
+        ]:
+            session.add(User(email=email, full_name=full_name, hashed_password="", rstr=""))
+        session.commit()
+
+        manager = UserManager(session)
+
+        # Prefix matches first, then by id, across pages
+        first = manager.search("ALI", limit=2)
+        last = first[-1]
+        second = manager.search("ALI", limit=2, after=[last.prefix, last.score, last.id])
+        assert [row.email for row in first + second] == [
+            "alice@example.com",
+            "bob@example.com",
+            "dave@example.com",
+        ]
+
+        # LIKE wildcards in the query are literal
+        assert [row.email for row in manager.search("l_i", limit=10)] == ["mal_ice@example.com"]
+
+
+def test_cursor() -> None:
+    cursor = encode_cursor([1, 0.3333333432674408, 42])
+
+    assert decode_cursor(cursor, (int, float, int)) == [1, 0.3333333432674408, 42]
+
+
+async def test_search_permissions(
+    client: AsyncClient, default_user_headers: dict, super_admin_headers: dict
+) -> None:
+    url = app.url_path_for("search_users")
+
+    response = await client.get(url, params={"q": "example"}, headers=default_user_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    for q in ["ex", "   ", "a  "]:
+        response = await client.get(url, params={"q": q}, headers=super_admin_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, q
+
+    response = await client.get(
+        url, params={"q": "example", "cursor": "not-a-cursor"}, headers=super_admin_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["error_code"] == "INVALID_CURSOR"
@@ -14,5 +14,5 @@ class InvalidCredentialsException(CustomException):
 
 
 class ForgotPasswordTokenException(CustomException):
-    code: 400
+    code = 400
     error_code = "FORGOT_PASSWORD_TOKEN"
@@ -10,6 +10,21 @@ from app.core.db.models_mixin import TimestampMixin
 
 class User(Base, TimestampMixin):
     __tablename__ = "user"
+    __table_args__ = (
+        # Substring and similarity search, see UserManager.search
+        sa.Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        sa.Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+    )
 
     email: Mapped[str] = mapped_column(sa.String(255), nullable=False, unique=True)
     full_name: Mapped[str] = mapped_column(sa.String(127), nullable=False)
@@ -27,8 +42,27 @@ class User(Base, TimestampMixin):
     uploaded_files = relationship("UploadedFile", back_populates="user")
 
 
+# The trigram indexes need it, create_all() runs it before creating the table
+sa.event.listen(
+    User.__table__,
+    "before_create",
+    sa.DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class ForgotPassword(Base, TimestampMixin):
     __tablename__ = "forgot_password"
+    # Monthly partitions (see app/core/db/partitions.py), tokens are looked up within
+    # their validity window so only the recent ones are scanned
+    __table_args__ = (
+        sa.Index("ix_forgot_password_token", "token"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Part of the primary key, the partition key must be in every unique constraint
+    created_at: Mapped[datetime] = mapped_column(
+        sa.DateTime, default=sa.func.now(), primary_key=True
+    )
 
     user_id: Mapped[int] = mapped_column(sa.Integer, sa.ForeignKey("user.id"))
     email: Mapped[str] = mapped_column(sa.String(255), nullable=False)
@@ -38,3 +72,25 @@ class ForgotPassword(Base, TimestampMixin):
     token: Mapped[str] = mapped_column(sa.String(255), nullable=False)
 
     user = relationship("User", back_populates="forgot_passwords")
+
+
+class AuthEvent(Base):
+    """Audit trail of logins and password changes, written by auth_event_log."""
+
+    __tablename__ = "auth_event"
+    __table_args__ = (
+        sa.Index("ix_auth_event_user_id_created_at", "user_id", "created_at"),
+        # Monthly partitions (see app/core/db/partitions.py), old months are dropped
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(sa.BigInteger(), primary_key=True, autoincrement=True)
+    # Part of the primary key, the partition key must be in every unique constraint
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime(), primary_key=True)
+    event: Mapped[str] = mapped_column(sa.String(31), nullable=False)
+    # No foreign key, the trail outlives the users
+    user_id: Mapped[Optional[int]] = mapped_column(sa.Integer(), nullable=True)
+    email: Mapped[Optional[str]] = mapped_column(sa.String(255), nullable=True)
+    ip_address: Mapped[Optional[str]] = mapped_column(sa.String(45), nullable=True)
+    user_agent: Mapped[Optional[str]] = mapped_column(sa.String(255), nullable=True)
+    request_id: Mapped[Optional[str]] = mapped_column(sa.String(128), nullable=True)
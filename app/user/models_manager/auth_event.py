@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Optional
+
+from starlette.datastructures import Headers
+
+from app.core.audit import AuditLog
+from app.core.log import request_context
+from app.user.models import AuthEvent
+
+LOGIN = "login"
+LOGIN_FAILED = "login_failed"
+PASSWORD_CHANGED = "password_changed"
+PASSWORD_RESET = "password_reset"
+
+EMAIL_MAX_LENGTH = 255
+USER_AGENT_MAX_LENGTH = 255
+
+auth_event_log = AuditLog(
+    AuthEvent,
+    ("created_at", "event", "user_id", "email", "ip_address", "user_agent", "request_id"),
+)
+
+
+def record_auth_event(event: str, user_id: Optional[int] = None, email: Optional[str] = None):
+    # Buffered, written by the audit flusher within AUDIT_FLUSH_SECONDS. The email of a
+    # failed login is whatever the client sent.
+    values = {
+        "created_at": datetime.now(),
+        "event": event,
+        "user_id": user_id,
+        "email": email[:EMAIL_MAX_LENGTH] if email else email,
+    }
+
+    context = request_context.get()
+    if context is not None:
+        values["request_id"] = context.request_id
+
+        if context.scope is not None:
+            client = context.scope.get("client")
+            user_agent = Headers(scope=context.scope).get("user-agent")
+            values["ip_address"] = client[0] if client else None
+            values["user_agent"] = user_agent[:USER_AGENT_MAX_LENGTH] if user_agent else None
+
+    auth_event_log.record(**values)
@@ -1,38 +1,121 @@
 from datetime import datetime, timedelta
 from secrets import token_hex
+from typing import Callable, Optional
 
 import sqlalchemy as sa
 from sqlalchemy.orm import Session, joinedload
 
 from app.core.config import FORGOT_PASSWORD_EXPIRE_MINUTES
 from app.core.db.manager import BaseManager
-from app.user.models import ForgotPassword
+from app.user.models import ForgotPassword, User
 
 
 class ForgotPasswordManager(BaseManager):
     def __init__(self, db: Session) -> None:
         super().__init__(db=db, model=ForgotPassword)
 
-    def create(self, user_id: int, email: str):
-        expire_at = datetime.now() + timedelta(minutes=FORGOT_PASSWORD_EXPIRE_MINUTES)
+    def _get_lifetime(self) -> timedelta:
+        return timedelta(minutes=FORGOT_PASSWORD_EXPIRE_MINUTES)
 
-        forgot_password_instance = ForgotPassword(
-            user_id=user_id,
-            email=email,
-            expire_at=expire_at,
-            token=token_hex(60),
+    def create(self, user_id: int, email: str):
+        # created_at from the same clock as expire_at, the token filter bounds both
+        now = datetime.now()
+        stmt = (
+            sa.insert(ForgotPassword)
+            .values(
+                user_id=user_id,
+                email=email,
+                created_at=now,
+                expire_at=now + self._get_lifetime(),
+                token=token_hex(60),
+            )
+            .returning(ForgotPassword)
         )
-        self.db.add(forgot_password_instance)
+        forgot_password_instance = self.db.scalars(stmt).one()
         self.db.commit()
 
         return forgot_password_instance
 
+    def create_for_email(self, email: str) -> Optional[str]:
+        # INSERT ... SELECT resolves the user in the same statement, None if there is no user
+        now = datetime.now()
+        user_select = sa.select(
+            User.id,
+            User.email,
+            sa.literal(now, sa.DateTime()),
+            sa.literal(now + self._get_lifetime(), sa.DateTime()),
+            sa.literal(token_hex(60), sa.String()),
+        ).where(User.email == email)
+
+        stmt = (
+            sa.insert(ForgotPassword)
+            .from_select(["user_id", "email", "created_at", "expire_at", "token"], user_select)
+            .returning(ForgotPassword.token)
+        )
+        token = self.db.scalars(stmt).first()
+        self.db.commit()
+
+        return token
+
+    def _valid_token_filter(self, token: str):
+        now = datetime.now()
+
+        # Only a valid token's partitions are scanned, the created_at bound prunes the rest
+        return (
+            ForgotPassword.token == token,
+            ForgotPassword.is_used.is_(False),
+            ForgotPassword.expire_at > now,
+            ForgotPassword.created_at > now - self._get_lifetime(),
+        )
+
+    def reset_password(self, token: str, get_user_values: Callable[[], dict]) -> Optional[tuple]:
+        """Consumes a valid token, then updates its user with `get_user_values()`.
+
+        The values (a password hash) are only computed once the token is known to be
+        valid, its row stays locked meanwhile so a concurrent reset with the same token
+        consumes nothing. Returns the user's (id, email, rstr), None when the token is
+        unknown, used or expired, the transaction is then rolled back.
+        """
+        use_token = (
+            sa.update(ForgotPassword)
+            .where(*self._valid_token_filter(token))
+            .values(is_used=True, used_at=datetime.now())
+            .returning(ForgotPassword.user_id)
+        )
+        user_id = self.db.scalars(use_token).first()
+
+        if user_id is None:
+            self.db.rollback()
+            return None
+
+        update_user = (
+            sa.update(User)
+            .where(User.id == user_id)
+            .values(**get_user_values())
+            .returning(User.id, User.email, User.rstr)
+        )
+        user = self.db.execute(update_user).first()
+
+        if user is None:
+            self.db.rollback()
+            return None
+
+        self.db.commit()
+
+        return user
+
+    def get_by_token(self, token: str) -> Optional[ForgotPassword]:
+        return ForgotPassword.find_first(self.db, token=token)
+
     def get_forgot_password_and_user_from_token(self, token: str):
         stmt = (
             sa.select(ForgotPassword)
             .where(ForgotPassword.token == token)
             .options(joinedload(ForgotPassword.user))
         )
-        forgot_password_instance = self.db.session.scalars(stmt).first()
+        forgot_password_instance = self.db.scalars(stmt).first()
+
+        if forgot_password_instance is None:
+            return None, None
 
         return forgot_password_instance, forgot_password_instance.user
@@ -1,63 +1,186 @@
 from datetime import datetime
+from typing import Any, List, Optional, Sequence
 
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from app.core.auth import PasswordUtils
+from app.core.auth.session_store import session_store
 from app.core.db.manager import BaseManager
+from app.core.db.write_behind import WriteBehindColumn
+from app.core.utils.model import update_by_id
 from app.core.utils.string import generate_rstr
 from app.user.models import User
 
+last_login_buffer = WriteBehindColumn(User, "last_login")
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_user_search(
+    table: sa.Table,
+    query: str,
+    dialect: str,
+    limit: int,
+    after: Optional[Sequence[Any]] = None,
+) -> sa.Select:
+    """Users whose email or name contains `query`, prefix matches first, then by
+    trigram similarity, then id. `after` is the (prefix, score, id) of the previous
+    page's last row.
+
+    On PostgreSQL the ILIKE filter is served by the pg_trgm GIN indexes. Other dialects
+    (SQLite in offline tests) scan and only rank prefix matches first.
+    """
+    query = query.strip().lower()
+    pattern = escape_like(query)
+    email, full_name = table.c.email, table.c.full_name
+
+    contains = sa.or_(
+        email.ilike(f"%{pattern}%", escape="\\"),
+        full_name.ilike(f"%{pattern}%", escape="\\"),
+    )
+    prefix = sa.case(
+        (
+            sa.or_(
+                email.ilike(f"{pattern}%", escape="\\"),
+                full_name.ilike(f"{pattern}%", escape="\\"),
+            ),
+            1,
+        ),
+        else_=0,
+    )
+
+    if dialect == "postgresql":
+        # double precision, the real similarity() returns doesn't survive a text round
+        # trip through the cursor exactly
+        score = sa.cast(
+            sa.func.greatest(
+                sa.func.similarity(email, query), sa.func.similarity(full_name, query)
+            ),
+            sa.Double,
+        )
+        order_by = [prefix.desc(), score.desc(), table.c.id.asc()]
+    else:
+        score = sa.literal(0.0)
+        order_by = [prefix.desc(), table.c.id.asc()]
+
+    stmt = sa.select(
+        table.c.id,
+        email,
+        full_name,
+        table.c.is_active,
+        prefix.label("prefix"),
+        score.label("score"),
+    ).where(contains)
+
+    if after is not None:
+        after_prefix, after_score, after_id = after
+        stmt = stmt.where(
+            sa.or_(
+                prefix < after_prefix,
+                sa.and_(prefix == after_prefix, score < after_score),
+                sa.and_(prefix == after_prefix, score == after_score, table.c.id > after_id),
+            )
+        )
+
+    return stmt.order_by(*order_by).limit(limit)
+
 
 class UserManager(BaseManager):
     def __init__(self, db: Session) -> None:
         super().__init__(db=db, model=User)
 
-    def _create(self, user: User):
-        self.db.add(user)
+    def email_exists(self, email: str) -> bool:
+        return self.db.scalar(sa.select(sa.exists().where(User.email == email))) is True
+
+    def _create(self, email: str, text_password: str, **values) -> Optional[User]:
+        # A taken email is rejected before the (deliberately slow) password hash, ON
+        # CONFLICT still returns None when a concurrent registration wins the race
+        if self.email_exists(email):
+            return None
+
+        stmt = (
+            insert(User)
+            .values(
+                email=email,
+                hashed_password=PasswordUtils.get_hashed_password(text_password),
+                **values,
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
+        )
+        user = self.db.scalars(stmt).first()
 
         self.db.commit()
-        self.db.refresh(user)
 
         return user
 
     def create_public_user(self, email: str, full_name: str, text_password: str):
-        user = User(
+        user = self._create(
             email=email,
+            text_password=text_password,
             full_name=full_name,
-            hashed_password=PasswordUtils.get_hashed_password(text_password),
             is_active=True,
             rstr=generate_rstr(31),
         )
-        user = self._create(user)
 
         return user
 
     def create_super_admin(self, email: str, full_name: str, text_password: str):
-        user = User(
+        user = self._create(
             email=email,
+            text_password=text_password,
             full_name=full_name,
-            hashed_password=PasswordUtils.get_hashed_password(text_password),
             is_active=True,
             is_super_admin=True,
             rstr=generate_rstr(31),
         )
-        user = self._create(user)
 
         return user
 
-    def update_last_login(self, user_id: int):
-        update_statement = (
-            sa.update(User).where(User.id == user_id).values(last_login=datetime.now())
+    def update_user(self, user_id: int, **values) -> Optional[User]:
+        return update_by_id(self.db, User, user_id, **values)
+
+    def revoke_sessions(self, user_id: int, **values) -> Optional[User]:
+        # Rotates rstr together with `values` in one UPDATE, commits and publishes it
+        user = self.update_user(user_id, rstr=generate_rstr(31), **values)
+        self.db.commit()
+
+        if user is not None:
+            session_store.set_current(user.id, user.rstr)
+
+        return user
+
+    def update_password_hash(self, user_id: int, old_hash: str, new_hash: str) -> bool:
+        # Compare-and-set, a password changed since the login isn't overwritten
+        stmt = (
+            sa.update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
         )
+        updated = self.db.execute(stmt).rowcount == 1
+        self.db.commit()
 
-        self.db.execute(update_statement)
+        return updated
+
+    def update_last_login(self, user_id: int):
+        # Written behind, flushed in batches every WRITE_BEHIND_FLUSH_SECONDS
+        last_login_buffer.record(user_id, datetime.now())
 
     def get_user_by_id(self, id: int):
         user = User.find_first(self.db, id=id)
 
         return user
 
+    def search(self, query: str, limit: int, after: Optional[Sequence[Any]] = None) -> List[Any]:
+        dialect = self.db.get_bind().dialect.name
+        stmt = build_user_search(User.__table__, query, dialect, limit, after)
+
+        return self.db.execute(stmt).all()
+
     def get_user_by_email(self, email: str):
         user = User.find_first(self.db, email=email)
 
@@ -1,15 +1,16 @@
-from datetime import datetime
-
-import sqlalchemy as sa
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
+from app.core.admission import Priority, route_priority
 from app.core.auth import PasswordUtils
-from app.core.auth.jwt import JWTProvider
+from app.core.auth.jwt import JWTProvider, TokenException
+from app.core.auth.session_store import session_store
 from app.core.config import FORGOT_PASSWORD_PATH, settings
+from app.core.db.session import get_sync_session
 from app.core.deps.auth import CurrentUser
 from app.core.deps.db import SessionDep
+from app.core.deps.idempotency import Idempotent
 from app.core.exceptions import ObjectNotFoundException
 from app.core.utils.string import generate_rstr
 from worker.tasks.email import send_email
@@ -19,7 +20,9 @@ from ..exception import (
     ForgotPasswordTokenException,
     InvalidCredentialsException,
 )
-from ..models import ForgotPassword, User
+from ..models import User
+from ..models_manager import auth_event
+from ..models_manager.auth_event import record_auth_event
 from ..models_manager.forgot_password import ForgotPasswordManager
 from ..models_manager.user import UserManager
 from ..schemas.auth import (
@@ -36,41 +39,62 @@ router = APIRouter(
 )
 
 
-@router.post("/registration", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/registration",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[route_priority(Priority.LOW), Depends(Idempotent())],
+)
 async def registration(
     data: RegistrationIn,
     session: SessionDep,
 ):
     user_manager = UserManager(session)
-    user = user_manager.get_user_by_email(data.email)
-
-    if user:
-        raise EmailExistsException(message="User with email exists")
-
-    user_manager = UserManager(session)
 
     user = user_manager.create_public_user(
         email=data.email, full_name=data.full_name, text_password=data.password
     )
 
+    if user is None:
+        raise EmailExistsException(message="User with email exists")
+
     return {"message": "User created"}
 
 
-def handle_login(session: Session, email: str, password: str):
+def rehash_password(user_id: int, password: str, old_hash: str):
+    new_hash = PasswordUtils.get_hashed_password(password)
+
+    with get_sync_session() as session:
+        UserManager(session).update_password_hash(user_id, old_hash, new_hash)
+
+
+def handle_login(session: Session, email: str, password: str, background_tasks: BackgroundTasks):
     user_manager = UserManager(session)
 
     user = user_manager.get_user_by_email(email)
 
     if not user:
+        record_auth_event(auth_event.LOGIN_FAILED, email=email)
         raise InvalidCredentialsException
 
     if not PasswordUtils.verify_password(password, user.hashed_password):
+        record_auth_event(auth_event.LOGIN_FAILED, user_id=user.id, email=email)
         raise InvalidCredentialsException
 
-    access_token = JWTProvider.create_access_token(id=user.id, rstr="temp")
-    refresh_token = JWTProvider.create_refresh_token(id=user.id, rstr="temp")
+    if PasswordUtils.needs_rehash(user.hashed_password):
+        # After the response, the login doesn't pay for a second hash
+        background_tasks.add_task(rehash_password, user.id, password, user.hashed_password)
 
     user_manager.update_last_login(user.id)
+    record_auth_event(auth_event.LOGIN, user_id=user.id, email=user.email)
+
+    session_store.fill(user.id, user.rstr)
+
+    return create_tokens(user)
+
+
+def create_tokens(user: User):
+    access_token = JWTProvider.create_access_token(id=user.id, rstr=user.rstr)
+    refresh_token = JWTProvider.create_refresh_token(id=user.id, rstr=user.rstr)
 
     return {"access_token": access_token, "refresh_token": refresh_token}
 
@@ -78,22 +102,24 @@ def handle_login(session: Session, email: str, password: str):
 @router.post("/swagger-login")
 async def swagger_login(
     session: SessionDep,
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    return handle_login(session, form_data.username, form_data.password)
+    return handle_login(session, form_data.username, form_data.password, background_tasks)
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[route_priority(Priority.HIGH)])
 async def token_login(
     data: LoginIn,
     session: SessionDep,
+    background_tasks: BackgroundTasks,
 ):
-    token = handle_login(session, data.email, data.password)
+    token = handle_login(session, data.email, data.password, background_tasks)
 
     return token
 
 
-@router.post("/refresh-token")
+@router.post("/refresh-token", dependencies=[route_priority(Priority.HIGH)])
 async def refresh_token(
     session: SessionDep,
     data: RefreshTokenIn,
@@ -107,7 +133,10 @@ async def refresh_token(
     if not user:
         raise ObjectNotFoundException(message="Invalid user token")
 
-    access_token = JWTProvider.create_access_token(id=user.id, rstr="temp")
+    if user.rstr != refresh_token_payload.rstr:
+        raise TokenException(message="Session is revoked")
+
+    access_token = JWTProvider.create_access_token(id=user.id, rstr=user.rstr)
 
     return {"access_token": access_token}
 
@@ -124,28 +153,30 @@ async def change_password(
     if not PasswordUtils.verify_password(old_password, user.hashed_password):
         raise InvalidCredentialsException(message="Invalid password")
 
-    user.hashed_password = PasswordUtils.get_hashed_password(new_password)
-    session.commit()
+    user = UserManager(session).revoke_sessions(
+        user.id, hashed_password=PasswordUtils.get_hashed_password(new_password)
+    )
+    record_auth_event(auth_event.PASSWORD_CHANGED, user_id=user.id, email=user.email)
 
-    return {"message": "Successfully change the password"}
+    # Other sessions are revoked, the current client continues with the new tokens
+    return {"message": "Successfully change the password", **create_tokens(user)}
 
 
-@router.post("/forgot-password-request")
+@router.post("/forgot-password-request", dependencies=[Depends(Idempotent())])
 async def forgot_password_request(
     session: SessionDep,
     data: ForgotPasswordRequestIn,
 ):
-    user = User.get_obj_or_404(session=session, email=data.email)
-
     forgot_password_manager = ForgotPasswordManager(db=session)
-    forgot_password_instance = forgot_password_manager.create(user_id=user.id, email=data.email)
+    token = forgot_password_manager.create_for_email(data.email)
 
-    forgot_password_url = (
-        f"{settings.API_HOST}/{FORGOT_PASSWORD_PATH}?token={forgot_password_instance.token}"
-    )
+    if token is None:
+        raise ObjectNotFoundException(message="Object not found")
+
+    forgot_password_url = f"{settings.API_HOST}/{FORGOT_PASSWORD_PATH}?token={token}"
 
     send_email.delay(
-        to=[user.email],
+        to=[data.email],
         subject="Forgot password request",
         data={
             "url": forgot_password_url,
@@ -160,30 +191,32 @@ async def forgot_password_reset(
     session: SessionDep,
     data: ForgotPasswordResetIn,
 ):
-    stmt = (
-        sa.select(ForgotPassword)
-        .where(ForgotPassword.token == data.token)
-        .options(joinedload(ForgotPassword.user))
-    )
-    forgot_password_instance = session.scalars(stmt).first()
+    def get_user_values() -> dict:
+        # Hashed only for a valid token
+        user_values = {"hashed_password": PasswordUtils.get_hashed_password(data.new_password)}
+        if data.force_logout is True:
+            user_values["rstr"] = generate_rstr(31)
+        return user_values
 
-    user = forgot_password_instance.user
+    forgot_password_manager = ForgotPasswordManager(db=session)
+    user = forgot_password_manager.reset_password(data.token, get_user_values)
 
-    if forgot_password_instance.is_used:
-        raise ForgotPasswordTokenException(message="Token already used")
+    if user is None:
+        # Only the failure path reads the token, to tell the client why
+        forgot_password_instance = forgot_password_manager.get_by_token(data.token)
 
-    if forgot_password_instance.expire_at < datetime.now():
-        raise ForgotPasswordTokenException(message="Token is expired")
+        if forgot_password_instance is None:
+            raise ForgotPasswordTokenException(message="Invalid token")
 
-    forgot_password_instance.is_used = True
-    forgot_password_instance.used_at = datetime.now()
+        if forgot_password_instance.is_used:
+            raise ForgotPasswordTokenException(message="Token already used")
 
-    user.hashed_password = PasswordUtils.get_hashed_password(data.new_password)
+        raise ForgotPasswordTokenException(message="Token is expired")
 
     if data.force_logout is True:
-        user.rstr = generate_rstr(31)
+        session_store.set_current(user.id, user.rstr)
 
-    session.commit()
+    record_auth_event(auth_event.PASSWORD_RESET, user_id=user.id, email=user.email)
 
     send_email.delay(to=[user.email], subject="New password set")
 
@@ -1,30 +1,114 @@
-from fastapi import APIRouter
+from typing import Annotated, Optional
 
-from app.core.deps.auth import CurrentUser
+from fastapi import APIRouter, Query, Request, Response
+from pydantic import StringConstraints
+
+from app.core.admission import Priority, route_priority
+from app.core.deps.auth import (
+    AuthenticatedTokenData,
+    CurrentPrincipal,
+    SuperPrincipal,
+    UserException,
+    get_request_user,
+    upgrade_principal,
+)
 from app.core.deps.db import SessionDep
-from app.core.utils.model import update_model
+from app.core.exceptions import ObjectNotFoundException
+from app.core.utils.conditional import not_modified_or_none, set_etag
+from app.core.utils.pagination import decode_cursor, encode_cursor
 
-from ..schemas.user import UserProfileIn, UserProfileOut
+from ..models import User
+from ..models_manager.user import UserManager
+from ..schemas.user import UserProfileIn, UserProfileOut, UserSearchOut
 
 router = APIRouter(prefix="/user")
 
+# Shorter queries have no trigram to look up in the index, checked once stripped
+USER_SEARCH_MIN_LENGTH = 3
+UserSearchQuery = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, min_length=USER_SEARCH_MIN_LENGTH, max_length=255),
+]
+
 
-@router.get("/profile", response_model=UserProfileOut)
+@router.get("/profile", response_model=UserProfileOut, dependencies=[route_priority(Priority.HIGH)])
 async def get_profile(
-    user: CurrentUser,
+    request: Request,
+    response: Response,
+    token_data: AuthenticatedTokenData,
+    session: SessionDep,
 ):
+    # A deactivated or deleted user gets the 200 path's error, not a 304
+    not_modified = not_modified_or_none(
+        request, session, User, token_data.id, criteria=[User.is_active.is_(True)]
+    )
+    if not_modified:
+        return not_modified
+
+    user = get_request_user(request, session, token_data)
+    if user is None:
+        raise UserException(message="User not found")
+
+    set_etag(response, User, user.id, user.updated_at)
+
     return UserProfileOut.model_validate(user)
 
 
 @router.put("/profile", response_model=UserProfileOut)
 async def update_profile(
-    user: CurrentUser,
+    request: Request,
+    principal: CurrentPrincipal,
+    response: Response,
     session: SessionDep,
     data: UserProfileIn,
 ):
-    user = update_model(user, data)
+    values = data.model_dump(exclude_unset=True)
+
+    if values:
+        # UPDATE ... RETURNING loads the full entity, no separate upgrade
+        user = UserManager(session).update_user(principal.id, **values)
+        if user is None:
+            raise UserException(message="User not found")
+    else:
+        user = upgrade_principal(request, session, principal)
+
     session.commit()
 
-    session.refresh(user)
+    set_etag(response, User, user.id, user.updated_at)
 
     return UserProfileOut.model_validate(user)
+
+
+@router.post("/{user_id}/logout")
+async def force_logout(
+    user_id: int,
+    _: SuperPrincipal,
+    session: SessionDep,
+):
+    user = UserManager(session).revoke_sessions(user_id)
+
+    if user is None:
+        raise ObjectNotFoundException(message="Object not found")
+
+    return {"message": "User is logged out from all devices"}
+
+
+@router.get("/search", response_model=UserSearchOut)
+async def search_users(
+    _: SuperPrincipal,
+    session: SessionDep,
+    q: Annotated[UserSearchQuery, Query()],
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    after = decode_cursor(cursor, (int, float, int)) if cursor else None
+
+    # One extra row tells whether there is a next page
+    rows = UserManager(session).search(q, limit + 1, after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([last.prefix, last.score, last.id])
+
+    return {"items": rows[:limit], "next_cursor": next_cursor}
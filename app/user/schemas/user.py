@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -17,3 +17,17 @@ class UserProfileIn(BaseModel):
 
     full_name: str = Field(..., description="Full Name")
     image: Optional[str] = Field(..., description="Profile Image")
+
+
+class UserSearchItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int = Field(..., description="ID")
+    email: str = Field(..., description="Email")
+    full_name: str = Field(..., description="Full Name")
+    is_active: bool = Field(..., description="Is Active")
+
+
+class UserSearchOut(BaseModel):
+    items: List[UserSearchItem] = Field(..., description="Best matches first")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, if any")
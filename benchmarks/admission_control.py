@@ -0,0 +1,118 @@
+"""Load test: goodput under overload without and with admission control.
+
+    DB_URL=postgresql+psycopg2://... python -m benchmarks.admission_control
+
+Open-loop arrivals at OVERLOAD x the DB capacity, half LOW (upload-like) and half HIGH
+(profile-like) requests, each holding a connection for QUERY_SECONDS. Goodput counts
+responses within SLO_SECONDS. Without shedding every request queues for the pool and
+most miss the SLO; with it LOW requests are rejected early and HIGH ones stay fast.
+"""
+
+import asyncio
+import statistics
+import time
+from typing import Optional
+
+import sqlalchemy as sa
+from fastapi import FastAPI
+from fastapi.middleware import Middleware
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+
+import app.core.db.session as db_session
+from app.core.admission import AdmissionController, Priority, route_priority
+from app.core.config import settings
+from app.core.db.session import InstrumentedQueuePool
+from app.core.middleware.admission import AdmissionControlMiddleware
+
+DURATION_SECONDS = 10.0
+QUERY_SECONDS = 0.05
+POOL_SIZE = 5
+OVERLOAD = 2.0
+SLO_SECONDS = 1.0
+
+engine = create_engine(
+    settings.DB_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=30.0,
+)
+
+
+def work():
+    with engine.connect() as connection:
+        connection.execute(sa.text("SELECT pg_sleep(:s)"), {"s": QUERY_SECONDS})
+    return {"ok": True}
+
+
+def make_app(controller: Optional[AdmissionController]) -> FastAPI:
+    middleware = []
+    if controller is not None:
+        middleware.append(Middleware(AdmissionControlMiddleware, controller=controller))
+
+    app = FastAPI(middleware=middleware)
+    app.get("/upload", dependencies=[route_priority(Priority.LOW)])(work)
+    app.get("/profile", dependencies=[route_priority(Priority.HIGH)])(work)
+
+    return app
+
+
+async def run(shedding: bool):
+    # Fresh signals per run, the pool reports its checkout waits to this controller
+    controller = AdmissionController()
+    db_session.admission_controller = controller
+
+    rate = POOL_SIZE / QUERY_SECONDS * OVERLOAD
+    transport = ASGITransport(app=make_app(controller if shedding else None))
+    results = {"/upload": [], "/profile": []}
+
+    async with AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+        async def one(path: str):
+            start = time.perf_counter()
+            response = await client.get(path)
+            results[path].append((response.status_code, time.perf_counter() - start))
+
+        tasks = []
+        start = time.perf_counter()
+        index = 0
+        while time.perf_counter() - start < DURATION_SECONDS:
+            path = "/upload" if index % 2 else "/profile"
+            tasks.append(asyncio.create_task(one(path)))
+            index += 1
+            await asyncio.sleep(max(0.0, start + index / rate - time.perf_counter()))
+
+        await asyncio.gather(*tasks)
+
+    rows = []
+    for path, items in results.items():
+        good = [latency for status, latency in items if status == 200 and latency <= SLO_SECONDS]
+        ok = [latency for status, latency in items if status == 200]
+        rows.append(
+            {
+                "path": path,
+                "sent": len(items),
+                "shed": sum(1 for status, _ in items if status == 503),
+                "goodput": len(good) / DURATION_SECONDS,
+                "p50": statistics.median(ok) if ok else 0.0,
+            }
+        )
+
+    return rows
+
+
+async def main():
+    print(f"capacity {POOL_SIZE / QUERY_SECONDS:.0f} req/s, offered {OVERLOAD:.1f}x")
+    print(f"{'shedding':>9} {'path':>9} {'sent':>6} {'shed':>6} {'good/s':>7} {'p50':>7}")
+
+    for shedding in (False, True):
+        for row in await run(shedding):
+            print(
+                f"{str(shedding):>9} {row['path']:>9} {row['sent']:>6} {row['shed']:>6} "
+                f"{row['goodput']:>7.1f} {row['p50']:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Auth audit events: committed INSERT per event vs the buffered audit log.
+
+    DB_URL=postgresql+psycopg://... python -m benchmarks.audit_log
+
+Writes EVENTS auth events both ways and reports the time the request path spends per
+event and the overall throughput including the flush. With psycopg 3 the flush uses
+COPY, with psycopg2 multi-row INSERTs.
+"""
+
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app.core.audit import flush_audit_logs
+from app.core.db.session import get_sync_session
+from app.main import app  # noqa: F401 resolves mappers
+from app.user.models import AuthEvent
+from app.user.models_manager import auth_event
+from app.user.models_manager.auth_event import auth_event_log
+
+EVENTS = 20000
+
+
+def make_event(i: int) -> dict:
+    return {
+        "created_at": datetime.now(),
+        "event": auth_event.LOGIN,
+        "user_id": i,
+        "email": f"user-{i}@example.com",
+        "ip_address": "10.0.0.1",
+        "user_agent": "benchmark",
+        "request_id": f"{i:032x}",
+    }
+
+
+def main():
+    with get_sync_session() as session:
+        print(f"driver {session.get_bind().dialect.driver}")
+
+        def direct(values):
+            session.execute(sa.insert(AuthEvent).values(**values))
+            session.commit()
+
+        def buffered(values):
+            auth_event_log.record(**values)
+
+        print(f"{'mode':>9} {'request us/event':>17} {'events/s':>10}")
+        for name, write, flush in (
+            ("insert", direct, lambda: None),
+            ("buffered", buffered, lambda: flush_audit_logs(session)),
+        ):
+            start = time.perf_counter()
+            for i in range(EVENTS):
+                write(make_event(i))
+            recorded = time.perf_counter() - start
+
+            flush()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>9} {recorded / EVENTS * 1e6:>17.1f} {EVENTS / elapsed:>10.0f}")
+
+        session.execute(sa.delete(AuthEvent).where(AuthEvent.user_agent == "benchmark"))
+        session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-request overhead of a sync dependency chain vs one async resolver.
+
+    python -m benchmarks.auth_dependency
+
+The handlers do no I/O, so the difference is the dependency resolution itself: the
+sync chain makes a threadpool round trip for every `def` dependency.
+"""
+
+import asyncio
+import time
+from typing import Annotated, Generator, Optional
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.security import OAuth2PasswordBearer
+from httpx import ASGITransport, AsyncClient
+
+REQUESTS = 3000
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+TokenDep = Annotated[Optional[str], Depends(oauth2_scheme)]
+
+app = FastAPI()
+
+
+# Before: sync session, token, user-or-none and user dependencies
+def get_sync_session() -> Generator[dict, None, None]:
+    yield {}
+
+
+def get_token_or_none(token: TokenDep):
+    return {"id": 1} if token else None
+
+
+def get_user_or_none(
+    session: Annotated[dict, Depends(get_sync_session)],
+    token_data: Annotated[Optional[dict], Depends(get_token_or_none)],
+):
+    return {"id": token_data["id"], "is_active": True} if token_data else None
+
+
+def get_user(user: Annotated[Optional[dict], Depends(get_user_or_none)]):
+    return user
+
+
+@app.get("/sync-chain")
+async def sync_chain(user: Annotated[dict, Depends(get_user)]):
+    return user["id"]
+
+
+# After: async session and a single request-memoized resolver
+async def get_async_session():
+    yield {}
+
+
+async def resolve_principal(
+    request: Request, token: TokenDep, session: Annotated[dict, Depends(get_async_session)]
+):
+    user = getattr(request.state, "user", None)
+    if user is None and token:
+        user = request.state.user = {"id": 1, "is_active": True}
+    return user
+
+
+@app.get("/async-resolver")
+async def async_resolver(user: Annotated[dict, Depends(resolve_principal)]):
+    return user["id"]
+
+
+async def measure(client: AsyncClient, path: str) -> float:
+    headers = {"Authorization": "Bearer token"}
+    for _ in range(100):
+        await client.get(path, headers=headers)
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await client.get(path, headers=headers)
+
+    return (time.perf_counter() - start) / REQUESTS * 1_000_000
+
+
+async def main():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ["/sync-chain", "/async-resolver"]:
+            print(f"{path:<16} {await measure(client, path):>8.1f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
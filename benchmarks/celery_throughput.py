@@ -0,0 +1,57 @@
+"""Publish and drain throughput of the email queue against a local Redis broker.
+
+    CELERY_BROKER_URL=redis://localhost:6379/0 python -m benchmarks.celery_throughput
+
+Compares result-less tasks (the default) against tasks that store a result.
+"""
+
+import time
+
+import redis
+from celery.contrib.testing.worker import start_worker
+
+from app.core.config import settings
+from worker.main import celery_app
+from worker.queues import MAX_PRIORITY
+from worker.tasks.email import send_email
+
+TASKS = 2000
+
+
+def queue_length(client: redis.Redis, queue: str) -> int:
+    keys = [queue] + [f"{queue}:{priority}" for priority in range(1, MAX_PRIORITY + 1)]
+    return sum(client.llen(key) for key in keys)
+
+
+def run(client: redis.Redis, ignore_result: bool):
+    options = {} if ignore_result else {"ignore_result": False}
+
+    start = time.perf_counter()
+    for i in range(TASKS):
+        send_email.apply_async(kwargs={"to": [f"user-{i}@example.com"]}, **options)
+    publish_rate = TASKS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with start_worker(
+        celery_app, pool="solo", queues=["email"], perform_ping_check=False, shutdown_timeout=30
+    ):
+        while queue_length(client, "email") > 0:
+            time.sleep(0.05)
+    drain_rate = TASKS / (time.perf_counter() - start)
+
+    return publish_rate, drain_rate
+
+
+def main():
+    client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    client.ping()
+
+    print(f"{'mode':<14} {'publish/s':>10} {'drain/s':>10}")
+    for ignore_result in (True, False):
+        publish_rate, drain_rate = run(client, ignore_result)
+        mode = "ignore_result" if ignore_result else "store_result"
+        print(f"{mode:<14} {publish_rate:>10.0f} {drain_rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
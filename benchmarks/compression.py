@@ -0,0 +1,63 @@
+"""CPU cost vs bytes saved for each response encoding and level.
+
+    python -m benchmarks.compression
+"""
+
+import json
+import time
+
+from app.core.middleware.compression import ENCODERS
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 6, 11], "zstd": [1, 3, 9]}
+ROUNDS = 20
+
+
+def sample_payloads():
+    users = [
+        {
+            "id": i,
+            "email": f"user-{i}@example.com",
+            "full_name": f"User Name {i}",
+            "image": f"/image/MjAyNDA0/{i:032x}.png",
+            "is_active": True,
+        }
+        for i in range(1000)
+    ]
+
+    return {
+        "profile": json.dumps(users[0]).encode(),
+        "list_100": json.dumps(users[:100]).encode(),
+        "export_1000": json.dumps(users).encode(),
+    }
+
+
+def measure(encoding: str, level: int, body: bytes):
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        encoder = ENCODERS[encoding](level)
+        compressed = encoder.compress(body) + encoder.finish()
+    cpu_us = (time.process_time() - start) / ROUNDS * 1_000_000
+
+    return len(compressed), cpu_us
+
+
+def main():
+    print(f"{'payload':<12} {'encoding':<6} {'level':>5} {'bytes':>8} {'saved':>8} {'cpu_us':>9}")
+
+    for name, body in sample_payloads().items():
+        print(f"{name:<12} {'none':<6} {'-':>5} {len(body):>8} {0:>8} {0:>9}")
+
+        for encoding, levels in LEVELS.items():
+            if encoding not in ENCODERS:
+                continue
+
+            for level in levels:
+                size, cpu_us = measure(encoding, level, body)
+                saved = len(body) - size
+                print(
+                    f"{name:<12} {encoding:<6} {level:>5} {size:>8} {saved:>8} {cpu_us:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
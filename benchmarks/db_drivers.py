@@ -0,0 +1,146 @@
+"""Per-query latency of the auth path queries, psycopg2 vs psycopg 3.
+
+    DB_URL=postgresql+psycopg2://... python -m benchmarks.db_drivers
+
+The same database is reached with both drivers (the driver in DB_URL is swapped).
+psycopg 3 is measured with server-side prepared statements (DB_PREPARE_THRESHOLD) and
+without (DB_PGBOUNCER_MODE), and the forgot-password reset pair of UPDATEs is timed
+sequentially and pipelined. Needs a UTF8 database for psycopg 3.
+
+The application doesn't pipeline: a reset hashes the new password between its two
+UPDATEs, so only this benchmark keeps `execute_pipelined`.
+"""
+
+import statistics
+import time
+from typing import List
+
+import sqlalchemy as sa
+from sqlalchemy import Executable
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.db.pipeline import namedtuple_row, supports_pipeline
+from app.core.db.session import new_engine
+from app.main import app  # noqa: F401 resolves mappers
+from app.tests.data import get_or_create_default_user
+from app.user.models import ForgotPassword, User
+
+ITERATIONS = 2000
+
+
+def execute_pipelined(session: Session, *statements: Executable) -> List[List[tuple]]:
+    """Executes independent Core statements in one network round trip.
+
+    With psycopg 3 the statements are queued in pipeline mode on the session's connection
+    and the results are read after a single sync. Other drivers execute them one by one.
+    The statements run inside the session's transaction and are not ORM-aware, rows
+    are named tuples either way.
+    """
+    connection = session.connection()
+
+    if not supports_pipeline(session):
+        results = []
+        for statement in statements:
+            result = connection.execute(statement)
+            results.append(result.all() if result.returns_rows else [])
+        return results
+
+    driver_connection = connection.connection.driver_connection
+    cursors = []
+
+    with driver_connection.pipeline():
+        for statement in statements:
+            compiled = statement.compile(dialect=connection.dialect)
+            sql, parameters = str(compiled), compiled.construct_params()
+            cursor = driver_connection.cursor(row_factory=namedtuple_row)
+
+            # Raw driver cursors, the engine events are fired so instrumentation sees them
+            connection.dispatch.before_cursor_execute(
+                connection, cursor, sql, parameters, None, False
+            )
+            cursor.execute(sql, parameters)
+            connection.dispatch.after_cursor_execute(
+                connection, cursor, sql, parameters, None, False
+            )
+            cursors.append(cursor)
+
+    results = []
+    for cursor in cursors:
+        results.append(cursor.fetchall() if cursor.description else [])
+        cursor.close()
+
+    return results
+
+
+def auth_queries(user: User):
+    # get_user_rstr, get_user and find_first(email=...) as run by login/auth dependencies
+    return [
+        sa.select(User.rstr).where(User.id == user.id),
+        sa.select(User).where(User.id == user.id),
+        sa.select(User).filter_by(email=user.email).order_by(User.id),
+    ]
+
+
+def reset_statements(user: User):
+    return [
+        sa.update(User).where(User.id == user.id).values(full_name=User.full_name),
+        sa.update(ForgotPassword).where(ForgotPassword.token == "missing").values(is_used=True),
+    ]
+
+
+def measure(fn) -> tuple:
+    latencies = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def run(driver: str, pgbouncer: bool = False):
+    settings.DB_PGBOUNCER_MODE = pgbouncer
+    url = make_url(settings.DB_URL).set(drivername=f"postgresql+{driver}")
+    engine = new_engine(url)
+
+    with sessionmaker(engine, expire_on_commit=False)() as session:
+        user = get_or_create_default_user(session)
+        queries = auth_queries(user)
+        reset = reset_statements(user)
+
+        def auth():
+            for query in queries:
+                session.execute(query).all()
+            session.rollback()
+
+        def reset_sequential():
+            for statement in reset:
+                session.execute(statement)
+            session.rollback()
+
+        def reset_pipelined():
+            execute_pipelined(session, *reset)
+            session.rollback()
+
+        results = [measure(auth), measure(reset_sequential), measure(reset_pipelined)]
+
+    engine.dispose()
+    return results
+
+
+def main():
+    print(f"{'driver':>22} {'auth p50/p99 (us)':>20} {'reset seq':>16} {'reset pipe':>16}")
+    for name, driver, pgbouncer in (
+        ("psycopg2", "psycopg2", False),
+        ("psycopg3 prepared", "psycopg", False),
+        ("psycopg3 pgbouncer", "psycopg", True),
+    ):
+        cells = [f"{p50:>7.0f}/{p99:<7.0f}" for p50, p99 in run(driver, pgbouncer)]
+        print(f"{name:>22} {cells[0]:>20} {cells[1]:>16} {cells[2]:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Variant rendering: serial in the task thread vs the media worker's process pool.
+
+    python -m benchmarks.image_variants
+
+Renders settings.IMAGE_VARIANTS for IMAGES photo-sized JPEGs. Pillow releases the GIL
+in parts of decode/resize only, the process pool scales with the cores.
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.utils.image import render_variant
+from worker.tasks.media import get_process_pool, shutdown_process_pool
+
+IMAGES = 16
+SIZE = (4032, 3024)
+
+
+def jobs(folder: str):
+    for index in range(IMAGES):
+        source = os.path.join(folder, f"{index}.jpg")
+        for name, spec in settings.IMAGE_VARIANTS.items():
+            yield source, os.path.join(folder, f"{index}.{name}.{spec['format']}"), spec
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        for index in range(IMAGES):
+            Image.effect_mandelbrot(SIZE, (-2, -1.5, 1, 1.5), 100).convert("RGB").save(
+                os.path.join(folder, f"{index}.jpg"), quality=90
+            )
+
+        start = time.perf_counter()
+        for job in jobs(folder):
+            render_variant(*job)
+        serial = time.perf_counter() - start
+
+        pool = get_process_pool()
+        wait([pool.submit(time.sleep, 0) for _ in range(pool._max_workers)])  # spawn workers
+
+        start = time.perf_counter()
+        wait([pool.submit(render_variant, *job) for job in jobs(folder)])
+        pooled = time.perf_counter() - start
+        shutdown_process_pool()
+
+    print(f"{'mode':>8} {'seconds':>8} {'images/s':>9}")
+    print(f"{'serial':>8} {serial:>8.2f} {IMAGES / serial:>9.1f}")
+    print(f"{'pool':>8} {pooled:>8.2f} {IMAGES / pooled:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Sign/verify throughput per JWT algorithm, with keys parsed once vs per call.
+
+    python -m benchmarks.jwt_algorithms
+"""
+
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+
+from app.core.auth.keys import generate_private_key, private_key_to_pem
+
+ROUNDS = 2000
+PAYLOAD = {"id": 1, "rstr": "x" * 31, "token_type": "ACCESS", "exp": 4102444800}
+
+
+def ops_per_second(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return ROUNDS / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'algorithm':<10} {'sign/s':>10} {'verify/s':>10} {'sign(pem)/s':>12} {'size':>6}")
+
+    secret = "s" * 64
+    token = jwt.encode(PAYLOAD, secret, algorithm="HS256")
+    sign = ops_per_second(lambda: jwt.encode(PAYLOAD, secret, algorithm="HS256"))
+    verify = ops_per_second(lambda: jwt.decode(token, secret, algorithms=["HS256"]))
+    print(f"{'HS256':<10} {sign:>10.0f} {verify:>10.0f} {'-':>12} {len(token):>6}")
+
+    for algorithm in ["EdDSA", "ES256"]:
+        private_key = generate_private_key(algorithm)
+        public_key = private_key.public_key()
+        pem = private_key_to_pem(private_key)
+
+        token = jwt.encode(PAYLOAD, private_key, algorithm=algorithm)
+        sign = ops_per_second(lambda: jwt.encode(PAYLOAD, private_key, algorithm=algorithm))  # noqa: B023
+        verify = ops_per_second(lambda: jwt.decode(token, public_key, algorithms=[algorithm]))  # noqa: B023
+        sign_pem = ops_per_second(
+            lambda: jwt.encode(
+                PAYLOAD,
+                serialization.load_pem_private_key(pem, password=None),  # noqa: B023
+                algorithm=algorithm,  # noqa: B023
+            )
+        )
+        print(f"{algorithm:<10} {sign:>10.0f} {verify:>10.0f} {sign_pem:>12.0f} {len(token):>6}")
+
+
+if __name__ == "__main__":
+    main()
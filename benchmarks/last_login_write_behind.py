@@ -0,0 +1,69 @@
+"""Login write path: UPDATE per login vs the write-behind buffer.
+
+    DB_URL=postgresql+psycopg2://... python -m benchmarks.last_login_write_behind
+
+Runs LOGINS last_login writes over USERS rows both ways and reports throughput and the
+WAL generated (pg_current_wal_lsn). Write-behind pays one batched UPDATE per user per
+flush instead of one committed UPDATE per login.
+"""
+
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app.core.db.session import get_sync_session
+from app.core.db.write_behind import flush_write_behind
+from app.main import app  # noqa: F401 resolves mappers
+from app.user.models import User
+from app.user.models_manager.user import last_login_buffer
+
+LOGINS = 5000
+
+
+def wal_lsn(session) -> int:
+    return session.execute(
+        sa.text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')")
+    ).scalar_one()
+
+
+def measure(session, write, flush=lambda: None):
+    user_ids = session.scalars(sa.select(User.id)).all()
+    session.commit()
+
+    wal_before = wal_lsn(session)
+    start = time.perf_counter()
+
+    for i in range(LOGINS):
+        write(user_ids[i % len(user_ids)])
+    flush()
+
+    elapsed = time.perf_counter() - start
+    session.commit()
+
+    return LOGINS / elapsed, int(wal_lsn(session) - wal_before), len(user_ids)
+
+
+def main():
+    with get_sync_session() as session:
+
+        def direct(user_id):
+            session.execute(
+                sa.update(User).where(User.id == user_id).values(last_login=datetime.now())
+            )
+            session.commit()
+
+        def buffered(user_id):
+            last_login_buffer.record(user_id, datetime.now())
+
+        print(f"{'mode':>13} {'users':>6} {'logins/s':>10} {'WAL bytes':>11}")
+        for name, write, flush in (
+            ("update", direct, lambda: None),
+            ("write-behind", buffered, lambda: flush_write_behind(session, include_redis=True)),
+        ):
+            rate, wal, users = measure(session, write, flush)
+            print(f"{name:>13} {users:>6} {rate:>10.0f} {wal:>11}")
+
+
+if __name__ == "__main__":
+    main()
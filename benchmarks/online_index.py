@@ -0,0 +1,89 @@
+"""Writes while an index builds: CREATE INDEX vs create_index_concurrently.
+
+    DB_URL=postgresql+psycopg2://... ROWS=2000000 python -m benchmarks.online_index
+
+Fills a "bench_online_index" table with ROWS rows (refilled on every run), then builds
+an index on it both ways while another connection keeps inserting, and reports the
+build time and the slowest insert. A plain CREATE INDEX blocks the inserts until it
+is done.
+"""
+
+import os
+import threading
+import time
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app.core.config import settings
+from app.core.db.migrations import create_index_concurrently
+
+ROWS = int(os.getenv("ROWS", 2_000_000))
+TABLE = "bench_online_index"
+INDEX = "ix_bench_online_index_name"
+
+engine = sa.create_engine(settings.DB_URL)
+
+
+def fill() -> None:
+    with engine.begin() as connection:
+        connection.execute(sa.text(f"DROP TABLE IF EXISTS {TABLE}"))
+        connection.execute(sa.text(f"CREATE TABLE {TABLE} (id bigserial, name text)"))
+        connection.execute(
+            sa.text(
+                f"INSERT INTO {TABLE} (name) SELECT md5(i::text) FROM generate_series(1, :rows) i"
+            ),
+            {"rows": ROWS},
+        )
+
+
+def plain() -> None:
+    with engine.begin() as connection:
+        connection.execute(sa.text(f"CREATE INDEX {INDEX} ON {TABLE} (name)"))
+
+
+def concurrent() -> None:
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        with Operations.context(context), context.begin_transaction():
+            create_index_concurrently(INDEX, TABLE, ["name"])
+
+
+def write(stop: threading.Event, latencies: list) -> None:
+    with engine.connect() as connection:
+        while not stop.is_set():
+            start = time.perf_counter()
+            connection.execute(sa.text(f"INSERT INTO {TABLE} (name) VALUES ('new')"))
+            connection.commit()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+
+def main():
+    print(f"{'build':>11} {'rows':>9} {'build s':>8} {'inserts':>8} {'max insert ms':>14}")
+    for name, build in (("plain", plain), ("concurrent", concurrent)):
+        fill()
+        stop = threading.Event()
+        latencies = []
+        writer = threading.Thread(target=write, args=(stop, latencies))
+        writer.start()
+        time.sleep(0.2)
+
+        start = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        writer.join()
+        print(
+            f"{name:>11} {ROWS:>9} {elapsed:>8.1f} {len(latencies):>8}"
+            f" {max(latencies) * 1000:>14.1f}"
+        )
+
+    with engine.begin() as connection:
+        connection.execute(sa.text(f"DROP TABLE {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
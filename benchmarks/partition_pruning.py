@@ -0,0 +1,103 @@
+"""Forgot-password token lookup: one table vs monthly partitions.
+
+    DB_URL=postgresql+psycopg2://... ROWS=2000000 MONTHS=24 python -m benchmarks.partition_pruning
+
+Fills forgot_password copies in the "bench_plain" and "bench_partitioned" schemas with
+ROWS tokens spread over the last MONTHS months (refilled on every run), then times the
+reset's valid-token lookup against each. The created_at bound of the token filter lets
+the partitioned table scan only the recent months.
+"""
+
+import os
+import statistics
+import time
+from datetime import date, timedelta
+from secrets import token_hex
+
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.core.db.partitions import ensure_monthly_partitions
+from app.main import app  # noqa: F401 resolves mappers
+from app.user.models import ForgotPassword
+from app.user.models_manager.forgot_password import ForgotPasswordManager
+
+ROWS = int(os.getenv("ROWS", 2_000_000))
+MONTHS = int(os.getenv("MONTHS", 24))
+REPEAT = 5
+SCHEMAS = {"bench_plain": False, "bench_partitioned": True}
+
+engine = sa.create_engine(settings.DB_URL)
+
+
+def fill(connection, schema: str, partitioned: bool) -> None:
+    connection.execute(sa.text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    connection.execute(sa.text(f"CREATE SCHEMA {schema}"))
+    connection.execute(
+        sa.text(
+            f"CREATE TABLE {schema}.forgot_password (LIKE public.forgot_password)"
+            + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+        )
+    )
+
+    if partitioned:
+        connection.execute(sa.text(f"SET LOCAL search_path TO {schema}"))
+        since = date.today() - timedelta(days=MONTHS * 31)
+        ensure_monthly_partitions(connection, "forgot_password", since=since)
+
+    connection.execute(
+        sa.text(
+            f"INSERT INTO {schema}.forgot_password"
+            " (id, user_id, email, is_used, expire_at, used_at, token, created_at, updated_at)"
+            " SELECT i, 1, 'user@example.com', true, ts + interval '100 minutes', ts,"
+            " md5(i::text), ts, ts FROM ("
+            "   SELECT i, localtimestamp - (i % :days) * interval '1 day' AS ts"
+            "   FROM generate_series(1, :rows) i"
+            " ) s"
+        ),
+        {"days": MONTHS * 30, "rows": ROWS},
+    )
+    connection.execute(sa.text(f"ANALYZE {schema}.forgot_password"))
+
+
+def main():
+    manager = ForgotPasswordManager(db=None)
+    token = token_hex(60)
+
+    print(f"{'table':>18} {'rows':>9} {'lookup ms':>10}")
+    for schema, partitioned in SCHEMAS.items():
+        with engine.begin() as connection:
+            fill(connection, schema, partitioned)
+
+        with engine.connect() as connection:
+            connection = connection.execution_options(schema_translate_map={None: schema})
+            connection.execute(
+                sa.insert(ForgotPassword).values(
+                    id=0,
+                    user_id=1,
+                    email="user@example.com",
+                    is_used=False,
+                    expire_at=sa.func.localtimestamp() + timedelta(minutes=60),
+                    token=token,
+                    created_at=sa.func.localtimestamp(),
+                    updated_at=sa.func.localtimestamp(),
+                )
+            )
+            connection.commit()
+
+            timings = []
+            for _ in range(REPEAT):
+                stmt = sa.select(ForgotPassword.user_id).where(*manager._valid_token_filter(token))
+                start = time.perf_counter()
+                assert connection.execute(stmt).all()
+                timings.append(time.perf_counter() - start)
+
+            print(f"{schema:>18} {ROWS:>9} {statistics.median(timings) * 1000:>10.1f}")
+
+    with engine.begin() as connection:
+        for schema in SCHEMAS:
+            connection.execute(sa.text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
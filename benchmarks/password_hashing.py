@@ -0,0 +1,60 @@
+"""Login throughput per core for each password hasher setting, and what calibration picks.
+
+python -m benchmarks.password_hashing
+
+A login costs one verify, so logins/s per core is 1 / verify time. Run it on the
+production instance type: the numbers only hold for the hardware they were taken on.
+"""
+
+import time
+
+from app.core.auth.hashers import Argon2Hasher, BcryptHasher
+
+PASSWORD = "correct horse battery staple"
+MIN_SECONDS = 2.0
+TARGETS = [0.05, 0.1, 0.25]
+
+
+def verify_seconds(hasher) -> float:
+    hashed = hasher.hash(PASSWORD)
+
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < MIN_SECONDS or count < 3:
+        hasher.verify(PASSWORD, hashed)
+        count += 1
+
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    settings = [BcryptHasher(rounds) for rounds in range(10, 14)] + [
+        Argon2Hasher(time_cost=2, memory_cost=19 * 1024, parallelism=1),
+        Argon2Hasher(time_cost=3, memory_cost=64 * 1024, parallelism=1),
+    ]
+
+    print(f"{'hasher':<10} {'parameters':<58} {'verify ms':>10} {'logins/s/core':>14}")
+    for hasher in settings:
+        seconds = verify_seconds(hasher)
+        print(
+            f"{hasher.name:<10} {str(hasher.parameters):<58} {seconds * 1000:>10.1f} "
+            f"{1 / seconds:>14.1f}"
+        )
+
+    print()
+    print(f"{'target ms':>10} {'hasher':<10} {'calibrated':<58} {'verify ms':>10}")
+    for target in TARGETS:
+        for hasher in [
+            BcryptHasher(12),
+            Argon2Hasher(time_cost=3, memory_cost=64 * 1024, parallelism=1),
+        ]:
+            hasher.calibrate(target)
+            seconds = verify_seconds(hasher)
+            print(
+                f"{target * 1000:>10.0f} {hasher.name:<10} {str(hasher.parameters):<58} "
+                f"{seconds * 1000:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
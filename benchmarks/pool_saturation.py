@@ -0,0 +1,88 @@
+"""Load test: threadpool sized to 40 (anyio default) vs sized to the DB pool.
+
+    DB_URL=postgresql+psycopg2://... python -m benchmarks.pool_saturation
+
+Sync handlers hold a connection for QUERY_SECONDS. With more threads than connections,
+the extra threads wait inside the pool and fail after POOL_TIMEOUT (30s in production,
+shortened here); with the threadpool aligned, requests queue for a thread instead.
+"""
+
+import asyncio
+import statistics
+import time
+
+import anyio.to_thread
+import sqlalchemy as sa
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.core.db.session import InstrumentedQueuePool, pool_timeouts_total
+
+REQUESTS = 120
+QUERY_SECONDS = 1.0
+POOL_SIZE, MAX_OVERFLOW, POOL_TIMEOUT = 5, 10, 1.0
+
+engine = create_engine(
+    settings.DB_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT,
+)
+
+app = FastAPI()
+
+
+@app.get("/work")
+def work():
+    with engine.connect() as connection:
+        connection.execute(sa.text("SELECT pg_sleep(:s)"), {"s": QUERY_SECONDS})
+    return {"ok": True}
+
+
+async def run(tokens: int):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = tokens
+    timeouts_before = pool_timeouts_total.value()
+
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one():
+            start = time.perf_counter()
+            response = await client.get("/work")
+            return response.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[one() for _ in range(REQUESTS)])
+        elapsed = time.perf_counter() - start
+
+    ok = [latency for status, latency in results if status == 200]
+    latencies = sorted(latency for _, latency in results)
+
+    return {
+        "tokens": tokens,
+        "ok": len(ok),
+        "errors": REQUESTS - len(ok),
+        "pool_timeouts": int(pool_timeouts_total.value() - timeouts_before),
+        "p50": statistics.median(latencies),
+        "max": latencies[-1],
+        "goodput": len(ok) / elapsed,
+    }
+
+
+async def main():
+    print(
+        f"{'tokens':>6} {'ok':>5} {'errors':>6} {'timeouts':>8} {'p50':>7} {'max':>7} {'ok/s':>7}"
+    )
+    for tokens in (40, POOL_SIZE + MAX_OVERFLOW):
+        r = await run(tokens)
+        print(
+            f"{r['tokens']:>6} {r['ok']:>5} {r['errors']:>6} {r['pool_timeouts']:>8} "
+            f"{r['p50']:>7.2f} {r['max']:>7.2f} {r['goodput']:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
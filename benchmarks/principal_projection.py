@@ -0,0 +1,105 @@
+"""Per-request allocations and latency: full `User` entity vs the `Principal` projection.
+
+    DB_URL=postgresql+psycopg2://... python -m benchmarks.principal_projection
+
+Two routes authorize the same user through the app's resolver, one with `CurrentUser`,
+one with `CurrentPrincipal`. Latency is measured without tracing allocations, then
+each call runs again under tracemalloc, "alloc" is the peak memory it adds. The lookups
+alone are measured the same way, without the HTTP and dependency machinery.
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.auth.jwt import JWTProvider, TokenData
+from app.core.auth.session_store import session_store
+from app.core.db.session import get_sync_session
+from app.core.deps.auth import CurrentPrincipal, CurrentUser, get_principal, get_user
+from app.main import app  # noqa: F401 resolves mappers
+from app.tests.data import get_or_create_default_user
+
+REQUESTS = 2000
+LOOKUPS = 5000
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/user")
+async def with_user(user: CurrentUser):
+    return user.id
+
+
+@bench_app.get("/principal")
+async def with_principal(principal: CurrentPrincipal):
+    return principal.id
+
+
+async def measure(client: AsyncClient, path: str, headers: dict):
+    for _ in range(100):
+        await client.get(path, headers=headers)
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await client.get(path, headers=headers)
+    latency = (time.perf_counter() - start) / REQUESTS
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(200):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await client.get(path, headers=headers)
+        peak += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return latency, peak / 200
+
+
+def measure_lookup(fn, session, token_data):
+    # Expunged after every call, as the request's session is closed after every request
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        fn(session, token_data)
+        session.expunge_all()
+    latency = (time.perf_counter() - start) / LOOKUPS
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(200):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn(session, token_data)
+        peak += tracemalloc.get_traced_memory()[1] - before
+        session.expunge_all()
+    tracemalloc.stop()
+
+    return latency, peak / 200
+
+
+async def main():
+    with get_sync_session() as session:
+        user = get_or_create_default_user(session)
+        token_data = TokenData(id=user.id, rstr=user.rstr)
+        session_store.set_current(user.id, user.rstr, publish=False)
+        headers = {"Authorization": f"Bearer {JWTProvider.create_access_token(user.id, user.rstr)}"}
+
+        print(f"{'lookup':<14} {'us/call':>8} {'alloc KiB':>10}")
+        for name, fn in [("get_user", get_user), ("get_principal", get_principal)]:
+            latency, peak = measure_lookup(fn, session, token_data)
+            print(f"{name:<14} {latency * 1e6:>8.0f} {peak / 1024:>10.1f}")
+
+    print()
+    print(f"{'route':<14} {'us/req':>8} {'alloc KiB':>10}")
+    transport = ASGITransport(app=bench_app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ["/user", "/principal"]:
+            latency, peak = await measure(client, path, headers)
+            print(f"{path:<14} {latency * 1e6:>8.0f} {peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
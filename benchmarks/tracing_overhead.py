@@ -0,0 +1,64 @@
+"""Per-request cost of tracing: disabled, enabled but not sampled, sampled.
+
+    DB_URL=postgresql+psycopg2://... python -m benchmarks.tracing_overhead
+
+Each request runs through the tracing middleware and one SQL statement. Unsampled
+requests only pay for the root sampling decision, no SQL spans are created.
+"""
+
+import asyncio
+import time
+
+import sqlalchemy as sa
+from fastapi import FastAPI
+from fastapi.middleware import Middleware
+from httpx import ASGITransport, AsyncClient
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from app.core.db.session import get_engine
+from app.core.middleware.tracing import TracingMiddleware
+from app.core.tracing import tracing
+
+REQUESTS = 2000
+
+app = FastAPI(middleware=[Middleware(TracingMiddleware)])
+
+
+@app.get("/work")
+def work():
+    with get_engine().connect() as connection:
+        connection.execute(sa.text("SELECT 1"))
+    return {"ok": True}
+
+
+class DiscardExporter(SpanExporter):
+    def export(self, spans):
+        return SpanExportResult.SUCCESS
+
+
+async def run() -> float:
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/work")
+
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await client.get("/work")
+
+        return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+async def main():
+    print(f"{'mode':>12} {'us/request':>11}")
+
+    tracing.shutdown()
+    print(f"{'disabled':>12} {await run():>11.0f}")
+
+    for name, ratio in (("unsampled", 0.0), ("sampled", 1.0)):
+        tracing.configure("bench", exporter=DiscardExporter(), sample_ratio=ratio)
+        print(f"{name:>12} {await run():>11.0f}")
+        tracing.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
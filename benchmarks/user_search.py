@@ -0,0 +1,138 @@
+"""User search at scale: pg_trgm GIN indexes vs a sequential ILIKE scan.
+
+    DB_URL=postgresql+psycopg2://... ROWS=10000000 python -m benchmarks.user_search
+
+Fills a copy of the user table in the "bench_search" schema with ROWS synthetic users
+(kept between runs, refilled when ROWS changes), then times the app's search query for
+rare, mid and common terms: the first page, a keyset continuation from it, and the
+first page with index scans disabled. Needs the pg_trgm extension on the server.
+"""
+
+import os
+import statistics
+import time
+
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.main import app  # noqa: F401 resolves mappers
+from app.user.models import User
+from app.user.models_manager.user import build_user_search
+
+ROWS = int(os.getenv("ROWS", 10_000_000))
+SCHEMA = "bench_search"
+LIMIT = 20
+REPEAT = 5
+TERMS = ["user4242424@", "ingrid.nakamura", "example.org"]
+
+FIRST_NAMES = [
+    "Alice",
+    "Bob",
+    "Carol",
+    "Dave",
+    "Erin",
+    "Frank",
+    "Grace",
+    "Ingrid",
+    "Judy",
+    "Mallory",
+]
+LAST_NAMES = ["Smith", "Jones", "Nakamura", "Garcia", "Kowalski", "Okafor", "Novak", "Larsen"]
+DOMAINS = ["example.org", "mail.test", "corp.test", "users.test"]
+
+engine = sa.create_engine(settings.DB_URL)
+table = User.__table__.to_metadata(sa.MetaData(), schema=SCHEMA)
+
+
+def sql_array(values) -> str:
+    return "ARRAY[" + ",".join(f"'{value}'" for value in values) + "]"
+
+
+def fill() -> None:
+    with engine.begin() as connection:
+        connection.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(sa.text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+
+        if sa.inspect(connection).has_table(table.name, schema=SCHEMA):
+            count = connection.execute(sa.select(sa.func.count()).select_from(table)).scalar()
+            if count == ROWS:
+                return
+            table.drop(connection)
+
+        # Indexes after the load, building them once is much faster than maintaining them
+        indexes = set(table.indexes)
+        table.indexes.clear()
+        table.create(connection)
+
+        first, last, domains = sql_array(FIRST_NAMES), sql_array(LAST_NAMES), sql_array(DOMAINS)
+        print(f"Filling {ROWS} users")
+        connection.execute(
+            sa.text(
+                f"""
+                INSERT INTO {SCHEMA}."user" (email, full_name, is_active, is_verified,
+                    is_super_admin, hashed_password, rstr, last_login, created_at, updated_at)
+                SELECT
+                    lower(({first})[1 + i % 10]) || '.' || lower(({last})[1 + i / 10 % 8])
+                        || '.user' || i || '@' || ({domains})[1 + i / 80 % 4],
+                    ({first})[1 + i % 10] || ' ' || ({last})[1 + i / 10 % 8],
+                    true, true, false, '', '', now(), now(), now()
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"rows": ROWS},
+        )
+
+        for index in indexes:
+            index.create(connection)
+            table.indexes.add(index)
+        connection.execute(sa.text(f'ANALYZE {SCHEMA}."user"'))
+
+
+def timed(connection, stmt):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        rows = connection.execute(stmt).all()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings), rows
+
+
+def main():
+    fill()
+
+    print(f"{ROWS} users, limit {LIMIT}, median of {REPEAT}")
+    print(f"{'term':<18} {'matches':>9} {'first ms':>9} {'next ms':>9} {'no index ms':>12}")
+
+    with engine.connect() as connection:
+        for term in TERMS:
+            matches = connection.execute(
+                sa.select(sa.func.count()).select_from(
+                    build_user_search(table, term, "postgresql", ROWS).subquery()
+                )
+            ).scalar()
+
+            first, rows = timed(connection, build_user_search(table, term, "postgresql", LIMIT))
+
+            following = float("nan")
+            if len(rows) == LIMIT:
+                last = rows[-1]
+                after = [last.prefix, last.score, last.id]
+                following, _ = timed(
+                    connection, build_user_search(table, term, "postgresql", LIMIT, after)
+                )
+
+            connection.execute(sa.text("SET enable_bitmapscan = off"))
+            connection.execute(sa.text("SET enable_indexscan = off"))
+            scan, _ = timed(connection, build_user_search(table, term, "postgresql", LIMIT))
+            connection.execute(sa.text("RESET enable_bitmapscan"))
+            connection.execute(sa.text("RESET enable_indexscan"))
+
+            print(
+                f"{term:<18} {matches:>9} {first * 1000:>9.1f} {following * 1000:>9.1f} "
+                f"{scan * 1000:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
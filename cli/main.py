@@ -1,10 +1,18 @@
 # import asyncio
+import json
+import os
+from datetime import timedelta
 
 import typer
 from email_validator import validate_email
 
+from app.core.auth.keys import rotate_keys
+from app.core.config import settings
 from app.core.db.session import get_sync_session
+from app.core.profiling import FORMAT_COLLAPSED, collect_profiles, new_profile_token
 from app.user.models_manager.user import UserManager
+from worker.main import celery_app
+from worker.queues import QUEUE_PROFILES
 
 app = typer.Typer()
 
@@ -20,15 +28,94 @@ def create_user(email: str, full_name: str, password: str, is_super_admin: bool
         user_manager = UserManager(session)
 
         if is_super_admin:
-            _ = user_manager.create_super_admin(
+            user = user_manager.create_super_admin(
                 email=email, full_name=full_name, text_password=password
             )
-            print("Super admin created")
         else:
-            _ = user_manager.create_public_user(
+            user = user_manager.create_public_user(
                 email=email, full_name=full_name, text_password=password
             )
-            print("User created")
+
+        if user is None:
+            print("User with email exists")
+        else:
+            print("Super admin created" if is_super_admin else "User created")
+
+
+@app.command()
+def rotate_jwt_keys(algorithm: str = settings.JWT_KEY_ALGORITHM, keys_dir: str = ""):
+    keys_dir = keys_dir or settings.JWT_KEYS_DIR
+    if not keys_dir:
+        raise ValueError("JWT_KEYS_DIR is not configured")
+
+    changes = rotate_keys(
+        keys_dir,
+        algorithm,
+        rotation_period=timedelta(days=settings.JWT_KEY_ROTATION_DAYS),
+        lead_time=timedelta(hours=settings.JWT_KEY_ROTATION_LEAD_HOURS),
+    )
+    print(f"JWT keys changed: {changes}" if changes else "JWT keys are up to date")
+
+
+@app.command()
+def profile_token(ttl_seconds: int = 300):
+    # Value of the X-Profile header, profiles any request sent with it until it expires
+    if not settings.PROFILER_SECRET:
+        raise ValueError("PROFILER_SECRET is not configured")
+
+    print(new_profile_token(ttl_seconds))
+
+
+@app.command("collect-profiles")
+def collect_worker_profiles(
+    seconds: float = 10.0, format: str = "speedscope", output_dir: str = "profiles"
+):
+    if not settings.REDIS_URL:
+        raise ValueError("REDIS_URL is not configured, workers can't be reached")
+
+    results = collect_profiles(seconds, format)
+    os.makedirs(output_dir, exist_ok=True)
+
+    for result in results:
+        worker = result["worker"].replace(":", "-")
+        if "error" in result:
+            print(f"{worker}: {result['error']}")
+            continue
+
+        if format == FORMAT_COLLAPSED:
+            path = os.path.join(output_dir, f"{worker}.folded")
+            content = result["profile"]
+        else:
+            path = os.path.join(output_dir, f"{worker}.speedscope.json")
+            content = json.dumps(result["profile"])
+
+        with open(path, "w") as file:
+            file.write(content)
+        print(f"{worker}: {path}")
+
+    print(f"Collected {len(results)} profiles")
+
+
+@app.command()
+def run_worker(queue: str, beat: bool = False, loglevel: str = "info"):
+    # One worker process per queue profile, so prefetch and concurrency apply per queue
+    if queue not in QUEUE_PROFILES:
+        raise ValueError(f"Unknown queue {queue}, expected one of {list(QUEUE_PROFILES)}")
+
+    profile = QUEUE_PROFILES[queue]
+    argv = [
+        "worker",
+        f"--queues={profile.name}",
+        f"--concurrency={profile.concurrency}",
+        f"--pool={profile.pool}",
+        f"--prefetch-multiplier={profile.prefetch_multiplier}",
+        f"--hostname={profile.name}@%h",
+        f"--loglevel={loglevel}",
+    ]
+    if beat:
+        argv.append("--beat")
+
+    celery_app.worker_main(argv)
 
 
 if __name__ == "__main__":
@@ -28,11 +28,22 @@ fileConfig(config.config_file_name)
 # For auto generate schemas
 from app.core.config import settings
 from app.core.db.base import Base
+from app.core.db.migrations import set_lock_timeout
+from app.core.db.partitions import is_partition
 from app.main import app # noqa
 
 SYNC_DB_URL = settings.DB_URL
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Partitions are created and dropped by the maintenance job, not by migrations
+    if type_ == "table" and reflected and compare_to is None:
+        return not is_partition(name, target_metadata)
+
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -54,14 +65,32 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
+        context.execute(f"SET lock_timeout = '{int(settings.MIGRATION_LOCK_TIMEOUT_SECONDS * 1000)}ms'")
         context.run_migrations()
 
 
+def configure_online(connection):
+    # DDL aborts instead of queueing traffic behind its lock, and each revision commits
+    # on its own so revisions with autocommit blocks (CREATE INDEX CONCURRENTLY...) only
+    # commit their own changes
+    set_lock_timeout(connection, settings.MIGRATION_LOCK_TIMEOUT_SECONDS)
+    connection.commit()
+
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        transaction_per_migration=True,
+    )
+
+
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    configure_online(connection)
 
     with context.begin_transaction():
         context.run_migrations()
@@ -75,7 +104,7 @@ def run_migrations_online():
     connectable = create_engine(SYNC_DB_URL, poolclass=pool.NullPool)
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        configure_online(connection)
         with context.begin_transaction():
             context.run_migrations()
 
@@ -0,0 +1,49 @@
+"""User search trigram indexes
+
+Creates the pg_trgm extension, and on databases whose user table already exists its
+GIN trigram indexes on email and full_name. A new database gets the indexes with the
+table, from the initial revision autogenerated on top of this one. With an existing
+migration history set down_revision to its head.
+
+Revision ID: 3f9c2a7d41b8
+Revises:
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3f9c2a7d41b8"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = {"ix_user_email_trgm": "email", "ix_user_full_name_trgm": "full_name"}
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    if not sa.inspect(op.get_bind()).has_table("user"):
+        return
+
+    # Built without blocking writes to the table, outside the migration's transaction
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES.items():
+            op.create_index(
+                name,
+                "user",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name="user", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,48 @@
+"""Auth event audit log
+
+Creates the auth_event table, range partitioned by month on created_at, with the
+partitions of the current and next PARTITION_MONTHS_AHEAD months. Later ones are
+created by the maintain_table_partitions beat task.
+
+Revision ID: 8c41e07b5d2a
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.db.partitions import ensure_monthly_partitions
+
+
+# revision identifiers, used by Alembic.
+revision = "8c41e07b5d2a"
+down_revision = "3f9c2a7d41b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "auth_event",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("event", sa.String(length=31), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("email", sa.String(length=255), nullable=True),
+        sa.Column("ip_address", sa.String(length=45), nullable=True),
+        sa.Column("user_agent", sa.String(length=255), nullable=True),
+        sa.Column("request_id", sa.String(length=128), nullable=True),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "ix_auth_event_user_id_created_at", "auth_event", ["user_id", "created_at"]
+    )
+
+    ensure_monthly_partitions(op.get_bind(), "auth_event")
+
+
+def downgrade():
+    # Drops the partitions with it
+    op.drop_table("auth_event")
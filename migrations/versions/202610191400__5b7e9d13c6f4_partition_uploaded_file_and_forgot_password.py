@@ -0,0 +1,166 @@
+"""Partition uploaded_file and forgot_password by created_at
+
+Rebuilds both tables range partitioned by month on created_at, with a partition for
+every month since their oldest row. The primary keys become (id, created_at), the
+tables referencing uploaded_file get an uploaded_file_created_at column and composite
+foreign keys, those not created yet get them from the revision that creates them. On
+a new database the initial revision creates them partitioned and this one does nothing.
+
+The rows are copied while the tables are locked, run it in a maintenance window.
+
+Revision ID: 5b7e9d13c6f4
+Revises: 8c41e07b5d2a
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.db.partitions import ensure_monthly_partitions
+
+
+# revision identifiers, used by Alembic.
+revision = "5b7e9d13c6f4"
+down_revision = "8c41e07b5d2a"
+branch_labels = None
+depends_on = None
+
+# Table -> ondelete of its foreign key to uploaded_file
+UPLOADED_FILE_REFERENCES = {"uploaded_file_variant": "CASCADE", "upload_session": None}
+
+
+def uploaded_file_columns():
+    return [
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=True),
+        sa.Column("file_path", sa.String(length=255), nullable=True),
+        sa.Column("extension", sa.String(length=10), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+    ]
+
+
+def forgot_password_columns():
+    return [
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("is_used", sa.Boolean(), nullable=False),
+        sa.Column("expire_at", sa.DateTime(), nullable=False),
+        sa.Column("used_at", sa.DateTime(), nullable=True),
+        sa.Column("token", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+    ]
+
+
+def rebuild_table(name, columns, partitioned):
+    """Recreates `name` with `columns`, partitioned or not, and copies its rows. The id
+    sequence is handed over so ids keep increasing."""
+    bind = op.get_bind()
+    old_name = f"{name}_unpartitioned" if partitioned else f"{name}_partitioned"
+    sequence = bind.scalar(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": name})
+
+    # Its name is reused by the new table's primary key
+    primary_key = sa.inspect(bind).get_pk_constraint(name)["name"]
+    op.drop_constraint(primary_key, name, type_="primary")
+    op.rename_table(name, old_name)
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+
+    id_column = sa.Column(
+        "id",
+        sa.Integer(),
+        server_default=sa.text(f"nextval('{sequence}'::regclass)"),
+        autoincrement=False,
+        nullable=False,
+    )
+    if partitioned:
+        op.create_table(
+            name,
+            id_column,
+            *columns,
+            sa.PrimaryKeyConstraint("id", "created_at"),
+            postgresql_partition_by="RANGE (created_at)",
+        )
+        since = bind.scalar(sa.text(f'SELECT min(created_at) FROM "{old_name}"'))
+        ensure_monthly_partitions(bind, name, since=since.date() if since else None)
+    else:
+        op.create_table(name, id_column, *columns, sa.PrimaryKeyConstraint("id"))
+
+    names = ", ".join(
+        f'"{column.name}"' for column in [id_column, *columns] if isinstance(column, sa.Column)
+    )
+    op.execute(f'INSERT INTO "{name}" ({names}) SELECT {names} FROM "{old_name}"')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{name}".id')
+    op.drop_table(old_name)
+
+
+def get_uploaded_file_references():
+    # Tables added since the database's initial revision are created later, with the
+    # composite foreign key, by the revision autogenerated for them
+    inspector = sa.inspect(op.get_bind())
+
+    return {
+        table: ondelete
+        for table, ondelete in UPLOADED_FILE_REFERENCES.items()
+        if inspector.has_table(table)
+    }
+
+
+def drop_uploaded_file_references():
+    inspector = sa.inspect(op.get_bind())
+
+    for table in get_uploaded_file_references():
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key["referred_table"] == "uploaded_file":
+                op.drop_constraint(foreign_key["name"], table, type_="foreignkey")
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("uploaded_file"):
+        return
+
+    references = get_uploaded_file_references()
+    for table in references:
+        op.add_column(table, sa.Column("uploaded_file_created_at", sa.DateTime(), nullable=True))
+        op.execute(
+            f'UPDATE "{table}" SET uploaded_file_created_at = uploaded_file.created_at'
+            f' FROM uploaded_file WHERE uploaded_file.id = "{table}".uploaded_file_id'
+        )
+    if "uploaded_file_variant" in references:
+        op.alter_column("uploaded_file_variant", "uploaded_file_created_at", nullable=False)
+    drop_uploaded_file_references()
+
+    rebuild_table("uploaded_file", uploaded_file_columns(), partitioned=True)
+    rebuild_table("forgot_password", forgot_password_columns(), partitioned=True)
+
+    for table, ondelete in references.items():
+        op.create_foreign_key(
+            None,
+            table,
+            "uploaded_file",
+            ["uploaded_file_id", "uploaded_file_created_at"],
+            ["id", "created_at"],
+            ondelete=ondelete,
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("uploaded_file"):
+        return
+
+    references = get_uploaded_file_references()
+    drop_uploaded_file_references()
+
+    rebuild_table("uploaded_file", uploaded_file_columns(), partitioned=False)
+    rebuild_table("forgot_password", forgot_password_columns(), partitioned=False)
+
+    for table, ondelete in references.items():
+        op.create_foreign_key(
+            None, table, "uploaded_file", ["uploaded_file_id"], ["id"], ondelete=ondelete
+        )
+        op.drop_column(table, "uploaded_file_created_at")
@@ -0,0 +1,46 @@
+"""Lookup indexes on forgot_password.token and uploaded_file.user_id
+
+Built concurrently, writes to the tables go on meanwhile (see
+app/core/db/migrations.py). Both tables are partitioned, each partition's index is
+built on its own and attached to the parent's. user.email lookups already use the
+index of its unique constraint. On a new database the initial revision creates the
+tables with their indexes.
+
+Revision ID: a7d2f4e81c39
+Revises: 5b7e9d13c6f4
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = "a7d2f4e81c39"
+down_revision = "5b7e9d13c6f4"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_forgot_password_token": ("forgot_password", ["token"]),
+    "ix_uploaded_file_user_id": ("uploaded_file", ["user_id"]),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for name, (table, columns) in INDEXES.items():
+        if inspector.has_table(table):
+            create_index_concurrently(name, table, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for name, (table, _) in INDEXES.items():
+        if inspector.has_table(table):
+            drop_index_concurrently(name, table)
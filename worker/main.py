@@ -1,7 +1,22 @@
+from uuid import uuid4
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    setup_logging,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_shutdown,
+)
 
 from app.core.config import settings
+from app.core.log import RequestContext, get_request_id, logging_pipeline, request_context
+from app.core.tracing import SpanKind, configure_tracing, end_span, tracing
+from worker.queues import DEFAULT_QUEUE, MAX_PRIORITY, QUEUE_PROFILES, route_task
 
 celery_app = Celery(
     "Worker",
@@ -15,12 +30,159 @@ celery_app.conf.beat_schedule = {
         "schedule": crontab(minute="*/10"),  # Run every 10 minutes
         "args": (),  # Optional arguments for the task
     },
+    "rotate_jwt_keys": {
+        "task": "worker.tasks.scheduled_job.rotate_jwt_keys",
+        "schedule": crontab(minute="0", hour="*/6"),
+        "args": (),
+    },
+    "flush_write_behind_columns": {
+        "task": "worker.tasks.scheduled_job.flush_write_behind_columns",
+        "schedule": settings.WRITE_BEHIND_FLUSH_SECONDS,
+        "args": (),
+    },
+    "expire_uploads": {
+        "task": "worker.tasks.scheduled_job.expire_uploads",
+        "schedule": crontab(minute="15"),
+        "args": (),
+    },
+    "maintain_table_partitions": {
+        "task": "worker.tasks.scheduled_job.maintain_table_partitions",
+        "schedule": crontab(minute="30", hour="3"),
+        "args": (),
+    },
     # Add more scheduled tasks here...
 }
 
 celery_app.autodiscover_tasks(["worker.tasks"])
 
 celery_app.conf.update(
-    task_track_started=True,
-    CELERY_CONCURRENCY=settings.CELERY_CONCURRENCY,
+    task_queues=[profile.to_queue() for profile in QUEUE_PROFILES.values()],
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes=(route_task,),
+    task_queue_max_priority=MAX_PRIORITY,
+    task_default_priority=None,
+    task_ignore_result=True,
+    result_expires=3600,
+    broker_transport_options={
+        "priority_steps": list(range(MAX_PRIORITY + 1)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    worker_concurrency=settings.CELERY_CONCURRENCY,
+    worker_prefetch_multiplier=QUEUE_PROFILES[DEFAULT_QUEUE].prefetch_multiplier,
 )
+
+
+@setup_logging.connect
+def configure_logging(**kwargs):
+    # Connected, Celery leaves the root logger to the pipeline
+    logging_pipeline.start()
+
+
+@worker_shutdown.connect
+def stop_logging(**kwargs):
+    logging_pipeline.stop()
+
+
+@before_task_publish.connect
+def propagate_request_id(headers=None, **kwargs):
+    # Tasks enqueued while serving a request log with the request's ID
+    request_id = get_request_id()
+    if request_id and headers is not None:
+        headers.setdefault("request_id", request_id)
+
+
+@task_prerun.connect
+def bind_request_id(task=None, **kwargs):
+    # Message headers are request attributes in a worker, `request.headers` when eager
+    request_id = (
+        getattr(task.request, "request_id", None)
+        or (task.request.headers or {}).get("request_id")
+        or uuid4().hex
+    )
+    task.request.log_context_token = request_context.set(RequestContext(request_id, name=task.name))
+
+
+@task_postrun.connect
+def unbind_request_id(task=None, **kwargs):
+    token = getattr(task.request, "log_context_token", None)
+    if token is not None:
+        request_context.reset(token)
+
+
+@worker_init.connect
+def start_tracing(**kwargs):
+    # The SDK restarts its export thread in forked pool processes
+    configure_tracing("worker")
+
+
+@worker_shutdown.connect
+def stop_tracing(**kwargs):
+    tracing.shutdown()
+
+
+# task id -> PRODUCER span, open between publish signals
+_publish_spans = {}
+
+
+@before_task_publish.connect
+def start_publish_span(sender=None, headers=None, **kwargs):
+    if not tracing.in_recording_span() or headers is None:
+        return
+
+    span = tracing.start_span(f"publish {sender}", kind=SpanKind.PRODUCER)
+    span.set_attribute("messaging.destination.name", kwargs.get("routing_key") or "")
+    # The task span continues this trace on the worker
+    tracing.inject(headers, span)
+    _publish_spans[headers.get("id")] = span
+
+
+@after_task_publish.connect
+def end_publish_span(headers=None, **kwargs):
+    span = _publish_spans.pop((headers or {}).get("id"), None)
+    if span is not None:
+        end_span(span)
+
+
+def get_trace_carrier(task):
+    # Same as the request ID, headers are attributes in a worker, `request.headers` eager
+    carrier = dict(task.request.headers or {})
+    for key in ("traceparent", "tracestate"):
+        value = getattr(task.request, key, None)
+        if value:
+            carrier[key] = value
+
+    return carrier
+
+
+@task_prerun.connect
+def start_task_span(task=None, **kwargs):
+    if not tracing.enabled:
+        return
+
+    span = tracing.start_span(
+        f"run {task.name}",
+        kind=SpanKind.CONSUMER,
+        context=tracing.extract(get_trace_carrier(task)),
+        attributes={"celery.task_id": task.request.id or ""},
+    )
+    task.request.tracing_span = span
+    task.request.tracing_token = tracing.attach(span)
+
+
+@task_failure.connect
+def record_task_failure(sender=None, exception=None, **kwargs):
+    if getattr(sender.request, "tracing_span", None) is not None:
+        sender.request.tracing_error = exception
+
+
+@task_postrun.connect
+def end_task_span(task=None, state=None, **kwargs):
+    span = getattr(task.request, "tracing_span", None)
+    if span is None:
+        return
+
+    span.set_attribute("celery.state", state or "")
+    end_span(span, getattr(task.request, "tracing_error", None))
+    tracing.detach(task.request.tracing_token)
+    task.request.tracing_span = None
@@ -0,0 +1,68 @@
+from typing import Any, Dict
+
+from kombu import Exchange, Queue
+
+from app.core.config import settings
+
+MAX_PRIORITY = 9
+
+
+class QueueProfile:
+    """Consumer settings of a queue, used by the worker started for that queue."""
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        prefetch_multiplier: int = 1,
+        acks_late: bool = True,
+        pool: str = "prefork",
+    ) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.prefetch_multiplier = prefetch_multiplier
+        self.acks_late = acks_late
+        self.pool = pool
+
+    def to_queue(self) -> Queue:
+        return Queue(
+            self.name,
+            Exchange(self.name),
+            routing_key=self.name,
+            queue_arguments={"x-max-priority": MAX_PRIORITY},
+        )
+
+
+def build_queue_profiles() -> Dict[str, QueueProfile]:
+    profiles = {
+        # User facing and short, many in flight per process
+        "email": QueueProfile(
+            "email", concurrency=settings.CELERY_CONCURRENCY, prefetch_multiplier=4
+        ),
+        # Beat jobs are long and rare, never prefetch behind one
+        "scheduled": QueueProfile("scheduled", concurrency=1, prefetch_multiplier=1),
+        "default": QueueProfile("default", concurrency=settings.CELERY_CONCURRENCY),
+        # CPU work is done by a process pool inside the worker (prefork children are
+        # daemonic and can't start one), the threads only wait on it
+        "media": QueueProfile("media", concurrency=settings.CELERY_CONCURRENCY, pool="threads"),
+    }
+
+    for name, options in settings.CELERY_QUEUE_OPTIONS.items():
+        if name in profiles:
+            for key, value in options.items():
+                setattr(profiles[name], key, value)
+        else:
+            profiles[name] = QueueProfile(name, **options)
+
+    return profiles
+
+
+QUEUE_PROFILES = build_queue_profiles()
+DEFAULT_QUEUE = "default"
+
+# task name -> {"queue": ..., "priority": ...}, filled by `worker.registry.task`
+TASK_ROUTES: Dict[str, Dict[str, Any]] = {}
+
+
+def route_task(name: str, args, kwargs, options, task=None, **kw) -> Dict[str, Any]:
+    return TASK_ROUTES.get(name, {"queue": DEFAULT_QUEUE})
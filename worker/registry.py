@@ -0,0 +1,29 @@
+from typing import Optional
+
+from worker.main import celery_app
+from worker.queues import QUEUE_PROFILES, TASK_ROUTES
+
+
+def task(queue: str, priority: Optional[int] = None, ignore_result: bool = True, **options):
+    """Declares a Celery task bound to a named queue.
+
+    Results are not stored unless `ignore_result=False`, and `acks_late` follows the
+    queue profile. `priority` is 0-9, with the Redis broker 0 is consumed first.
+    """
+    profile = QUEUE_PROFILES[queue]
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__name__}"
+
+        route = {"queue": queue}
+        if priority is not None:
+            route["priority"] = priority
+        TASK_ROUTES[name] = route
+
+        options.setdefault("acks_late", profile.acks_late)
+
+        return celery_app.task(
+            name=name, ignore_result=ignore_result, priority=priority, **options
+        )(fn)
+
+    return decorator
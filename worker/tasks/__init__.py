@@ -1,2 +1,3 @@
 from .email import *  # noqa: F403
+from .media import *  # noqa: F403
 from .scheduled_job import *  # noqa: F403
@@ -1,7 +1,7 @@
-from worker.main import celery_app
+from worker.registry import task
 
 
-@celery_app.task
+@task(queue="email", priority=0)
 def send_email(*args, **kwargs):
     print("Successfully send the email...", args, kwargs)
     return True
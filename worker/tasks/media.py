@@ -0,0 +1,149 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from celery.signals import worker_shutdown
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config.models import UploadedFile, UploadedFileVariant
+from app.core.config import MEDIA_ROOT, settings
+from app.core.db.session import get_sync_session
+from app.core.utils.image import get_variant_path, is_image, render_variant
+from worker.registry import task
+
+logger = logging.getLogger(__name__)
+
+# Rendered images are large and Pillow's heap fragments, recycle the processes
+POOL_MAX_TASKS_PER_CHILD = 200
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_POOL_SIZE or os.cpu_count(),
+            # The media worker runs a thread pool, forking it is not safe
+            mp_context=multiprocessing.get_context("forkserver"),
+            max_tasks_per_child=POOL_MAX_TASKS_PER_CHILD,
+        )
+
+    return _pool
+
+
+@worker_shutdown.connect
+def shutdown_process_pool(**kwargs) -> None:
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def render_variants(file_path: str, variants: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # One image's variants render in parallel, the task thread only waits
+    pool = get_process_pool()
+    source = f"{MEDIA_ROOT}/{file_path}"
+
+    futures = {}
+    for name, spec in variants.items():
+        variant_path = get_variant_path(file_path, name, spec)
+        target = f"{MEDIA_ROOT}/{variant_path}"
+        futures[name] = (variant_path, pool.submit(render_variant, source, target, spec))
+
+    rows = []
+    for name, (variant_path, future) in futures.items():
+        try:
+            width, height, size = future.result()
+        except Exception as e:
+            logger.warning(f"Variant {name} of {file_path} failed. Error {e}")
+            continue
+
+        rows.append(
+            {
+                "name": name,
+                "file_path": variant_path,
+                "width": width,
+                "height": height,
+                "size": size,
+            }
+        )
+
+    return rows
+
+
+@task(queue="media")
+def generate_image_variants(
+    uploaded_file_id: int, names: Optional[List[str]] = None, created_at: Optional[str] = None
+) -> int:
+    with get_sync_session() as session:
+        if created_at is not None:
+            # The full primary key, only the file's partition is read
+            key = {"id": uploaded_file_id, "created_at": datetime.fromisoformat(created_at)}
+            uploaded_file = session.get(UploadedFile, key)
+        else:
+            # Enqueued without it (before partitioning), every partition's index is probed
+            uploaded_file = UploadedFile.find_first(session, id=uploaded_file_id)
+
+        if uploaded_file is None or not is_image(uploaded_file.extension):
+            return 0
+
+        file_path = uploaded_file.file_path
+        file_created_at = uploaded_file.created_at
+
+    variants = {
+        name: spec
+        for name, spec in settings.IMAGE_VARIANTS.items()
+        if names is None or name in names
+    }
+
+    # No DB connection is held while rendering
+    rows = render_variants(file_path, variants)
+    if not rows:
+        return 0
+
+    # Re-runs (retries, changed settings) replace the previous rendering
+    stmt = insert(UploadedFileVariant).values(
+        [
+            {
+                "uploaded_file_id": uploaded_file_id,
+                "uploaded_file_created_at": file_created_at,
+                **row,
+            }
+            for row in rows
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UploadedFileVariant.uploaded_file_id, UploadedFileVariant.name],
+        set_={
+            "file_path": stmt.excluded.file_path,
+            "width": stmt.excluded.width,
+            "height": stmt.excluded.height,
+            "size": stmt.excluded.size,
+            "created_at": stmt.excluded.created_at,
+        },
+    )
+
+    with get_sync_session() as session:
+        session.execute(stmt)
+        session.commit()
+
+    return len(rows)
+
+
+def enqueue_image_variants(uploaded_file: UploadedFile) -> None:
+    if not is_image(uploaded_file.extension) or not settings.IMAGE_VARIANTS:
+        return
+
+    # The upload is committed, without variants the original is served
+    try:
+        generate_image_variants.delay(
+            uploaded_file.id, created_at=uploaded_file.created_at.isoformat()
+        )
+    except Exception as e:
+        logger.error(f"Image variants of file {uploaded_file.id} not enqueued. Error {e}")
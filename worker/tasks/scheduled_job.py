@@ -1,7 +1,49 @@
-from worker.main import celery_app
+from datetime import timedelta
 
+from app.config import models as _config_models  # noqa: F401 registers tables
+from app.core.auth.keys import rotate_keys
+from app.core.config import settings
+from app.core.db.base import Base
+from app.core.db.partitions import maintain_partitions
+from app.core.db.session import get_sync_session
+from app.core.db.write_behind import flush_write_behind
+from app.core.utils.upload import expire_upload_sessions
+from app.user.models_manager import user as _user_manager  # noqa: F401 registers buffers
+from worker.registry import task
 
-@celery_app.task
+
+@task(queue="scheduled")
 def ten_minute_crontab():
     print("tem_minute_crontab called")
     return True
+
+
+@task(queue="scheduled")
+def rotate_jwt_keys():
+    if not settings.JWT_KEYS_DIR:
+        return []
+
+    return rotate_keys(
+        settings.JWT_KEYS_DIR,
+        settings.JWT_KEY_ALGORITHM,
+        rotation_period=timedelta(days=settings.JWT_KEY_ROTATION_DAYS),
+        lead_time=timedelta(hours=settings.JWT_KEY_ROTATION_LEAD_HOURS),
+    )
+
+
+@task(queue="scheduled")
+def flush_write_behind_columns():
+    with get_sync_session() as session:
+        return flush_write_behind(session, include_redis=True)
+
+
+@task(queue="scheduled")
+def expire_uploads():
+    with get_sync_session() as session:
+        return expire_upload_sessions(session)
+
+
+@task(queue="scheduled")
+def maintain_table_partitions():
+    with get_sync_session() as session:
+        return maintain_partitions(session, Base.metadata)